@@ -0,0 +1,108 @@
+# benchmarks/dag_parse.py
+"""
+Costo de parsear el DAG: importa dags/spotify_pipeline_dag.py en procesos
+nuevos (como hace el scheduler de Airflow en cada parseo) y reporta el tiempo
+de importación, los paquetes más costosos (tiempo propio de sus módulos según
+`python -X importtime`) y qué dependencias pesadas quedaron cargadas.
+
+Uso:
+    python benchmarks/dag_parse.py --runs 10
+    python benchmarks/dag_parse.py --runs 10 --output benchmarks/results/dag_parse.json --max-seconds 0.5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+DAGS_DIR = os.path.join(REPO_DIR, 'dags')
+DAG_MODULE = 'spotify_pipeline_dag'
+DEFAULT_RUNS = 10
+# Dependencias que solo deberían importarse al ejecutar una tarea.
+HEAVY_PACKAGES = ('pandas', 'numpy', 'pyarrow', 'sqlalchemy', 'psycopg2', 'pydrive2', 'requests', 'dotenv', 'duckdb')
+
+_CHILD_CODE = f"""
+import json, sys, time
+start = time.perf_counter()
+import {DAG_MODULE}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [p for p in {HEAVY_PACKAGES!r} if p in sys.modules]}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Tiempo (s) por paquete de primer nivel: suma del tiempo propio de sus módulos."""
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1e6
+    return packages
+
+
+def run_once() -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (DAGS_DIR, env.get('PYTHONPATH')) if p)
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD_CODE],
+        cwd=DAGS_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"No se pudo importar el DAG:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['packages'] = _parse_importtime(completed.stderr)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--top', type=int, default=10, help="Paquetes más costosos a mostrar.")
+    parser.add_argument('--output', help="Guarda los resultados en este JSON.")
+    parser.add_argument('--max-seconds', type=float, help="Falla (código 1) si la mediana supera este tiempo.")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+    seconds = [run['seconds'] for run in runs]
+    packages = defaultdict(list)
+    for run in runs:
+        for name, value in run['packages'].items():
+            packages[name].append(value)
+    top = sorted(((statistics.median(values), name) for name, values in packages.items()), reverse=True)[:args.top]
+
+    print(f"Importación del DAG ({args.runs} procesos): mediana {statistics.median(seconds):.3f}s, "
+          f"mínimo {min(seconds):.3f}s, máximo {max(seconds):.3f}s")
+    print("Paquetes más costosos (mediana):")
+    for value, name in top:
+        print(f"  {name:<28} {value:>7.3f}s")
+    loaded = runs[-1]['loaded']
+    print(f"Dependencias pesadas cargadas al parsear: {', '.join(loaded) if loaded else 'ninguna'}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'runs': args.runs,
+                'median_seconds': round(statistics.median(seconds), 4),
+                'min_seconds': round(min(seconds), 4),
+                'max_seconds': round(max(seconds), 4),
+                'top_packages': [{'package': name, 'seconds': round(value, 4)} for value, name in top],
+                'heavy_packages_loaded': loaded,
+            }, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.max_seconds is not None and statistics.median(seconds) > args.max_seconds:
+        print(f"REGRESIÓN: la importación del DAG tarda más de {args.max_seconds:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/merge_backends.py
+"""
+Compara los backends de `merge` ('pandas' y 'duckdb') sobre los datasets
+sintéticos de run_benchmarks.py: prepara las entradas limpias una vez por
+escala y ejecuta el merge con cada backend en procesos propios, alternándolos,
+después de una corrida de calentamiento (que llena la caché de
+normalización). Reporta la mediana de tiempo y de pico de RSS por backend y
+verifica que ambos generen el mismo artefacto (checksum).
+
+Uso:
+    python benchmarks/merge_backends.py --scales 1 10 --repeat 3
+    python benchmarks/merge_backends.py --scales 10 --output benchmarks/results/merge_backends.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+from run_benchmarks import CASES, prepare_datasets, run_case
+
+BACKENDS = ('pandas', 'duckdb')
+# Tareas que producen las entradas del merge.
+INPUT_CASES = ('extract_spotify', 'extract_artist', 'transform_spotify_data',
+               'transform_artist_details', 'transform_grammys_data')
+
+
+def run_scale(scale: float, repeat: int, regenerate: bool) -> list:
+    data_dir = prepare_datasets(scale, regenerate)
+    work_dir = tempfile.mkdtemp(prefix=f"merge_backends_x{scale:g}_")
+    try:
+        os.makedirs(os.path.join(work_dir, 'data'))
+        for filename in ('spotify_dataset.csv', 'api_artist.csv', 'grammys.csv'):
+            os.symlink(os.path.join(data_dir, filename), os.path.join(work_dir, 'data', filename))
+
+        cases = {case[0]: case for case in CASES}
+        outputs = {}
+        for name in INPUT_CASES:
+            run_case(work_dir, cases[name], outputs)
+
+        _, target, args, _, rows_from = cases['merge']
+        runs = {backend: [] for backend in BACKENDS}
+        checksums = {}
+        for i in range(repeat + 1):
+            for backend in BACKENDS:
+                result = run_case(work_dir, (f"merge[{backend}]", target, args, {'backend': backend}, rows_from), outputs)
+                checksums[backend] = outputs[f"merge[{backend}]"]['checksum']
+                if i > 0:  # la primera vuelta es de calentamiento
+                    runs[backend].append(result)
+
+        results = []
+        for backend in BACKENDS:
+            seconds = [r['wall_seconds'] for r in runs[backend]]
+            results.append({
+                'scale': scale,
+                'backend': backend,
+                'rows': runs[backend][0]['rows'],
+                'median_seconds': round(statistics.median(seconds), 4),
+                'min_seconds': round(min(seconds), 4),
+                'peak_rss_mb': round(statistics.median(r['peak_rss_mb'] for r in runs[backend]), 1),
+                'identical_output': len(set(checksums.values())) == 1,
+            })
+            print(f"x{scale:g} merge[{backend:<6}] {results[-1]['median_seconds']:>9.2f}s "
+                  f"{results[-1]['peak_rss_mb']:>9.1f} MB  salida idéntica: {results[-1]['identical_output']}")
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3, help="Corridas medidas por backend (más una de calentamiento).")
+    parser.add_argument('--output', help="Guarda los resultados en este JSON.")
+    parser.add_argument('--regenerate', action='store_true', help="Regenera los datasets sintéticos.")
+    args = parser.parse_args(argv)
+
+    # Cada corrida debe ejecutar el merge, no reutilizar la caché de tareas.
+    os.environ['TASK_CACHE_DISABLED'] = 'true'
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.repeat, args.regenerate))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    return 0 if all(r['identical_output'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# benchmarks/normalization.py
+"""
+Micro-benchmark de las etapas del merge que se vectorizaron: normalización
+de nombres (artista principal, canción y álbum de Spotify; artista y nominado
+de los Grammy), coincidencia "artista de Spotify contenido en el artista del
+Grammy" y elección de la mejor fila por track_id. Cada etapa se mide con la
+implementación fila a fila anterior (Series.apply, DataFrame.apply(axis=1),
+groupby().idxmax()) y con la actual de tasks/normalization.py y
+tasks/merge_data.py, sobre los datasets sintéticos de run_benchmarks.py, y se
+verifica que ambas den el mismo resultado.
+
+Uso:
+    python benchmarks/normalization.py --scales 1 --repeat 3
+    python benchmarks/normalization.py --scales 1 10 --output benchmarks/results/normalization.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from run_benchmarks import DAGS_DIR, prepare_datasets
+
+sys.path.insert(0, DAGS_DIR)
+
+from tasks.merge_data import _artist_match, _best_row_per_track  # noqa: E402
+from tasks.normalization import normalize_name, normalize_names, normalize_primary_artists  # noqa: E402
+
+
+def _rowwise_primary_artist(value) -> str:
+    if pd.isna(value):
+        return ""
+    return normalize_name(str(value).split(';')[0])
+
+
+def _rowwise_normalize(spotify: pd.DataFrame, grammys: pd.DataFrame) -> dict:
+    return {
+        'artists_normalized_primary': spotify['artists'].apply(_rowwise_primary_artist),
+        'track_name_normalized': spotify['track_name'].apply(normalize_name),
+        'album_name_normalized': spotify['album_name'].apply(normalize_name),
+        'artist_normalized': grammys['artist'].apply(normalize_name),
+        'nominee_normalized': grammys['nominee'].apply(normalize_name),
+    }
+
+
+def _vectorized_normalize(spotify: pd.DataFrame, grammys: pd.DataFrame) -> dict:
+    # Sin caché de normalización y en un solo proceso: se mide solo la vectorización.
+    return {
+        'artists_normalized_primary': normalize_primary_artists(spotify['artists'], max_workers=1),
+        'track_name_normalized': normalize_names(spotify['track_name'], max_workers=1),
+        'album_name_normalized': normalize_names(spotify['album_name'], max_workers=1),
+        'artist_normalized': normalize_names(grammys['artist'], max_workers=1),
+        'nominee_normalized': normalize_names(grammys['nominee'], max_workers=1),
+    }
+
+
+def _match_frame(normalized: dict, spotify: pd.DataFrame) -> pd.DataFrame:
+    """Filas de Spotify con las nominaciones y el artista Grammy de su canción, como en el merge."""
+    grammys = pd.DataFrame({'nominee': normalized['nominee_normalized'], 'artist': normalized['artist_normalized']})
+    by_work = grammys.groupby('nominee').agg(
+        work_grammy_nominations_track=('artist', 'size'), artist_normalized_track=('artist', 'first'))
+    df = pd.DataFrame({
+        'track_id': spotify['track_id'],
+        'artists_normalized_primary': normalized['artists_normalized_primary'],
+        'track_name_normalized': normalized['track_name_normalized'],
+    }).merge(by_work, left_on='track_name_normalized', right_index=True, how='left')
+    df['work_grammy_nominations_track'] = df['work_grammy_nominations_track'].fillna(0)
+    df['artist_normalized_track'] = df['artist_normalized_track'].fillna('')
+    return df
+
+
+def _rowwise_match(df: pd.DataFrame) -> pd.Series:
+    return (df['work_grammy_nominations_track'] > 0) & df.apply(
+        lambda row: row['artists_normalized_primary'] in row['artist_normalized_track'], axis=1)
+
+
+def _vectorized_match(df: pd.DataFrame) -> pd.Series:
+    return _artist_match(df, 'work_grammy_nominations_track', 'artist_normalized_track', max_workers=1)
+
+
+def _timed(func, *args, repeat: int):
+    seconds, result = [], None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func(*args)
+        seconds.append(time.perf_counter() - start_time)
+    return statistics.median(seconds), result
+
+
+def _same_series(a: pd.Series, b: pd.Series) -> bool:
+    return np.array_equal(np.asarray(a, dtype=object), np.asarray(b, dtype=object))
+
+
+def run_scale(scale: float, repeat: int, regenerate: bool) -> list:
+    data_dir = prepare_datasets(scale, regenerate)
+    spotify = pd.read_csv(os.path.join(data_dir, 'spotify_dataset.csv'),
+                          usecols=['track_id', 'artists', 'album_name', 'track_name'])
+    grammys = pd.read_csv(os.path.join(data_dir, 'grammys.csv'), usecols=['nominee', 'artist'])
+
+    results = []
+
+    def record(stage: str, rows: int, before: float, after: float, identical: bool) -> None:
+        results.append({
+            'scale': scale,
+            'stage': stage,
+            'rows': rows,
+            'rowwise_seconds': round(before, 4),
+            'vectorized_seconds': round(after, 4),
+            'speedup': round(before / after, 2) if after > 0 else None,
+            'identical_output': identical,
+        })
+        print(f"x{scale:g} {stage:<18} {rows:>9} filas  fila a fila {before:>8.2f}s  "
+              f"vectorizado {after:>7.2f}s  ({results[-1]['speedup']}x)  salida idéntica: {identical}")
+
+    before, rowwise = _timed(_rowwise_normalize, spotify, grammys, repeat=repeat)
+    after, vectorized = _timed(_vectorized_normalize, spotify, grammys, repeat=repeat)
+    record('normalize_names', len(spotify) + len(grammys), before, after,
+           all(_same_series(rowwise[col], vectorized[col]) for col in rowwise))
+
+    df = _match_frame(vectorized, spotify)
+    before, rowwise = _timed(_rowwise_match, df, repeat=repeat)
+    after, vectorized_match = _timed(_vectorized_match, df, repeat=repeat)
+    record('artist_match', len(df), before, after, _same_series(rowwise, vectorized_match))
+
+    nom_sum = df['work_grammy_nominations_track'] * vectorized_match
+    before, rowwise = _timed(lambda: df.index.get_indexer(nom_sum.groupby(df['track_id']).idxmax()), repeat=repeat)
+    after, positions = _timed(_best_row_per_track, df, nom_sum, repeat=repeat)
+    record('best_row_per_track', len(df), before, after, np.array_equal(rowwise, positions))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=3, help="Corridas por implementación (se reporta la mediana).")
+    parser.add_argument('--output', help="Guarda los resultados en este JSON.")
+    parser.add_argument('--regenerate', action='store_true', help="Regenera los datasets sintéticos.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.repeat, args.regenerate))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'pandas': pd.__version__, 'results': results}, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    return 0 if all(r['identical_output'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
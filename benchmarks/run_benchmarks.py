@@ -0,0 +1,251 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks de las tareas del DAG sobre datos sintéticos a distintas escalas
+(1x = tamaño del dataset de Spotify y de data/grammys.csv).
+
+Cada tarea se ejecuta fuera de Airflow llamando a su función sin decorar
+(`transform_spotify_data.function`, `merge.function`, ...) en un proceso
+propio, para que el pico de RSS sea el de la tarea. Por tarea se registra el
+tiempo, el pico de RSS y las filas por segundo en un JSON.
+
+Uso:
+    python benchmarks/run_benchmarks.py --scales 1 10 100 --output benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --scales 1 --baseline benchmarks/results/main.json --max-regression 0.25
+
+Los datasets generados se guardan en benchmarks/.data/scale_<n> y se reutilizan.
+Con --with-db también se mide load_to_db (requiere las variables de entorno
+de la base de datos) sobre la tabla BENCHMARK_TABLE_NAME.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from synthetic import generate_datasets
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+DAGS_DIR = os.path.join(REPO_DIR, 'dags')
+DATA_CACHE_DIR = os.path.join(BENCHMARKS_DIR, '.data')
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_MAX_REGRESSION = 0.2
+BENCHMARK_TABLE_NAME = 'spotify_grammys_benchmark'
+
+# (nombre, función 'módulo:tarea', args, kwargs, filas de referencia)
+# Los args con prefijo '@' son el resultado de un caso anterior. Las filas de
+# referencia salen del handle de ese caso ('self' = la salida del propio caso).
+CASES = [
+    ('extract_spotify', 'tasks.extract_csv:extract_spotify', [], {}, 'self'),
+    ('extract_artist', 'tasks.extract_api:extract_artist', [], {}, 'self'),
+    ('transform_spotify_data', 'tasks.transform_csv_data:transform_spotify_data', ['@extract_spotify'], {}, '@extract_spotify'),
+    ('transform_spotify_data[streaming]', 'tasks.transform_csv_data:transform_spotify_data', [], {'streaming': True}, '@extract_spotify'),
+    ('transform_artist_details', 'tasks.transform_data_api:transform_artist_details', ['@extract_artist'], {}, '@extract_artist'),
+    ('transform_grammys_data', 'tasks.transform_db_data:transform_grammys_data', [], {}, 'self'),
+    ('merge', 'tasks.merge_data:merge',
+     ['@transform_spotify_data', '@transform_artist_details', '@transform_grammys_data'], {}, '@transform_spotify_data'),
+]
+DB_CASES = [
+    ('load_to_db[copy]', 'tasks.load_to_db:load_to_db', ['@merge'],
+     {'table_name': BENCHMARK_TABLE_NAME, 'method': 'copy'}, '@merge'),
+    ('load_to_db[upsert]', 'tasks.load_to_db:load_to_db', ['@merge'],
+     {'table_name': BENCHMARK_TABLE_NAME, 'if_exists': 'upsert', 'method': 'copy'}, '@merge'),
+]
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _current_rss_mb() -> float:
+    rss = _proc_status_mb('VmRSS')
+    return rss if rss is not None else _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM se reinicia con el exec del proceso hijo; ru_maxrss conserva el
+    # pico del proceso padre, así que solo se usa donde no hay /proc.
+    peak = _proc_status_mb('VmHWM')
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(work_dir: str, target: str, args: list, kwargs: dict, queue) -> None:
+    """Ejecuta una tarea en el proceso hijo y envía resultado y métricas por `queue`."""
+    try:
+        os.environ['AIRFLOW_HOME'] = work_dir
+        os.chdir(work_dir)
+        sys.path.insert(0, DAGS_DIR)
+        logging.basicConfig(level=logging.WARNING)
+
+        module_name, task_name = target.split(':')
+        task = getattr(importlib.import_module(module_name), task_name)
+        baseline_rss = _current_rss_mb()
+
+        start_time = time.perf_counter()
+        result = task.function(*args, **kwargs)
+        wall_seconds = time.perf_counter() - start_time
+
+        queue.put({
+            'ok': True,
+            'result': result,
+            'wall_seconds': wall_seconds,
+            'baseline_rss_mb': baseline_rss,
+            'peak_rss_mb': _peak_rss_mb(),
+        })
+    except Exception as e:
+        queue.put({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+
+
+def _resolve(value, outputs: dict):
+    if isinstance(value, str) and value.startswith('@'):
+        return outputs[value[1:]]
+    return value
+
+
+def _num_rows(value):
+    if isinstance(value, dict):
+        return value.get('num_rows')
+    return None
+
+
+def run_case(work_dir: str, case: tuple, outputs: dict) -> dict:
+    name, target, args, kwargs, rows_from = case
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(work_dir, target, [_resolve(a, outputs) for a in args], kwargs, queue))
+    process.start()
+    message = queue.get()
+    process.join()
+    if not message['ok']:
+        raise RuntimeError(f"La tarea '{name}' falló: {message['error']}")
+
+    outputs[name] = message['result']
+    rows = _num_rows(message['result'] if rows_from == 'self' else _resolve(rows_from, outputs))
+    wall_seconds = message['wall_seconds']
+    return {
+        'task': name,
+        'rows': rows,
+        'wall_seconds': round(wall_seconds, 4),
+        'rows_per_second': round(rows / wall_seconds, 1) if rows and wall_seconds > 0 else None,
+        'peak_rss_mb': round(message['peak_rss_mb'], 1),
+        'task_rss_mb': round(message['peak_rss_mb'] - message['baseline_rss_mb'], 1),
+    }
+
+
+def prepare_datasets(scale: float, regenerate: bool = False) -> str:
+    data_dir = os.path.join(DATA_CACHE_DIR, f"scale_{scale:g}")
+    marker = os.path.join(data_dir, 'datasets.json')
+    if regenerate or not os.path.exists(marker):
+        start_time = time.perf_counter()
+        rows = generate_datasets(data_dir, scale)
+        with open(marker, 'w') as f:
+            json.dump(rows, f)
+        print(f"Datasets x{scale:g} generados en {time.perf_counter() - start_time:.1f}s: {rows}")
+    return data_dir
+
+
+def run_scale(scale: float, with_db: bool, regenerate: bool) -> list:
+    data_dir = prepare_datasets(scale, regenerate)
+    # Directorio de trabajo nuevo por escala: sin artefactos ni caches de corridas anteriores.
+    work_dir = tempfile.mkdtemp(prefix=f"benchmark_x{scale:g}_")
+    try:
+        os.makedirs(os.path.join(work_dir, 'data'))
+        for filename in ('spotify_dataset.csv', 'api_artist.csv', 'grammys.csv'):
+            os.symlink(os.path.join(data_dir, filename), os.path.join(work_dir, 'data', filename))
+
+        outputs, results = {}, []
+        for case in CASES + (DB_CASES if with_db else []):
+            result = {'scale': scale, **run_case(work_dir, case, outputs)}
+            results.append(result)
+            print(
+                f"x{scale:g} {result['task']:<36} {result['wall_seconds']:>9.2f}s "
+                f"{result['peak_rss_mb']:>9.1f} MB  {result['rows_per_second'] or 0:>12,.0f} filas/s"
+            )
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline_path: str, max_regression: float) -> list:
+    """Retorna las tareas cuyo tiempo empeoró más de `max_regression` respecto al baseline."""
+    with open(baseline_path) as f:
+        baseline = {(r['scale'], r['task']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['scale'], result['task']))
+        if previous and result['wall_seconds'] > previous['wall_seconds'] * (1 + max_regression):
+            regressions.append(
+                f"x{result['scale']:g} {result['task']}: {previous['wall_seconds']:.2f}s -> {result['wall_seconds']:.2f}s"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--output', default=os.path.join(BENCHMARKS_DIR, 'results', 'latest.json'))
+    parser.add_argument('--baseline', help="JSON de una corrida anterior para detectar regresiones.")
+    parser.add_argument('--max-regression', type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Aumento relativo de tiempo tolerado frente al baseline (0.2 = 20%%).")
+    parser.add_argument('--with-db', action='store_true', help="Incluye load_to_db (requiere la base de datos).")
+    parser.add_argument('--regenerate', action='store_true', help="Regenera los datasets sintéticos.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.with_db, args.regenerate))
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESIÓN {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
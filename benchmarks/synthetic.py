@@ -0,0 +1,166 @@
+# benchmarks/synthetic.py
+
+import os
+import numpy as np
+import pandas as pd
+
+# Tamaños de referencia (1x): el dataset de Spotify original y data/grammys.csv.
+SPOTIFY_BASE_ROWS = 114000
+GRAMMYS_BASE_ROWS = 2970
+# En el dataset original ~79% de las filas tienen un track_id distinto.
+UNIQUE_TRACK_RATIO = 0.79
+TRACKS_PER_ALBUM = 12
+TRACKS_PER_ARTIST = 4
+ARTIST_COVERAGE = 0.95
+NULL_TEXT_RATIO = 1e-5
+CHUNK_ROWS = 500_000
+
+GENRES = [
+    'acoustic', 'alt-rock', 'anime', 'blues', 'classical', 'country', 'dance', 'edm', 'folk', 'funk',
+    'hip-hop', 'indie-pop', 'j-rock', 'jazz', 'k-pop', 'latin', 'metal', 'pop', 'punk', 'r-n-b',
+    'reggae', 'rock', 'salsa', 'sleep', 'soul', 'study', 'tango', 'techno', 'world-music', 'unknown-genre'
+]
+GRAMMY_CATEGORIES = [
+    'Record Of The Year', 'Album Of The Year', 'Song Of The Year', 'Best New Artist',
+    'Best Pop Solo Performance', 'Best Rock Album', 'Best Rap Song', 'Best Latin Pop Album',
+    'Best Country Album', 'Best Dance Recording', 'Best Jazz Vocal Album', 'Best R&B Performance'
+]
+
+
+def _n_unique_tracks(scale: float) -> int:
+    return max(1, int(SPOTIFY_BASE_ROWS * scale * UNIQUE_TRACK_RATIO))
+
+
+def _n_artists(n_tracks: int) -> int:
+    return max(1, n_tracks // TRACKS_PER_ARTIST)
+
+
+def _track_ids(t: np.ndarray) -> pd.Series:
+    return pd.Series(t).map('{:022x}'.format)
+
+
+def _artist_of(t: np.ndarray, n_artists: int) -> np.ndarray:
+    # Asignación determinística track -> artista, igual en filas duplicadas.
+    return (t.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(n_artists)
+
+
+def _artist_names(a: np.ndarray) -> pd.Series:
+    return 'Artist ' + pd.Series(a).astype(str)
+
+
+def _track_names(t: np.ndarray) -> pd.Series:
+    return 'Song ' + pd.Series(t).astype(str)
+
+
+def _album_names(t: np.ndarray) -> pd.Series:
+    return 'Album ' + pd.Series(t // TRACKS_PER_ALBUM).astype(str)
+
+
+def _with_nulls(values: pd.Series, rng: np.random.Generator) -> pd.Series:
+    return values.where(rng.random(len(values)) >= NULL_TEXT_RATIO)
+
+
+def _spotify_chunk(start: int, rows: int, n_tracks: int, rng: np.random.Generator) -> pd.DataFrame:
+    t = rng.integers(0, n_tracks, rows)
+    n_artists = _n_artists(n_tracks)
+    primary = _artist_of(t, n_artists)
+    featured = rng.integers(0, n_artists, rows)
+    artists = _artist_names(primary).where(
+        rng.random(rows) >= 0.3, _artist_names(primary) + ';' + _artist_names(featured)
+    )
+    return pd.DataFrame({
+        'Unnamed: 0': np.arange(start, start + rows),
+        'track_id': _track_ids(t),
+        'artists': _with_nulls(artists, rng),
+        'album_name': _with_nulls(_album_names(t), rng),
+        'track_name': _with_nulls(_track_names(t), rng),
+        'popularity': rng.integers(0, 100, rows),
+        'duration_ms': rng.integers(30_000, 600_000, rows),
+        'explicit': rng.random(rows) < 0.1,
+        'danceability': rng.random(rows).round(3),
+        'energy': rng.random(rows).round(3),
+        'key': rng.integers(0, 12, rows),
+        'loudness': (rng.random(rows) * -40).round(3),
+        'mode': rng.integers(0, 2, rows),
+        'speechiness': rng.random(rows).round(4),
+        'acousticness': rng.random(rows).round(4),
+        'instrumentalness': rng.random(rows).round(4),
+        'liveness': rng.random(rows).round(4),
+        'valence': rng.random(rows).round(4),
+        'tempo': (60 + rng.random(rows) * 140).round(3),
+        'time_signature': rng.choice([3, 4, 5], rows, p=[0.1, 0.85, 0.05]),
+        'track_genre': rng.choice(GENRES, rows),
+    })
+
+
+def write_spotify_dataset(path: str, scale: float, seed: int = 0) -> int:
+    """Escribe un spotify_dataset.csv sintético con SPOTIFY_BASE_ROWS * scale filas (por bloques)."""
+    rng = np.random.default_rng(seed)
+    total_rows = max(1, int(SPOTIFY_BASE_ROWS * scale))
+    n_tracks = _n_unique_tracks(scale)
+    for start in range(0, total_rows, CHUNK_ROWS):
+        chunk = _spotify_chunk(start, min(CHUNK_ROWS, total_rows - start), n_tracks, rng)
+        chunk.to_csv(path, index=False, mode='w' if start == 0 else 'a', header=(start == 0))
+    return total_rows
+
+
+def write_artist_dataset(path: str, scale: float, seed: int = 1) -> int:
+    """Escribe un api_artist.csv sintético: un registro por track (con ARTIST_COVERAGE de cobertura)."""
+    rng = np.random.default_rng(seed)
+    n_tracks = _n_unique_tracks(scale)
+    n_artists = _n_artists(n_tracks)
+    rows_written = 0
+    for start in range(0, n_tracks, CHUNK_ROWS):
+        t = np.arange(start, min(start + CHUNK_ROWS, n_tracks))
+        t = t[rng.random(len(t)) < ARTIST_COVERAGE]
+        a = _artist_of(t, n_artists)
+        chunk = pd.DataFrame({
+            'track_id': _track_ids(t),
+            'artist_id': 'a' + pd.Series(a).map('{:021x}'.format),
+            'artist_name': _artist_names(a),
+            'artist_followers': rng.integers(0, 50_000_000, len(t)),
+            'artist_popularity': rng.integers(0, 100, len(t)),
+            'artist_genres': rng.choice(GENRES, len(t)),
+        })
+        chunk.to_csv(path, index=False, mode='w' if start == 0 else 'a', header=(start == 0))
+        rows_written += len(chunk)
+    return rows_written
+
+
+def write_grammys_dataset(path: str, scale: float, seed: int = 2) -> int:
+    """
+    Escribe un grammys.csv sintético con GRAMMYS_BASE_ROWS * scale filas.
+    Parte de los nominados son canciones o álbumes del dataset de Spotify
+    (con su artista o con otro), para que el merge encuentre coincidencias.
+    """
+    rng = np.random.default_rng(seed)
+    rows = max(1, int(GRAMMYS_BASE_ROWS * scale))
+    n_tracks = _n_unique_tracks(scale)
+    n_artists = _n_artists(n_tracks)
+
+    t = rng.integers(0, n_tracks, rows)
+    kind = rng.random(rows)
+    nominee = _track_names(t).where(kind < 0.5, _album_names(t)).where(kind < 0.8, 'Work ' + pd.Series(np.arange(rows)).astype(str))
+    same_artist = rng.random(rows) < 0.7
+    artist = _artist_names(np.where(same_artist, _artist_of(t, n_artists), rng.integers(0, n_artists, rows)))
+    artist = artist.where(same_artist, artist + ' & Friends')
+
+    df = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'year': rng.integers(1958, 2020, rows),
+        'category': rng.choice(GRAMMY_CATEGORIES, rows),
+        'nominee': _with_nulls(nominee, rng),
+        'artist': artist.where(rng.random(rows) >= 0.05),
+    })
+    df.to_csv(path, index=False)
+    return rows
+
+
+def generate_datasets(data_dir: str, scale: float) -> dict:
+    """Genera los tres datasets de entrada en `data_dir` y retorna sus filas."""
+    os.makedirs(data_dir, exist_ok=True)
+    return {
+        'spotify_dataset.csv': write_spotify_dataset(os.path.join(data_dir, 'spotify_dataset.csv'), scale),
+        'api_artist.csv': write_artist_dataset(os.path.join(data_dir, 'api_artist.csv'), scale),
+        'grammys.csv': write_grammys_dataset(os.path.join(data_dir, 'grammys.csv'), scale),
+    }
@@ -3,7 +3,6 @@ from __future__ import annotations
 import pendulum
 import logging
 import os
-import pandas as pd
 from airflow.decorators import dag, task
 from airflow.exceptions import AirflowSkipException
 
@@ -13,14 +12,21 @@ try:
     from tasks.extract_csv import extract_spotify
     from tasks.transform_data_api import transform_artist_details
     from tasks.transform_db_data import transform_grammys_data
-    from tasks.transform_csv_data import transform_spotify_data
+    from tasks.partitioned_transform import (
+        partition_spotify_data, transform_spotify_partition, combine_spotify_partitions
+    )
     from tasks.merge_data import merge
-    from tasks.store import store_merged_data
-    from tasks.load_to_db import load_to_db
+    from tasks.sinks import publish_merged_data
 except ImportError as e:
     logging.error(f"Error importing tasks: {e}")
     raise
 
+# Procesos de normalización de las tareas que la reparten (tasks/parallel.py).
+# Cada tarea ocupa en su pool tantos slots como procesos usa, así el pool de
+# Airflow limita cuántos núcleos se reservan a la vez.
+MERGE_MAX_WORKERS = int(os.getenv('MERGE_MAX_WORKERS', '4'))
+PARTITION_MAX_WORKERS = int(os.getenv('PARTITION_MAX_WORKERS', '1'))
+
 @dag(
     dag_id='spotify_pipeline',
     schedule=None,
@@ -36,25 +42,30 @@ def spotify_pipeline_dag():
     transformed_artists_df = transform_artist_details(extracted_artists_df)
 
     transformed_grammys_df = transform_grammys_data(extracted_grammys_df)
-    transformed_spotify_df = transform_spotify_data(extracted_spotify_df)
+    # Particiones transformadas en paralelo (una instancia mapeada por partición).
+    spotify_partitions = partition_spotify_data(extracted_spotify_df)
+    transformed_partitions = transform_spotify_partition.override(pool_slots=PARTITION_MAX_WORKERS).partial(
+        max_workers=PARTITION_MAX_WORKERS
+    ).expand(raw_spotify_df=spotify_partitions)
+    transformed_spotify_df = combine_spotify_partitions(transformed_partitions)
 
-    final_merged_df = merge(
+    final_merged_df = merge.override(pool_slots=MERGE_MAX_WORKERS)(
         cleaned_spotify_df=transformed_spotify_df,
         cleaned_artists_df=transformed_artists_df,
-        cleaned_grammys_df=transformed_grammys_df
+        cleaned_grammys_df=transformed_grammys_df,
+        max_workers=MERGE_MAX_WORKERS
     )
 
+    # Una sola codificación del CSV, publicada en PostgreSQL, Drive y disco en paralelo.
     gdrive_file_title = "merged_data.csv"
-    upload_task = store_merged_data(title=gdrive_file_title, df=final_merged_df)
-
-    db_load_task = load_to_db(df_to_load=final_merged_df, if_exists='replace')
+    publish_task = publish_merged_data(df=final_merged_df, title=gdrive_file_title, if_exists='upsert')
 
     [extracted_artists_df >> transformed_artists_df,
      extracted_grammys_df >> transformed_grammys_df,
-     extracted_spotify_df >> transformed_spotify_df]
+     extracted_spotify_df >> spotify_partitions >> transformed_partitions >> transformed_spotify_df]
 
     [transformed_artists_df, transformed_grammys_df, transformed_spotify_df] >> final_merged_df
 
-    final_merged_df >> db_load_task >> upload_task
+    final_merged_df >> publish_task
 
 spotify_pipeline_dag()
\ No newline at end of file
@@ -0,0 +1,205 @@
+# dags/tasks/artifacts.py
+
+import hashlib
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from tasks.telemetry import stage
+
+ARTIFACTS_REL_DIR = 'data/artifacts'
+ARTIFACT_RETENTION_HOURS = float(os.getenv('ARTIFACT_RETENTION_HOURS', '24'))
+_CHECKSUM_CHUNK_BYTES = 1 << 20
+
+
+def _artifacts_dir() -> str:
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    return os.path.join(airflow_home, ARTIFACTS_REL_DIR)
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHECKSUM_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _prune_old_artifacts(directory: str, name: str, keep_path: str) -> None:
+    """Elimina artefactos antiguos con el mismo nombre lógico."""
+    cutoff = time.time() - ARTIFACT_RETENTION_HOURS * 3600
+    for entry in os.scandir(directory):
+        if (entry.name.startswith(f"{name}-") and entry.name.endswith('.arrow')
+                and entry.path != keep_path and entry.stat().st_mtime < cutoff):
+            try:
+                os.remove(entry.path)
+                logging.info(f"Artefacto antiguo eliminado: {entry.path}")
+            except OSError as e:
+                logging.warning(f"No se pudo eliminar el artefacto antiguo '{entry.path}': {e}")
+
+
+def _finalize_artifact(tmp_path: str, name: str, schema: pa.Schema, num_rows: int) -> dict:
+    """Calcula el checksum, mueve el archivo a su ruta final y arma el handle."""
+    directory = os.path.dirname(tmp_path)
+    checksum = _file_checksum(tmp_path)
+    path = os.path.join(directory, f"{name}-{checksum.split(':', 1)[1][:16]}.arrow")
+    os.replace(tmp_path, path)
+    _prune_old_artifacts(directory, name, path)
+
+    handle = {
+        'path': os.path.abspath(path),
+        'format': 'arrow',
+        'schema': {field.name: str(field.type) for field in schema if not field.name.startswith('__')},
+        'num_rows': num_rows,
+        'num_bytes': os.path.getsize(path),
+        'checksum': checksum,
+    }
+    logging.info(f"Artefacto '{name}' escrito: {handle['path']} ({num_rows} filas, {handle['num_bytes']} bytes).")
+    return handle
+
+
+def write_artifact(df, name: str) -> dict:
+    """
+    Escribe el DataFrame (o una tabla Arrow) como archivo Arrow IPC bajo
+    AIRFLOW_HOME/data/artifacts y retorna un handle pequeño (ruta, esquema,
+    filas, checksum) apto para XCom.
+    """
+    with stage('write_artifact', artifact=name) as recorder:
+        directory = _artifacts_dir()
+        os.makedirs(directory, exist_ok=True)
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+
+        tmp_path = os.path.join(directory, f".{name}-{os.getpid()}.arrow.tmp")
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        handle = _finalize_artifact(tmp_path, name, table.schema, table.num_rows)
+        recorder.record(rows_out=handle['num_rows'], bytes_written=handle['num_bytes'])
+    return handle
+
+
+class ArtifactWriter:
+    """
+    Escritor incremental de artefactos Arrow IPC: recibe DataFrames por
+    bloques (con las mismas columnas) y al cerrar retorna el handle.
+    El esquema se fija con el primer bloque.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.num_rows = 0
+        self._directory = _artifacts_dir()
+        os.makedirs(self._directory, exist_ok=True)
+        self._tmp_path = os.path.join(self._directory, f".{name}-{os.getpid()}.arrow.tmp")
+        self._sink = None
+        self._writer = None
+        self._schema = None
+
+    def _schema_for(self, df: pd.DataFrame) -> pa.Schema:
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        # Una columna de texto completamente nula en el primer bloque se tipa como string.
+        for i, field in enumerate(schema):
+            if pa.types.is_null(field.type):
+                schema = schema.set(i, field.with_type(pa.string()))
+        return schema
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._writer is None:
+            self._schema = self._schema_for(df)
+            self._sink = pa.OSFile(self._tmp_path, 'wb')
+            self._writer = ipc.new_file(self._sink, self._schema)
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.num_rows += table.num_rows
+
+    def close(self) -> dict:
+        if self._writer is None:
+            raise ValueError(f"No se escribió ningún bloque en el artefacto '{self.name}'.")
+        self._writer.close()
+        self._sink.close()
+        return _finalize_artifact(self._tmp_path, self.name, self._schema, self.num_rows)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def _is_handle(value) -> bool:
+    return isinstance(value, dict) and {'path', 'checksum', 'num_rows'} <= value.keys()
+
+
+def _open_artifact(handle, columns: list = None, verify: bool = False) -> pa.Table:
+    if not _is_handle(handle):
+        raise ValueError(f"Handle de artefacto no válido: {type(handle)}")
+
+    path = handle['path']
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Artefacto no encontrado: {path}")
+    if verify and _file_checksum(path) != handle['checksum']:
+        raise ValueError(f"Checksum no coincide para el artefacto: {path}")
+
+    # El mapa de memoria no se cierra explícitamente: los buffers de la tabla
+    # lo referencian y se libera cuando dejan de usarse.
+    source = pa.memory_map(path, 'r')
+    table = ipc.open_file(source).read_all()
+    if table.num_rows != handle['num_rows']:
+        raise ValueError(f"El artefacto {path} tiene {table.num_rows} filas, se esperaban {handle['num_rows']}.")
+    if columns is not None:
+        table = table.select(columns)
+    return table
+
+
+def read_artifact_table(handle, columns: list = None, verify: bool = False) -> pa.Table:
+    """Como read_artifact, pero retorna la tabla Arrow (memory-map, sin convertir a pandas)."""
+    with stage('read_artifact', artifact=os.path.basename(handle['path']) if _is_handle(handle) else None) as recorder:
+        table = _open_artifact(handle, columns, verify)
+        recorder.record(rows_out=table.num_rows, bytes_read=table.nbytes)
+    return table
+
+
+def read_artifact(handle, columns: list = None, verify: bool = False) -> pd.DataFrame:
+    """
+    Abre el artefacto con memory-map y lo convierte a DataFrame sin copiar
+    los buffers numéricos. Si recibe directamente un DataFrame, lo retorna.
+    Con verify=True además valida el checksum (lee el archivo completo).
+    """
+    if isinstance(handle, pd.DataFrame):
+        return handle
+    with stage('read_artifact', artifact=os.path.basename(handle['path']) if _is_handle(handle) else None) as recorder:
+        table = _open_artifact(handle, columns, verify)
+        df = table_to_pandas(table)
+        recorder.record(rows_out=len(df), bytes_read=table.nbytes)
+    return df
+
+
+def table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Convierte una tabla Arrow a DataFrame conservando los tipos con los que
+    se escribió (category, string[pyarrow]) y NaN como nulo de texto.
+    """
+    # Las columnas string[pyarrow] se reconstruyen sobre los mismos buffers
+    # Arrow; to_pandas las convertiría a objetos str de Python.
+    pandas_columns = (table.schema.pandas_metadata or {}).get('columns', [])
+    arrow_string_cols = {
+        col['name'] for col in pandas_columns
+        if col.get('numpy_type') == 'string' and col['name'] in table.column_names
+        and pa.types.is_string(table.schema.field(col['name']).type)
+    }
+    df = table.drop(list(arrow_string_cols)).to_pandas(split_blocks=True)
+    for position, name in enumerate(table.column_names):
+        if name in arrow_string_cols:
+            df.insert(position, name, pd.arrays.ArrowStringArray(table.column(name)))
+
+    # Arrow devuelve None para los nulos en columnas de texto; se restaura NaN
+    # como lo tendría el DataFrame original.
+    for col in df.columns[df.dtypes == object]:
+        if df[col].isna().any():
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
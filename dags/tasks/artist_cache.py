@@ -0,0 +1,128 @@
+# dags/tasks/artist_cache.py
+
+import json
+import logging
+import os
+import sqlite3
+import time
+
+ARTIST_CACHE_REL_PATH = 'data/cache/spotify_artists.sqlite'
+# El artista principal de un track casi nunca cambia; seguidores y popularidad sí.
+TRACK_CACHE_TTL_HOURS = float(os.getenv('TRACK_CACHE_TTL_HOURS', str(30 * 24)))
+ARTIST_CACHE_TTL_HOURS = float(os.getenv('ARTIST_CACHE_TTL_HOURS', str(7 * 24)))
+# Ids por consulta IN (...): por debajo del límite de 999 parámetros de SQLite antiguos.
+LOOKUP_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    track_id TEXT PRIMARY KEY,
+    artist_id TEXT,
+    artist_name TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artists (
+    artist_id TEXT PRIMARY KEY,
+    followers INTEGER,
+    popularity INTEGER,
+    genres TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_fetched_at ON tracks (fetched_at);
+CREATE INDEX IF NOT EXISTS artists_fetched_at ON artists (fetched_at);
+"""
+
+
+class ArtistCache:
+    """
+    Caché en disco (SQLite) de metadatos de la API de Spotify: el artista
+    principal por track_id y seguidores/popularidad/géneros por artist_id,
+    cada uno con su fecha de consulta. Las entradas más antiguas que su TTL
+    se tratan como fallos y se vuelven a consultar.
+    """
+
+    def __init__(self, path: str, track_ttl_hours: float = TRACK_CACHE_TTL_HOURS,
+                 artist_ttl_hours: float = ARTIST_CACHE_TTL_HOURS):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.track_ttl_seconds = track_ttl_hours * 3600
+        self.artist_ttl_seconds = artist_ttl_hours * 3600
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def _fresh_rows(self, query: str, ids: list, ttl_seconds: float) -> list:
+        """Filas vigentes de `query` (con ? para el límite de fecha y {ids}) para los ids pedidos."""
+        cutoff = time.time() - ttl_seconds
+        ids = list(dict.fromkeys(ids))
+        rows = []
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            batch = ids[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            rows.extend(self._conn.execute(query.format(ids=placeholders), (cutoff, *batch)).fetchall())
+        return rows
+
+    def get_tracks(self, track_ids: list) -> dict:
+        """Retorna {track_id: registro} para los tracks con entrada vigente."""
+        rows = self._fresh_rows(
+            "SELECT track_id, artist_id, artist_name FROM tracks WHERE fetched_at >= ? AND track_id IN ({ids})",
+            track_ids, self.track_ttl_seconds
+        )
+        return {row[0]: {'track_id': row[0], 'artist_id': row[1], 'artist_name': row[2]} for row in rows}
+
+    def get_artists(self, artist_ids: list) -> dict:
+        """Retorna {artist_id: registro} para los artistas con entrada vigente."""
+        rows = self._fresh_rows(
+            "SELECT artist_id, followers, popularity, genres FROM artists WHERE fetched_at >= ? AND artist_id IN ({ids})",
+            artist_ids, self.artist_ttl_seconds
+        )
+        return {
+            row[0]: {'artist_id': row[0], 'followers': row[1], 'popularity': row[2],
+                     'genres': json.loads(row[3]) if row[3] is not None else None}
+            for row in rows
+        }
+
+    def put_tracks(self, records: list) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracks (track_id, artist_id, artist_name, fetched_at) VALUES (?, ?, ?, ?)",
+                [(r['track_id'], r['artist_id'], r['artist_name'], now) for r in records]
+            )
+
+    def put_artists(self, records: list) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO artists (artist_id, followers, popularity, genres, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                [(r['artist_id'], r['followers'], r['popularity'],
+                  json.dumps(r['genres']) if r.get('genres') is not None else None, now) for r in records]
+            )
+
+    def evict_stale(self) -> int:
+        """Elimina las entradas vencidas que no se refrescaron. Retorna cuántas se borraron."""
+        now = time.time()
+        with self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM tracks WHERE fetched_at < ?", (now - self.track_ttl_seconds,)
+            ).rowcount
+            deleted += self._conn.execute(
+                "DELETE FROM artists WHERE fetched_at < ?", (now - self.artist_ttl_seconds,)
+            ).rowcount
+        return deleted
+
+    def close(self) -> None:
+        evicted = self.evict_stale()
+        self._conn.close()
+        logging.info(f"Caché de artistas '{self.path}' cerrada. Entradas vencidas eliminadas: {evicted}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_artist_cache(cache_rel_path: str = ARTIST_CACHE_REL_PATH) -> ArtistCache:
+    """Abre la caché de artistas bajo AIRFLOW_HOME."""
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    return ArtistCache(os.path.join(airflow_home, cache_rel_path))
@@ -0,0 +1,164 @@
+# dags/tasks/dashboard_tables.py
+
+import logging
+from psycopg2 import sql
+from tasks.telemetry import stage
+
+# Tablas de resumen que consulta el dashboard: (sufijo, columna de grupo,
+# [(columna, agregado SQL)]). Se llaman <tabla>_<sufijo> y tienen una fila por
+# valor de la columna de grupo.
+DASHBOARD_SUMMARIES = (
+    ('by_genre', 'genre_category', [
+        ('track_count', 'count(*)'),
+        ('avg_popularity', 'avg(popularity)'),
+        ('nominated_track_count', 'count(*) FILTER (WHERE has_grammy_nomination)'),
+        ('grammy_nominations', 'sum(track_grammy_nominations + album_grammy_nominations)'),
+    ]),
+    ('by_popularity', 'popularity', [
+        ('track_count', 'count(*)'),
+        ('nominated_track_count', 'count(*) FILTER (WHERE has_grammy_nomination)'),
+        ('track_grammy_nominations', 'sum(track_grammy_nominations)'),
+        ('album_grammy_nominations', 'sum(album_grammy_nominations)'),
+    ]),
+    ('by_artist', 'artist_name', [
+        ('artist_followers', 'max(artist_followers)'),
+        ('artist_popularity', 'max(artist_popularity)'),
+        ('track_count', 'count(*)'),
+        ('nominated_track_count', 'count(*) FILTER (WHERE has_grammy_nomination)'),
+        ('grammy_nominations', 'sum(track_grammy_nominations + album_grammy_nominations)'),
+    ]),
+)
+# Índices adicionales (sufijo de la tabla o None = tabla principal, expresión).
+DASHBOARD_INDEXES = (
+    (None, 'artist_followers DESC'),
+    ('by_artist', 'artist_followers DESC'),
+)
+# Columnas de la tabla principal que necesitan los resúmenes.
+DASHBOARD_COLUMNS = {
+    'genre_category', 'popularity', 'artist_name', 'artist_followers', 'artist_popularity',
+    'has_grammy_nomination', 'track_grammy_nominations', 'album_grammy_nominations',
+}
+DASHBOARD_KEY_COLUMNS = [key for _, key, _ in DASHBOARD_SUMMARIES]
+AFFECTED_TABLE = 'dashboard_affected_keys'
+
+
+def _summary_name(table_name: str, suffix: str) -> str:
+    return f"{table_name}_{suffix}"
+
+
+def _index_name(table_name: str, expression: str) -> str:
+    column = expression.split()[0]
+    return f"{table_name}_{column}_idx"
+
+
+def _table_exists(cursor, schema_name: str, table_name: str) -> bool:
+    cursor.execute("SELECT 1 FROM pg_tables WHERE schemaname = %s AND tablename = %s", (schema_name, table_name))
+    return cursor.fetchone() is not None
+
+
+def _aggregate_query(target, key: str, aggregates: list, where=None):
+    select = sql.SQL(', ').join(
+        [sql.Identifier(key)] + [sql.SQL("{} AS {}").format(sql.SQL(expr), sql.Identifier(col)) for col, expr in aggregates]
+    )
+    return sql.SQL("SELECT {select} FROM {target}{where} GROUP BY {key}").format(
+        select=select, target=target, key=sql.Identifier(key),
+        where=sql.SQL(' WHERE ') + where if where is not None else sql.SQL('')
+    )
+
+
+def _affected_filter(key: str):
+    """Filas cuya clave está en AFFECTED_TABLE (NULL incluido, que IN no compara)."""
+    return sql.SQL(
+        "({key} IN (SELECT {key} FROM pg_temp.{affected}) OR ({key} IS NULL AND "
+        "EXISTS (SELECT 1 FROM pg_temp.{affected} WHERE {key} IS NULL)))"
+    ).format(key=sql.Identifier(key), affected=sql.Identifier(AFFECTED_TABLE))
+
+
+def _create_affected_table(cursor, target) -> None:
+    keys = sql.SQL(', ').join(sql.Identifier(key) for key in DASHBOARD_KEY_COLUMNS)
+    cursor.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+        sql.Identifier(AFFECTED_TABLE), keys, target))
+
+
+def supports_dashboard(columns) -> bool:
+    return DASHBOARD_COLUMNS <= set(columns)
+
+
+def ensure_dashboard_tables(cursor, schema_name: str, table_name: str) -> set:
+    """
+    Crea (si faltan) los índices del dashboard sobre la tabla principal y las
+    tablas de resumen con su índice único por clave. Retorna los sufijos de
+    los resúmenes recién creados, que hay que poblar completos.
+    """
+    target = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(table_name))
+    for key in DASHBOARD_KEY_COLUMNS:
+        cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({})").format(
+            sql.Identifier(_index_name(table_name, key)), target, sql.Identifier(key)))
+
+    created = set()
+    for suffix, key, aggregates in DASHBOARD_SUMMARIES:
+        summary_name = _summary_name(table_name, suffix)
+        if not _table_exists(cursor, schema_name, summary_name):
+            summary = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(summary_name))
+            cursor.execute(sql.SQL("CREATE TABLE {} AS {} WITH NO DATA").format(
+                summary, _aggregate_query(target, key, aggregates)))
+            cursor.execute(sql.SQL("CREATE UNIQUE INDEX {} ON {} ({})").format(
+                sql.Identifier(_index_name(summary_name, key)), summary, sql.Identifier(key)))
+            created.add(suffix)
+
+    for suffix, expression in DASHBOARD_INDEXES:
+        index_table = _summary_name(table_name, suffix) if suffix else table_name
+        cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {}.{} ({})").format(
+            sql.Identifier(_index_name(index_table, expression)), sql.Identifier(schema_name),
+            sql.Identifier(index_table), sql.SQL(expression)))
+    return created
+
+
+def capture_affected_keys(cursor, schema_name: str, table_name: str, source, where=None, params=None) -> None:
+    """
+    Agrega a la tabla temporal AFFECTED_TABLE las claves de grupo de las
+    filas de `source` (que cumplen `where`). Se llama con las filas antiguas
+    antes de modificarlas y con las nuevas después.
+    """
+    _create_affected_table(cursor, sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(table_name)))
+    keys = sql.SQL(', ').join(sql.Identifier(key) for key in DASHBOARD_KEY_COLUMNS)
+    cursor.execute(sql.SQL("INSERT INTO pg_temp.{} SELECT {} FROM {}{}").format(
+        sql.Identifier(AFFECTED_TABLE), keys, source,
+        sql.SQL(' WHERE ') + where if where is not None else sql.SQL('')), params)
+
+
+def refresh_dashboard_tables(cursor, schema_name: str, table_name: str, incremental: bool = False) -> dict:
+    """
+    Recalcula las tablas de resumen desde la tabla principal. Con
+    incremental=True solo rehace los grupos cuyas claves están en
+    AFFECTED_TABLE (ver capture_affected_keys); los resúmenes recién creados
+    siempre se pueblan completos. No hace commit: se ejecuta en la
+    transacción de la carga. Retorna los grupos reescritos por resumen.
+    """
+    target = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(table_name))
+    with stage('refresh_dashboard_tables', table=f"{schema_name}.{table_name}", incremental=incremental) as recorder:
+        created = ensure_dashboard_tables(cursor, schema_name, table_name)
+        if incremental:
+            # Sin filas modificadas la tabla de claves queda vacía y no se reescribe nada.
+            _create_affected_table(cursor, target)
+        refreshed = {}
+        for suffix, key, aggregates in DASHBOARD_SUMMARIES:
+            summary_name = _summary_name(table_name, suffix)
+            summary = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(summary_name))
+            partial = incremental and suffix not in created
+            if partial:
+                cursor.execute(sql.SQL("DELETE FROM {} WHERE {}").format(summary, _affected_filter(key)))
+                query = _aggregate_query(target, key, aggregates, _affected_filter(key))
+            else:
+                cursor.execute(sql.SQL("DELETE FROM {}").format(summary))
+                query = _aggregate_query(target, key, aggregates)
+            cursor.execute(sql.SQL("INSERT INTO {} {}").format(summary, query))
+            refreshed[summary_name] = cursor.rowcount
+            recorder.record(**{f"{suffix}_groups": cursor.rowcount, f"{suffix}_full": not partial})
+        if incremental:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS pg_temp.{}").format(sql.Identifier(AFFECTED_TABLE)))
+    logging.info(
+        f"Tablas del dashboard de '{schema_name}.{table_name}' actualizadas "
+        f"({'incremental' if incremental else 'completa'}) en {recorder.metrics['wall_seconds']:.2f}s: {refreshed}"
+    )
+    return refreshed
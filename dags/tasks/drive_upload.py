@@ -0,0 +1,233 @@
+# dags/tasks/drive_upload.py
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import pyarrow as pa
+import requests
+
+# Endpoint de la API de Drive; se puede apuntar a un servidor local de pruebas.
+DRIVE_API_ENDPOINT = os.getenv('DRIVE_API_ENDPOINT', 'https://www.googleapis.com')
+# Drive exige bloques múltiplos de 256 KiB (salvo el último).
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_MB = 8
+REQUEST_TIMEOUT_SECONDS = 120
+MAX_CHUNK_RETRIES = 5
+# Espera base entre reintentos de un bloque (se duplica en cada intento).
+RETRY_BACKOFF_SECONDS = 1.0
+UPLOAD_STATE_REL_DIR = 'data/drive_uploads'
+# Propiedad de la app en el archivo de Drive con el hash del contenido subido.
+CONTENT_HASH_PROPERTY = 'content_sha256'
+COMPRESSIONS = {
+    'none': ('', 'text/csv'),
+    'gzip': ('.gz', 'application/gzip'),
+    'zstd': ('.zst', 'application/zstd'),
+}
+
+
+class DriveUploadError(Exception):
+    pass
+
+
+def write_csv(df, path: str, compression: str = 'none', chunk_rows: int = 100_000) -> str:
+    """
+    Escribe el DataFrame como CSV en disco (por bloques de filas),
+    comprimido en streaming con gzip o zstd si se pide. Retorna el sha256
+    del archivo escrito.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compresión no soportada: '{compression}'. Use una de {list(COMPRESSIONS)}.")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Hilo incluido: varias subidas concurrentes del mismo proceso no comparten temporal.
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with pa.output_stream(tmp_path, compression=None if compression == 'none' else compression) as raw:
+        with io.TextIOWrapper(raw, encoding='utf-8', newline='') as text:
+            df.to_csv(text, index=False, chunksize=chunk_rows)
+    os.replace(tmp_path, path)
+    return file_sha256(path)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DriveUploader:
+    """
+    Subidas a Drive (API v3) por sesiones reanudables: el archivo se envía
+    desde disco en bloques de `chunk_size_mb`, y si un bloque falla se
+    consulta a Drive cuántos bytes recibió y se continúa desde ahí. La URI
+    de la sesión se guarda en `state_dir`, así un reintento de la tarea
+    retoma la misma subida. Si ya existe un archivo con el mismo título en
+    la carpeta se actualiza en lugar de crear otro, y si su hash coincide con
+    el del archivo local no se sube nada.
+
+    `token_provider(force_refresh=False)` retorna el access token de OAuth.
+    """
+
+    def __init__(self, token_provider, endpoint: str = DRIVE_API_ENDPOINT,
+                 chunk_size_mb: float = DEFAULT_CHUNK_MB, state_dir: str = None, session=None):
+        self.token_provider = token_provider
+        self.endpoint = endpoint.rstrip('/')
+        self.chunk_size = max(CHUNK_ALIGNMENT, int(chunk_size_mb * 1024 * 1024) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT)
+        self.state_dir = state_dir or os.path.join(os.getenv('AIRFLOW_HOME', '.'), UPLOAD_STATE_REL_DIR)
+        self.session = session or requests.Session()
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Petición autenticada; ante un 401 renueva el token una vez."""
+        headers = kwargs.pop('headers', {})
+        for attempt in range(2):
+            headers['Authorization'] = f"Bearer {self.token_provider(force_refresh=attempt > 0)}"
+            response = self.session.request(method, url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS, **kwargs)
+            if response.status_code != 401:
+                return response
+            logging.info("Drive respondió 401; se renueva el token de acceso.")
+        return response
+
+    def find_file(self, title: str, folder_id: str = None):
+        """Retorna el archivo (id, name, appProperties) con ese título en la carpeta, o None."""
+        escaped = title.replace('\\', '\\\\').replace("'", "\\'")
+        query = f"name = '{escaped}' and trashed = false"
+        if folder_id:
+            query += f" and '{folder_id}' in parents"
+        response = self._request('GET', f"{self.endpoint}/drive/v3/files", params={
+            'q': query, 'fields': 'files(id, name, appProperties, modifiedTime)', 'orderBy': 'modifiedTime desc'
+        })
+        if response.status_code != 200:
+            raise DriveUploadError(f"No se pudo buscar '{title}' en Drive ({response.status_code}): {response.text[:200]}")
+        files = response.json().get('files', [])
+        if len(files) > 1:
+            logging.warning(f"Hay {len(files)} archivos '{title}' en la carpeta; se actualiza el más reciente ({files[0]['id']}).")
+        return files[0] if files else None
+
+    def upload(self, path: str, title: str, folder_id: str = None, mime_type: str = 'text/csv',
+               content_hash: str = None) -> dict:
+        """
+        Sube `path` con el título dado. Retorna {'id', 'action', 'bytes'}
+        donde action es 'created', 'updated' o 'skipped'.
+        """
+        content_hash = content_hash or file_sha256(path)
+        total = os.path.getsize(path)
+        existing = self.find_file(title, folder_id)
+        if existing and (existing.get('appProperties') or {}).get(CONTENT_HASH_PROPERTY) == content_hash:
+            logging.info(f"'{title}' no cambió (sha256 {content_hash[:12]}); se omite la subida.")
+            return {'id': existing['id'], 'action': 'skipped', 'bytes': 0}
+
+        destination = hashlib.sha256(f"{folder_id}/{title}".encode('utf-8')).hexdigest()[:16]
+        state_path = os.path.join(self.state_dir, f"{destination}-{content_hash[:16]}.json")
+        state = self._load_state(state_path, total)
+        if state is None:
+            metadata = {'name': title, 'mimeType': mime_type, 'appProperties': {CONTENT_HASH_PROPERTY: content_hash}}
+            if existing:
+                url = f"{self.endpoint}/upload/drive/v3/files/{existing['id']}?uploadType=resumable"
+                method = 'PATCH'
+            else:
+                if folder_id:
+                    metadata['parents'] = [folder_id]
+                url = f"{self.endpoint}/upload/drive/v3/files?uploadType=resumable"
+                method = 'POST'
+            response = self._request(method, url, json=metadata, headers={
+                'X-Upload-Content-Type': mime_type, 'X-Upload-Content-Length': str(total)
+            })
+            if response.status_code != 200 or 'Location' not in response.headers:
+                raise DriveUploadError(f"No se pudo iniciar la subida de '{title}' ({response.status_code}): {response.text[:200]}")
+            state = {'session_uri': response.headers['Location'], 'total': total,
+                     'action': 'updated' if existing else 'created'}
+            self._save_state(state_path, state)
+            logging.info(f"Sesión de subida reanudable iniciada para '{title}' ({total} bytes).")
+        else:
+            logging.info(f"Reanudando la subida pendiente de '{title}'.")
+
+        result = self._send(path, state)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return {'id': result['id'], 'action': state['action'], 'bytes': total}
+
+    def _send(self, path: str, state: dict) -> dict:
+        total, session_uri = state['total'], state['session_uri']
+        offset = self._confirmed_offset(session_uri, total)
+        if isinstance(offset, dict):  # la subida ya había terminado
+            return offset
+        retries = 0
+        with open(path, 'rb') as f:
+            while True:
+                f.seek(offset)
+                chunk = f.read(self.chunk_size)
+                end = offset + len(chunk) - 1
+                content_range = f"bytes {offset}-{end}/{total}" if chunk else f"bytes */{total}"
+                try:
+                    response = self._request('PUT', session_uri, data=chunk, headers={'Content-Range': content_range})
+                except requests.RequestException as e:
+                    response = None
+                    error = e
+                if response is not None and response.status_code in (200, 201):
+                    return response.json()
+                if response is not None and response.status_code == 308 and _next_offset(response) > offset:
+                    offset = _next_offset(response)
+                    retries = 0
+                    logging.info(f"Subidos {offset}/{total} bytes.")
+                    continue
+                if response is not None and response.status_code in (404, 410):
+                    raise DriveUploadError("La sesión de subida expiró; se reiniciará en el próximo intento.")
+                if response is not None and response.status_code not in (308, 429) and response.status_code < 500:
+                    raise DriveUploadError(f"Drive rechazó el bloque ({response.status_code}): {response.text[:200]}")
+                retries += 1
+                if retries > MAX_CHUNK_RETRIES:
+                    raise DriveUploadError(f"El bloque en el byte {offset} falló {MAX_CHUNK_RETRIES} veces.")
+                logging.warning(
+                    f"Falló el bloque en el byte {offset} "
+                    f"({response.status_code if response is not None else error}); se consulta el estado de la sesión."
+                )
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (retries - 1))
+                try:
+                    confirmed = self._confirmed_offset(session_uri, total)
+                except requests.RequestException as e:
+                    # Se reenvía desde el último byte confirmado; el reenvío consume el mismo presupuesto de reintentos.
+                    logging.warning(f"No se pudo consultar el estado de la sesión ({e}); se reenvía desde el byte {offset}.")
+                    continue
+                if isinstance(confirmed, dict):
+                    return confirmed
+                offset = confirmed
+
+    def _confirmed_offset(self, session_uri: str, total: int):
+        """Bytes que Drive ya recibió en la sesión (o el archivo, si la subida terminó)."""
+        response = self._request('PUT', session_uri, headers={'Content-Range': f"bytes */{total}"})
+        if response.status_code in (200, 201):
+            return response.json()
+        if response.status_code == 308:
+            return _next_offset(response)
+        if response.status_code in (404, 410):
+            raise DriveUploadError("La sesión de subida expiró; se reiniciará en el próximo intento.")
+        raise DriveUploadError(f"No se pudo consultar la sesión de subida ({response.status_code}): {response.text[:200]}")
+
+    def _load_state(self, state_path: str, total: int):
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path) as f:
+            state = json.load(f)
+        try:
+            if state.get('total') == total:
+                self._confirmed_offset(state['session_uri'], total)
+                return state
+        except DriveUploadError as e:
+            logging.info(f"No se puede reanudar la subida anterior: {e}")
+        os.remove(state_path)
+        return None
+
+    def _save_state(self, state_path: str, state: dict) -> None:
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(state_path, 'w') as f:
+            json.dump(state, f)
+
+
+def _next_offset(response: requests.Response) -> int:
+    # Range: bytes=0-N indica que Drive tiene los bytes hasta N inclusive.
+    received = response.headers.get('Range')
+    return int(received.rsplit('-', 1)[1]) + 1 if received else 0
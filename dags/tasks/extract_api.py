@@ -1,16 +1,62 @@
 # dags/tasks/extract_api.py
-import pandas as pd
 from airflow.decorators import task
 import os
 import logging 
+from tasks.extract_csv import SPOTIFY_CSV_REL_PATH
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import airflow_paths, cached_task
 
 ARTIST_DETAILS_CSV_REL_PATH = 'data/api_artist.csv'
+# Columnas (y tipos Arrow) del CSV de artistas que usa transform_artist_details.
+# Los contadores se leen como float64 (si hubo nulos vienen como '123.0'); la
+# transformación los pasa a enteros.
+ARTISTS_RAW_DTYPES = {
+    'track_id': 'string',
+    'artist_id': 'string',
+    'artist_name': 'string',
+    'artist_followers': 'float64',
+    'artist_popularity': 'float64',
+    'artist_genres': 'string',
+}
+# El CSV pre-extraído por notebooks/api_spotify_003.ipynb no trae géneros:
+# solo la extracción por API los agrega.
+ARTISTS_OPTIONAL_COLUMNS = ('artist_genres',)
+
 @task(task_id="extract_artist_details") 
-def extract_artist(artist_details_csv_rel_path: str = ARTIST_DETAILS_CSV_REL_PATH) -> pd.DataFrame:
+@traced_task
+# Con use_api=True los datos vienen de la API (con su propia caché): no se reutilizan.
+@cached_task(inputs=airflow_paths('artist_details_csv_rel_path'), enabled=lambda params: not params['use_api'])
+def extract_artist(artist_details_csv_rel_path: str = ARTIST_DETAILS_CSV_REL_PATH, use_api: bool = False,
+                   spotify_csv_rel_path: str = SPOTIFY_CSV_REL_PATH, max_workers: int = None,
+                   dtypes: dict = ARTISTS_RAW_DTYPES) -> dict:
+    """
+    Retorna los detalles de artista por track. Por defecto lee el CSV
+    pre-extraído; con use_api=True lo regenera consultando la API de Spotify,
+    sirviendo primero desde la caché de artistas y consultando solo las
+    entradas faltantes o vencidas (con `max_workers` hilos; por defecto
+    MAX_WORKERS de extract_spotify_api). El CSV se lee con el lector
+    multihilo de pyarrow, solo las columnas de `dtypes` y con esos tipos
+    (dtypes=None lee todas, infiriendo los tipos); las de
+    ARTISTS_OPTIONAL_COLUMNS se omiten si el CSV no las tiene.
+    """
+    from tasks.artifacts import write_artifact
 
     airflow_home = os.getenv('AIRFLOW_HOME', '.')
     absolute_csv_path = os.path.join(airflow_home, artist_details_csv_rel_path)
 
+    if use_api:
+        from tasks.extract_spotify_api import MAX_WORKERS, enrich_artist_details
+        try:
+            df_artists = enrich_artist_details(
+                os.path.join(airflow_home, spotify_csv_rel_path),
+                absolute_csv_path,
+                max_workers=max_workers or MAX_WORKERS
+            )
+            return write_artifact(df_artists, 'artists_raw')
+        except Exception as e:
+            logging.error(f"Error durante la extracción de artistas desde la API de Spotify: {e}", exc_info=True)
+            raise
+
     logging.info(f"Leyendo detalles de artistas pre-extraídos desde: {absolute_csv_path}")
 
     try:
@@ -18,18 +64,18 @@ def extract_artist(artist_details_csv_rel_path: str = ARTIST_DETAILS_CSV_REL_PAT
              logging.error(f"Archivo CSV de detalles de artista no encontrado en: {absolute_csv_path}")
              raise FileNotFoundError(f"Archivo no encontrado: {absolute_csv_path}")
 
-        # Leer el CSV
-        df_artists = pd.read_csv(absolute_csv_path)
-        logging.info(f"Lectura de CSV de detalles de artista completada. {len(df_artists)} filas leídas.")
+        # Leer el CSV (solo las columnas de `dtypes`: si falta alguna obligatoria, falla la lectura)
+        from tasks.storage import read_csv_table
+        with stage('read_csv', bytes_read=os.path.getsize(absolute_csv_path)) as recorder:
+            table_artists = read_csv_table(absolute_csv_path, dtypes, optional_columns=ARTISTS_OPTIONAL_COLUMNS)
+            recorder.record(rows_out=table_artists.num_rows, columns=table_artists.num_columns)
+        logging.info(f"Lectura de CSV de detalles de artista completada. {table_artists.num_rows} filas leídas "
+                     f"({table_artists.num_columns} columnas, {table_artists.nbytes / (1024 * 1024):.1f} MB).")
 
-        if df_artists.empty:
+        if table_artists.num_rows == 0:
             logging.warning(f"El archivo CSV '{absolute_csv_path}' está vacío.")
-        
-        expected_cols = ['artist_id', 'artist_name', 'followers', 'popularity', 'genres']
-        if not all(col in df_artists.columns for col in expected_cols):
-            logging.warning(f"Al CSV {absolute_csv_path} le faltan columnas esperadas. Columnas encontradas: {df_artists.columns.tolist()}")
 
-        return df_artists
+        return write_artifact(table_artists, 'artists_raw')
 
     except Exception as e:
         logging.error(f"Error durante la lectura del CSV de detalles de artista: {e}")
@@ -1,14 +1,39 @@
 # dags/tasks/extract_csv.py
 
-import pandas as pd
 from airflow.decorators import task
 import os
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import airflow_paths, cached_task
 
 
 SPOTIFY_CSV_REL_PATH = 'data/spotify_dataset.csv'
+# Columnas (y tipos Arrow) que usan las tareas siguientes; las demás del CSV
+# (COLS_TO_DROP de transform_csv_data) no se parsean.
+SPOTIFY_RAW_DTYPES = {
+    'track_id': 'string',
+    'artists': 'string',
+    'album_name': 'string',
+    'track_name': 'string',
+    'popularity': 'int64',
+    'duration_ms': 'int64',
+    'explicit': 'bool',
+    'danceability': 'float64',
+    'energy': 'float64',
+    'track_genre': 'string',
+}
 
 @task(task_id="extract_spotify_dataset_from_csv")
-def extract_spotify(csv_rel_path: str = SPOTIFY_CSV_REL_PATH) -> pd.DataFrame:
+@traced_task
+@cached_task(inputs=airflow_paths('csv_rel_path'))
+def extract_spotify(csv_rel_path: str = SPOTIFY_CSV_REL_PATH, dtypes: dict = SPOTIFY_RAW_DTYPES) -> dict:
+    """
+    Lee el CSV de Spotify con el lector multihilo de pyarrow, solo las
+    columnas de `dtypes` y con esos tipos (dtypes=None lee todas, infiriendo
+    los tipos), y escribe la tabla Arrow como artefacto sin pasar por pandas.
+    """
+    from tasks.artifacts import write_artifact
+    from tasks.storage import read_csv_table
+
     airflow_home = os.getenv('AIRFLOW_HOME', '.')
     absolute_csv_path = os.path.join(airflow_home, csv_rel_path)
 
@@ -18,13 +43,16 @@ def extract_spotify(csv_rel_path: str = SPOTIFY_CSV_REL_PATH) -> pd.DataFrame:
         if not os.path.exists(absolute_csv_path):
              raise FileNotFoundError(f"Archivo CSV no encontrado en: {absolute_csv_path}")
 
-        df_spotify = pd.read_csv(absolute_csv_path)
-        print(f"Extracción de CSV completada. {len(df_spotify)} filas leídas.")
+        with stage('read_csv', bytes_read=os.path.getsize(absolute_csv_path)) as recorder:
+            table_spotify = read_csv_table(absolute_csv_path, dtypes)
+            recorder.record(rows_out=table_spotify.num_rows, columns=table_spotify.num_columns)
+        print(f"Extracción de CSV completada. {table_spotify.num_rows} filas leídas "
+              f"({table_spotify.num_columns} columnas, {table_spotify.nbytes / (1024 * 1024):.1f} MB).")
 
-        if df_spotify.empty:
+        if table_spotify.num_rows == 0:
             print(f"Advertencia: El archivo CSV '{absolute_csv_path}' parece estar vacío.")
 
-        return df_spotify
+        return write_artifact(table_spotify, 'spotify_raw')
 
     except Exception as e:
         print(f"Error durante la extracción del CSV: {e}")
@@ -1,70 +1,148 @@
 # dags/tasks/extract_grammys_db.py
 
-import pandas as pd
-import sqlalchemy as sa
 from airflow.decorators import task
 import sys
 import os
 import logging
-
-module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
-if module_path not in sys.path:
-    print(f"Añadiendo al PYTHONPATH para importación: {module_path}")
-    sys.path.append(module_path)
-else:
-    print(f"Ruta {module_path} ya está en PYTHONPATH.")
-
-try:
-    from database.db_connection import get_connection
-    print("Importación de get_connection exitosa.")
-except ImportError as e:
-     print(f"Error importando get_connection: {e}")
-     print("Verifica que la carpeta 'database' y 'db_connection.py' existan en la raíz del proyecto.")
-     raise
+from tasks.telemetry import stage, traced_task
 
 TABLE_NAME = 'grammy_awards'
 SCHEMA_NAME = 'grammys'
-DATABASE_URL = "postgresql://" 
-OUTPUT_CSV_REL_PATH = 'data/grammys.csv'
+OUTPUT_REL_PATH = 'data/grammys.parquet'
+WATERMARK_COLUMN = 'year'
+# Raíz del proyecto, donde está el paquete `database`.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
 
-@task(task_id="extract_grammys")
-def extract_grammys(schema: str = SCHEMA_NAME, table: str = TABLE_NAME, output_rel_path: str = OUTPUT_CSV_REL_PATH) -> str:
+
+def _database_pool():
     """
-    Extrae datos de la tabla de Grammys y los guarda en un archivo CSV.
-    Retorna la ruta absoluta del archivo CSV creado.
+    Importa database.pool (SQLAlchemy y psycopg2) y carga env/.env. Se llama
+    al ejecutar la tarea, no al parsear el DAG.
     """
-    logging.info(f"Iniciando extracción de datos de la tabla '{schema}.{table}'...")
-    engine = None
+    if PROJECT_ROOT not in sys.path:
+        sys.path.append(PROJECT_ROOT)
     try:
-        engine = sa.create_engine(DATABASE_URL, creator=get_connection, echo=False)
-        logging.info("Conexión a la base de datos establecida via SQLAlchemy engine.")
+        from database import db_connection, pool
+    except ImportError as e:
+        logging.error(f"Error importando database.pool: {e}. Verifica que la carpeta 'database' "
+                      f"con 'db_connection.py' y 'pool.py' exista en {PROJECT_ROOT}.")
+        raise
+    db_connection.load_env()
+    return pool
 
-        df_grammys = pd.read_sql_table(table, engine, schema=schema)
 
-        if df_grammys.empty:
-            logging.warning(f"Advertencia: No se encontraron datos en la tabla '{schema}.{table}'.")
-        else:
-            logging.info(f"Extracción de datos de Grammys completada. {len(df_grammys)} registros obtenidos.")
+def _copy_table_to_file(engine, schema: str, table: str, since, output_file) -> None:
+    """Vuelca la tabla con COPY ... TO STDOUT directamente al archivo, sin pasar por memoria."""
+    from psycopg2 import sql
+
+    query = sql.SQL("SELECT * FROM {}.{}").format(sql.Identifier(schema), sql.Identifier(table))
+    if since is not None:
+        query = sql.SQL("{} WHERE {} >= {}").format(query, sql.Identifier(WATERMARK_COLUMN), sql.Literal(int(since)))
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        copy_stmt = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER true)").format(query).as_string(cursor)
+        cursor.copy_expert(copy_stmt, output_file)
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+
+def _write_previous_rows(previous_path: str, writer, since: int, columns: list) -> int:
+    """
+    Copia al writer (un IntermediateWriter), por row groups, las filas del
+    Parquet previo con año < since. Retorna el número de filas conservadas.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    previous = pq.ParquetFile(previous_path)
+    if previous.schema_arrow.names != columns:
+        raise ValueError(f"Las columnas del Parquet previo {previous.schema_arrow.names} no coinciden con las de la tabla {columns}.")
+    kept = 0
+    for batch in previous.iter_batches():
+        batch = batch.filter(pc.less(batch.column(WATERMARK_COLUMN), since))
+        if batch.num_rows:
+            writer.write(batch)
+            kept += batch.num_rows
+    return kept
+
+
+@task(task_id="extract_grammys")
+@traced_task
+def extract_grammys(schema: str = SCHEMA_NAME, table: str = TABLE_NAME, output_rel_path: str = OUTPUT_REL_PATH,
+                    since=None) -> str:
+    """
+    Extrae datos de la tabla de Grammys y los guarda como Parquet (y como
+    CSV si EXPORT_CSV_INTERMEDIATES=true). Retorna la ruta absoluta del Parquet.
+
+    Los datos se transmiten con COPY ... TO STDOUT a un CSV temporal que se
+    convierte a Parquet por bloques, por lo que la memoria no crece con el
+    tamaño de la tabla. Con `since` (un año, o 'auto' para usar el año
+    máximo del Parquet existente según sus estadísticas) solo se extraen las
+    filas con year >= since y se combinan con las anteriores del Parquet previo.
+    """
+    import pyarrow.parquet as pq
+    from tasks.storage import IntermediateWriter, column_max, open_csv_reader, parquet_path_for
+
+    pool = _database_pool()
+    logging.info(f"Iniciando extracción de datos de la tabla '{schema}.{table}'...")
+    try:
+        engine = pool.get_engine()
+        logging.info("Usando el pool de conexiones compartido (SQLAlchemy QueuePool).")
 
         airflow_home = os.getenv('AIRFLOW_HOME', '.')
-        absolute_output_path = os.path.join(airflow_home, output_rel_path)
+        absolute_output_path = parquet_path_for(os.path.join(airflow_home, output_rel_path))
         output_dir = os.path.dirname(absolute_output_path)
 
         os.makedirs(output_dir, exist_ok=True)
         logging.info(f"Asegurando que el directorio de salida exista: {output_dir}")
 
-        df_grammys.to_csv(absolute_output_path, index=False)
+        if since == 'auto':
+            since = column_max(absolute_output_path, WATERMARK_COLUMN)
+            logging.info(f"Marca de agua leída de las estadísticas del Parquet existente: {since}")
+        incremental = since is not None and os.path.exists(absolute_output_path)
+        if since is not None:
+            logging.info(f"Extrayendo solo registros con {WATERMARK_COLUMN} >= {since}.")
+
+        staging_path = f"{absolute_output_path}.{os.getpid()}.copy.csv"
+        writer = IntermediateWriter(absolute_output_path)
+        try:
+            with stage('copy_to_stdout', table=f"{schema}.{table}") as recorder:
+                with open(staging_path, 'w', encoding='utf-8', newline='') as f:
+                    _copy_table_to_file(engine, schema, table, since, f)
+                recorder.record(bytes_read=os.path.getsize(staging_path))
+
+            with stage('convert_to_parquet') as recorder:
+                reader = open_csv_reader(staging_path)
+                if incremental:
+                    kept = _write_previous_rows(absolute_output_path, writer, int(since), reader.schema.names)
+                    logging.info(f"{kept} registros anteriores a {since} conservados del Parquet previo.")
+                for batch in reader:
+                    writer.write(batch)
+                if writer.schema is None:
+                    # La consulta no devolvió filas: se guarda un Parquet vacío con sus columnas.
+                    writer.write(reader.schema.empty_table())
+                writer.close()
+                recorder.record(rows_out=writer.num_rows, bytes_written=os.path.getsize(absolute_output_path))
+        except Exception:
+            writer.abort()
+            raise
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+
+        n_records = pq.ParquetFile(absolute_output_path).metadata.num_rows
+        if n_records <= 0:
+            logging.warning(f"Advertencia: No se encontraron datos en la tabla '{schema}.{table}'.")
+        else:
+            logging.info(f"Extracción de datos de Grammys completada. {n_records} registros en el Parquet.")
         logging.info(f"Datos de Grammys guardados exitosamente en: {absolute_output_path}")
 
         return absolute_output_path
 
-    except ImportError:
-         logging.error("Error crítico: No se pudo importar la función get_connection.")
-         raise
     except Exception as e:
         logging.error(f"Error durante la extracción de datos de la base de datos: {e}", exc_info=True)
         raise
     finally:
-        if engine:
-            engine.dispose()
-            logging.info("Engine de SQLAlchemy desechado.")
\ No newline at end of file
+        pool.log_pool_metrics()
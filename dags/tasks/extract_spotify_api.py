@@ -0,0 +1,327 @@
+# dags/tasks/extract_spotify_api.py
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import pandas as pd
+import requests
+from tasks.artist_cache import ArtistCache, open_artist_cache
+from tasks.telemetry import stage
+
+SPOTIFY_API_URL = 'https://api.spotify.com/v1'
+SPOTIFY_TOKEN_URL = 'https://accounts.spotify.com/api/token'
+TRACK_ID_COLUMN = 'track_id'
+BATCH_SIZE = 50  # máximo de ids por llamada en /tracks y /artists
+MAX_WORKERS = 8
+MAX_RETRIES = 6
+REQUEST_TIMEOUT_SECONDS = 15
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+CHECKPOINT_REL_DIR = 'data/checkpoints/spotify_api'
+OUTPUT_COLUMNS = ['track_id', 'artist_id', 'artist_name', 'artist_followers', 'artist_popularity', 'artist_genres']
+
+
+def _retry_after_seconds(value) -> float:
+    """
+    Segundos a esperar según Retry-After, que puede ser un número de segundos
+    o una fecha HTTP (RFC 9110). Sin cabecera o con un valor inválido se usa
+    DEFAULT_RETRY_AFTER_SECONDS.
+    """
+    if value is None:
+        return DEFAULT_RETRY_AFTER_SECONDS
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logging.warning(f"Cabecera Retry-After no válida: {value!r}.")
+        return DEFAULT_RETRY_AFTER_SECONDS
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class SpotifyClient:
+    """
+    Cliente mínimo de la Web API de Spotify (client credentials), seguro para
+    usar desde varios hilos. Ante un 429 todos los hilos esperan lo indicado
+    por la cabecera Retry-After en lugar de pausas fijas.
+    """
+
+    def __init__(self, client_id: str, client_secret: str,
+                 api_url: str = SPOTIFY_API_URL, token_url: str = SPOTIFY_TOKEN_URL,
+                 timeout: float = REQUEST_TIMEOUT_SECONDS):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip('/')
+        self.token_url = token_url
+        self.timeout = timeout
+        self.requests_made = 0
+        self.rate_limited = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._token = None
+        self._token_expires_at = 0.0
+        self._paused_until = 0.0
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _access_token(self, force_refresh: bool = False) -> str:
+        with self._lock:
+            if force_refresh or self._token is None or time.monotonic() >= self._token_expires_at:
+                response = self._session().post(
+                    self.token_url,
+                    data={'grant_type': 'client_credentials'},
+                    auth=(self.client_id, self.client_secret),
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                payload = response.json()
+                self._token = payload['access_token']
+                # Se renueva un minuto antes de que expire.
+                self._token_expires_at = time.monotonic() + max(int(payload.get('expires_in', 3600)) - 60, 0)
+            return self._token
+
+    def _wait_for_rate_limit(self) -> None:
+        with self._lock:
+            delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.rate_limited += 1
+
+    def get(self, path: str, params: dict = None) -> dict:
+        """GET con reintentos: respeta Retry-After (429), renueva el token (401) y reintenta 5xx."""
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        force_refresh = False
+        for attempt in range(MAX_RETRIES):
+            self._wait_for_rate_limit()
+            headers = {'Authorization': f"Bearer {self._access_token(force_refresh)}"}
+            force_refresh = False
+            try:
+                response = self._session().get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logging.warning(f"Error de red en {path} (intento {attempt + 1}/{MAX_RETRIES}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            with self._lock:
+                self.requests_made += 1
+
+            if response.status_code == 429:
+                retry_after = _retry_after_seconds(response.headers.get('Retry-After'))
+                logging.warning(f"Límite de peticiones alcanzado en {path}. Reintentando en {retry_after:.1f} segundos.")
+                self._pause(retry_after)
+                continue
+            if response.status_code == 401:
+                force_refresh = True
+                continue
+            if response.status_code >= 500:
+                logging.warning(f"Error {response.status_code} en {path} (intento {attempt + 1}/{MAX_RETRIES}).")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+        raise RuntimeError(f"Se agotaron los {MAX_RETRIES} reintentos para {path}.")
+
+
+def _batches(items: list, size: int) -> list:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _load_checkpoint(path: str, key: str) -> dict:
+    """Lee un checkpoint JSONL (un registro por línea), ignorando una última línea incompleta."""
+    records = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record[key]] = record
+    return records
+
+
+class _JsonlCheckpoint:
+    """Checkpoint JSONL de una fase: `load` lee lo ya consultado y `put` agrega un lote."""
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.key = key
+
+    def load(self, ids: list) -> dict:
+        return _load_checkpoint(self.path, self.key)
+
+    def put(self, records: list) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _fetch_in_parallel(fetch_batch, ids: list, store, max_workers: int, label: str) -> None:
+    """
+    Ejecuta `fetch_batch` por lotes en un pool de hilos. Cada lote se guarda
+    con `store` desde el hilo principal apenas termina.
+    """
+    batches = _batches(ids, BATCH_SIZE)
+    if not batches:
+        return
+    logging.info(f"Consultando {len(ids)} {label} en {len(batches)} lotes con {max_workers} hilos...")
+    first_error = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fetch_batch, batch) for batch in batches]
+        # Todo lote exitoso se guarda aunque otro falle, para no repetirlo al reanudar.
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                store(future.result())
+            except Exception as e:
+                first_error = first_error or e
+            if i % 100 == 0 or i == len(batches):
+                logging.info(f"{label}: {i}/{len(batches)} lotes completados.")
+    if first_error is not None:
+        raise first_error
+
+
+def _run_phase(fetch_batch, ids: list, load, store, key: str, max_workers: int, label: str) -> dict:
+    """
+    Consulta solo los ids que `load` no tiene y retorna todos los registros:
+    los cargados más los recién consultados (guardados con `store`), sin
+    volver a leerlos.
+    """
+    records = load(ids)
+    pending = [item_id for item_id in ids if item_id not in records]
+    logging.info(f"{label}: {len(ids) - len(pending)} ya disponibles, {len(pending)} pendientes.")
+
+    def store_and_collect(batch_records):
+        store(batch_records)
+        records.update((record[key], record) for record in batch_records)
+
+    _fetch_in_parallel(fetch_batch, pending, store_and_collect, max_workers, label)
+    return records
+
+
+def fetch_artist_details(track_ids: list, client: SpotifyClient, checkpoint_dir: str,
+                         max_workers: int = MAX_WORKERS, cache: ArtistCache = None) -> pd.DataFrame:
+    """
+    Obtiene el artista principal de cada track y sus seguidores/popularidad/géneros.
+    Los ids de artista se deduplican antes de consultar /artists. Cada lote
+    completado se guarda en checkpoints JSONL (o en `cache`, si se entrega),
+    así una ejecución interrumpida continúa donde se quedó.
+    """
+    if cache is not None:
+        tracks_load, tracks_store = cache.get_tracks, cache.put_tracks
+        artists_load, artists_store = cache.get_artists, cache.put_artists
+    else:
+        tracks_checkpoint = _JsonlCheckpoint(os.path.join(checkpoint_dir, 'tracks.jsonl'), 'track_id')
+        artists_checkpoint = _JsonlCheckpoint(os.path.join(checkpoint_dir, 'artists.jsonl'), 'artist_id')
+        tracks_load, tracks_store = tracks_checkpoint.load, tracks_checkpoint.put
+        artists_load, artists_store = artists_checkpoint.load, artists_checkpoint.put
+
+    def fetch_tracks(batch):
+        payload = client.get('tracks', params={'ids': ','.join(batch)})
+        found = {}
+        for track in payload.get('tracks') or []:
+            if track and track.get('id') and track.get('artists'):
+                primary_artist = track['artists'][0] or {}
+                found[track['id']] = (primary_artist.get('id'), primary_artist.get('name'))
+        return [
+            {'track_id': track_id, 'artist_id': found.get(track_id, (None, None))[0], 'artist_name': found.get(track_id, (None, None))[1]}
+            for track_id in batch
+        ]
+
+    def fetch_artists(batch):
+        payload = client.get('artists', params={'ids': ','.join(batch)})
+        found = {
+            artist['id']: artist for artist in payload.get('artists') or [] if artist and artist.get('id')
+        }
+        return [
+            {
+                'artist_id': artist_id,
+                'followers': (found.get(artist_id, {}).get('followers') or {}).get('total'),
+                'popularity': found.get(artist_id, {}).get('popularity'),
+                'genres': found.get(artist_id, {}).get('genres'),
+            }
+            for artist_id in batch
+        ]
+
+    tracks = _run_phase(fetch_tracks, track_ids, tracks_load, tracks_store, 'track_id', max_workers, 'tracks')
+    artist_ids = list(dict.fromkeys(
+        tracks[track_id]['artist_id'] for track_id in track_ids if tracks.get(track_id, {}).get('artist_id')
+    ))
+    artists = _run_phase(fetch_artists, artist_ids, artists_load, artists_store, 'artist_id', max_workers, 'artistas')
+
+    rows = []
+    for track_id in track_ids:
+        track = tracks.get(track_id, {})
+        artist = artists.get(track.get('artist_id'), {})
+        rows.append({
+            'track_id': track_id,
+            'artist_id': track.get('artist_id'),
+            'artist_name': track.get('artist_name'),
+            'artist_followers': artist.get('followers'),
+            'artist_popularity': artist.get('popularity'),
+            'artist_genres': ';'.join(artist['genres']) if artist.get('genres') else None,
+        })
+    logging.info(f"Peticiones HTTP: {client.requests_made}. Respuestas 429: {client.rate_limited}.")
+    return pd.DataFrame(rows, columns=OUTPUT_COLUMNS)
+
+
+def enrich_artist_details(spotify_csv_path: str, output_path: str, max_workers: int = MAX_WORKERS,
+                          use_cache: bool = True) -> pd.DataFrame:
+    """
+    Enriquece los tracks únicos de `spotify_csv_path` con la API de Spotify y
+    escribe el resultado en `output_path`. Con use_cache=True se sirven primero
+    las entradas vigentes de la caché de artistas y solo se consultan las
+    faltantes o vencidas.
+    """
+    client_id = os.getenv('SPOTIFY_CLIENT_ID')
+    client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
+    if not client_id or not client_secret:
+        raise ValueError("Faltan SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET en el entorno.")
+
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    checkpoint_dir = os.path.join(airflow_home, CHECKPOINT_REL_DIR)
+    track_ids = pd.read_csv(spotify_csv_path, usecols=[TRACK_ID_COLUMN])[TRACK_ID_COLUMN].dropna().unique().tolist()
+    logging.info(f"Procesando {len(track_ids)} track IDs únicos de {spotify_csv_path}.")
+
+    client = SpotifyClient(
+        client_id, client_secret,
+        api_url=os.getenv('SPOTIFY_API_URL', SPOTIFY_API_URL),
+        token_url=os.getenv('SPOTIFY_TOKEN_URL', SPOTIFY_TOKEN_URL)
+    )
+    start_time = time.perf_counter()
+    with stage('spotify_api', rows_in=len(track_ids)) as recorder:
+        if use_cache:
+            with open_artist_cache() as cache:
+                df_artists = fetch_artist_details(track_ids, client, checkpoint_dir, max_workers, cache=cache)
+        else:
+            df_artists = fetch_artist_details(track_ids, client, checkpoint_dir, max_workers)
+        recorder.record(rows_out=len(df_artists), http_requests=client.requests_made, http_rate_limited=client.rate_limited)
+    logging.info(f"Enriquecimiento completado en {time.perf_counter() - start_time:.2f}s. {len(df_artists)} registros.")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    df_artists.to_csv(output_path, index=False, encoding='utf-8')
+    logging.info(f"Archivo de artistas guardado en: {output_path}")
+
+    if not use_cache:
+        # La ejecución terminó: el siguiente run vuelve a consultar la API.
+        for name in ('tracks.jsonl', 'artists.jsonl'):
+            _JsonlCheckpoint(os.path.join(checkpoint_dir, name), None).remove()
+    return df_artists
@@ -0,0 +1,124 @@
+# dags/tasks/fuzzy_match.py
+
+import functools
+import math
+import re
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from tasks.parallel import map_chunks
+
+# Similitud mínima (Jaccard sobre n-gramas de caracteres) para aceptar un nominado.
+FUZZY_THRESHOLD = 0.8
+NGRAM_SIZE = 3
+# Palabras de variantes de una misma obra ("remastered 2011", "live", "deluxe
+# edition", ...) que se ignoran al final de títulos ya normalizados.
+VARIANT_TOKENS = frozenset({
+    'remaster', 'remastered', 'live', 'version', 'edit', 'radio', 'deluxe', 'edition',
+    'mono', 'stereo', 'bonus', 'expanded', 'anniversary', 'acoustic', 'instrumental'
+})
+YEAR_PATTERN = re.compile(r'^(19|20)\d\d$')
+
+
+def canonical_title(title: str) -> str:
+    """Título normalizado sin las palabras de variante ni años del final (si queda algo)."""
+    tokens = title.split()
+    end = len(tokens)
+    while end > 1 and (tokens[end - 1] in VARIANT_TOKENS or YEAR_PATTERN.match(tokens[end - 1])):
+        end -= 1
+    return ' '.join(tokens[:end])
+
+
+def _ngrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1))}
+
+
+class NomineeIndex:
+    """
+    Índice invertido de n-gramas de caracteres sobre los nominados únicos.
+
+    Usa filtrado por prefijo: con los n-gramas ordenados de menos a más
+    frecuentes, dos conjuntos con Jaccard >= umbral comparten al menos un
+    n-grama de sus prefijos (los |A| - ceil(umbral * |A|) + 1 más raros).
+    Solo se indexan los prefijos de los nominados, así que cada título se
+    compara únicamente con los candidatos que comparten alguno de sus
+    n-gramas raros (claves de bloqueo) y cumplen el filtro de longitud.
+    """
+
+    def __init__(self, nominees, threshold: float = FUZZY_THRESHOLD):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"El umbral de similitud debe estar en (0, 1]: {threshold}")
+        self.threshold = threshold
+        self.nominees = sorted({nominee for nominee in nominees if nominee})
+        self._exact = set(self.nominees)
+
+        gram_sets = [_ngrams(canonical_title(nominee)) for nominee in self.nominees]
+        frequency = defaultdict(int)
+        for grams in gram_sets:
+            for gram in grams:
+                frequency[gram] += 1
+        # Rango global: los n-gramas más raros primero (empates por orden alfabético).
+        self._rank = {gram: rank for rank, gram in enumerate(sorted(frequency, key=lambda g: (frequency[g], g)))}
+
+        self._ids = []
+        self._sizes = np.empty(len(gram_sets), dtype=np.int32)
+        self._postings = defaultdict(list)
+        for position, grams in enumerate(gram_sets):
+            ids = sorted(self._rank[gram] for gram in grams)
+            self._ids.append(frozenset(ids))
+            self._sizes[position] = len(ids)
+            for gram_id in ids[:self._prefix_length(len(ids))]:
+                self._postings[gram_id].append(position)
+
+    def _prefix_length(self, size: int) -> int:
+        return size - math.ceil(self.threshold * size - 1e-9) + 1
+
+    def best_match(self, title: str):
+        """Retorna (nominado, similitud) del mejor candidato sobre el umbral, o (None, 0.0)."""
+        if title in self._exact:
+            return title, 1.0
+        grams = _ngrams(canonical_title(title))
+        size = len(grams)
+        known_ids = sorted(self._rank[gram] for gram in grams if gram in self._rank)
+        # Los n-gramas que no aparecen en ningún nominado son los más raros:
+        # ocupan el inicio del prefijo pero no pueden generar candidatos.
+        probe_length = self._prefix_length(size) - (size - len(known_ids))
+        if probe_length <= 0:
+            return None, 0.0
+
+        candidates = set()
+        for gram_id in known_ids[:probe_length]:
+            candidates.update(self._postings.get(gram_id, ()))
+        if not candidates:
+            return None, 0.0
+
+        known = frozenset(known_ids)
+        min_size, max_size = self.threshold * size, size / self.threshold
+        best, best_score = None, 0.0
+        for position in sorted(candidates):
+            other_size = self._sizes[position]
+            if not min_size <= other_size <= max_size:
+                continue
+            overlap = len(known & self._ids[position])
+            score = overlap / (size + other_size - overlap)
+            if score > best_score:
+                best, best_score = self.nominees[position], score
+        if best_score + 1e-9 < self.threshold:
+            return None, 0.0
+        return best, best_score
+
+    def match(self, titles: pd.Series, max_workers=None) -> pd.Series:
+        """
+        Reemplaza cada título por el nominado con el que coincide (exacto o
+        difuso); los que no coinciden con ninguno se dejan igual. Cada título
+        distinto se evalúa una sola vez (repartidos en `max_workers` procesos).
+        """
+        codes, uniques = pd.factorize(titles.to_numpy())
+        matched = map_chunks(functools.partial(_match_values, self), uniques, max_workers=max_workers).tolist()
+        lookup = np.array(matched + [np.nan], dtype=object)  # el código -1 (nulo) se mantiene nulo
+        return pd.Series(lookup[codes], index=titles.index, dtype=object)
+
+
+def _match_values(index: NomineeIndex, titles) -> list:
+    return [index.best_match(title)[0] or title for title in titles]
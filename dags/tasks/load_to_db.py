@@ -1,22 +1,309 @@
 # dags/tasks/load_to_db.py
 
-import pandas as pd
+from __future__ import annotations
+import io
 import os
 import logging
-import sqlalchemy
+import time
+from typing import TYPE_CHECKING
 from airflow.decorators import task
 from airflow.exceptions import AirflowFailException
+from tasks.extract_grammys_db import _database_pool
+from tasks.telemetry import stage, traced_task
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 TARGET_TABLE_NAME = 'spotify_merged_data'
 TARGET_SCHEMA_NAME = 'public'
+COPY_BATCH_SIZE = 50000
+COPY_NULL_MARKER = '\\N'
+# Bytes leídos por cada envío de un CSV ya codificado durante COPY.
+COPY_READ_BYTES = 1024 * 1024
+KEY_COLUMN = 'track_id'
+ROW_HASH_COLUMN = 'row_hash'
 
-@task(task_id="load_merged_data_to_db")
-def load_to_db(df_to_load: pd.DataFrame,
-               table_name: str = TARGET_TABLE_NAME,
-               schema_name: str = TARGET_SCHEMA_NAME,
-               if_exists: str = 'replace'):
-    
-    logging.info(f"Iniciando carga a Base de Datos: Esquema='{schema_name}', Tabla='{table_name}', Si Existe='{if_exists}'")
+
+def _copy_batches(cursor, df: pd.DataFrame, schema_name: str, table_name: str, batch_size: int) -> None:
+    """Envía el DataFrame con COPY ... FROM STDIN en lotes de `batch_size` filas."""
+    from psycopg2 import sql
+
+    copy_stmt = sql.SQL("COPY {}.{} ({}) FROM STDIN WITH (FORMAT csv, NULL {})").format(
+        sql.Identifier(schema_name),
+        sql.Identifier(table_name),
+        sql.SQL(', ').join(sql.Identifier(col) for col in df.columns),
+        sql.Literal(COPY_NULL_MARKER)
+    ).as_string(cursor)
+
+    with stage('copy_batches', table=f"{schema_name}.{table_name}", rows_in=len(df)) as recorder:
+        bytes_written = 0
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            buffer = io.StringIO()
+            batch.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL_MARKER)
+            bytes_written += buffer.tell()
+            buffer.seek(0)
+            cursor.copy_expert(copy_stmt, buffer)
+            logging.info(f"Lote COPY de {len(batch)} filas enviado ({min(start + batch_size, len(df))}/{len(df)}).")
+        recorder.record(bytes_written=bytes_written)
+
+
+def _copy_file(cursor, csv_file: dict, columns: list, schema_name: str, table_name: str) -> None:
+    """
+    Envía con COPY ... FROM STDIN un CSV ya codificado (con encabezado, ver
+    tasks.sinks.encode_csv), leyéndolo de disco en streaming y
+    descomprimiéndolo al vuelo si hace falta.
+    """
+    import pyarrow as pa
+    from psycopg2 import sql
+
+    copy_stmt = sql.SQL("COPY {}.{} ({}) FROM STDIN WITH (FORMAT csv, HEADER true)").format(
+        sql.Identifier(schema_name),
+        sql.Identifier(table_name),
+        sql.SQL(', ').join(sql.Identifier(col) for col in columns)
+    ).as_string(cursor)
+
+    compression = csv_file.get('compression', 'none')
+    with stage('copy_file', table=f"{schema_name}.{table_name}", bytes_read=os.path.getsize(csv_file['path'])):
+        with pa.input_stream(csv_file['path'], compression=None if compression == 'none' else compression) as source:
+            cursor.copy_expert(copy_stmt, source, size=COPY_READ_BYTES)
+    logging.info(f"CSV {csv_file['path']} enviado con COPY a '{schema_name}.{table_name}'.")
+
+
+def _copy_load(engine, df: pd.DataFrame, table_name: str, schema_name: str, if_exists: str, batch_size: int,
+               csv_file: dict = None, refresh_dashboard: bool = False) -> None:
+    """
+    Carga con COPY. Con if_exists='replace' los datos se copian a una tabla
+    de staging que, dentro de la misma transacción, reemplaza a la tabla
+    destino (DROP + RENAME): los lectores nunca ven una carga a medias.
+    Con 'append' se copian directamente sobre la tabla destino.
+
+    Con `csv_file` se envía ese CSV ya codificado en lugar de serializar
+    `df`, del que solo se usan las columnas y los tipos. Con
+    refresh_dashboard=True las tablas del dashboard se recalculan en la
+    misma transacción.
+    """
+    import pandas as pd
+    import sqlalchemy
+    from psycopg2 import sql
+    from tasks.dashboard_tables import refresh_dashboard_tables
+
+    def copy(cursor, load_table: str) -> None:
+        if csv_file is not None:
+            _copy_file(cursor, csv_file, df.columns.tolist(), schema_name, load_table)
+        else:
+            _copy_batches(cursor, df, schema_name, load_table, batch_size)
+
+    table_exists = sqlalchemy.inspect(engine).has_table(table_name, schema=schema_name)
+    if if_exists == 'fail' and table_exists:
+        raise ValueError(f"La tabla '{schema_name}.{table_name}' ya existe.")
+
+    target = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(table_name))
+    staging_name = f"{table_name}__staging"
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        if if_exists == 'append' and table_exists:
+            copy(cursor, table_name)
+        else:
+            load_table = staging_name if table_exists else table_name
+            # Mismo DDL que generaría to_sql para este DataFrame.
+            create_stmt = pd.io.sql.get_schema(df, load_table, con=engine, schema=schema_name)
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}.{}").format(sql.Identifier(schema_name), sql.Identifier(staging_name)))
+            cursor.execute(create_stmt)
+            copy(cursor, load_table)
+            if table_exists:
+                cursor.execute(sql.SQL("DROP TABLE {}").format(target))
+                cursor.execute(sql.SQL("ALTER TABLE {}.{} RENAME TO {}").format(
+                    sql.Identifier(schema_name), sql.Identifier(staging_name), sql.Identifier(table_name)))
+                logging.info(f"Tabla de staging '{staging_name}' intercambiada por '{schema_name}.{table_name}'.")
+        if refresh_dashboard:
+            refresh_dashboard_tables(cursor, schema_name, table_name)
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+
+def _refresh_dashboard(engine, table_name: str, schema_name: str) -> None:
+    """Recalcula completas las tablas del dashboard en una transacción propia."""
+    from tasks.dashboard_tables import refresh_dashboard_tables
+
+    raw_conn = engine.raw_connection()
+    try:
+        refresh_dashboard_tables(raw_conn.cursor(), schema_name, table_name)
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+
+def _with_row_hash(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega un hash de contenido por fila (BIGINT) para detectar cambios."""
+    import numpy as np
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+    return df.assign(**{ROW_HASH_COLUMN: hashes.view(np.int64)})
+
+
+def _ensure_upsert_table(cursor, engine, df: pd.DataFrame, table_name: str, schema_name: str) -> None:
+    """
+    Crea la tabla destino con PRIMARY KEY (track_id) si no existe. Si existe
+    (p. ej. de una carga 'replace'), agrega la columna row_hash y la clave
+    primaria, cuyo índice único es el índice sobre track_id.
+    """
+    import pandas as pd
+    import sqlalchemy
+    from psycopg2 import sql
+
+    target = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(table_name))
+    inspector = sqlalchemy.inspect(engine)
+    if not inspector.has_table(table_name, schema=schema_name):
+        cursor.execute(pd.io.sql.get_schema(df, table_name, keys=KEY_COLUMN, con=engine, schema=schema_name))
+        logging.info(f"Tabla '{schema_name}.{table_name}' creada con PRIMARY KEY ({KEY_COLUMN}).")
+        return
+
+    existing_cols = {col['name'] for col in inspector.get_columns(table_name, schema=schema_name)}
+    missing_cols = [col for col in df.columns if col not in existing_cols and col != ROW_HASH_COLUMN]
+    if missing_cols:
+        raise AirflowFailException(
+            f"La tabla '{schema_name}.{table_name}' no tiene las columnas {missing_cols}. "
+            "Ejecute una carga con if_exists='replace' para recrearla."
+        )
+    if ROW_HASH_COLUMN not in existing_cols:
+        cursor.execute(sql.SQL("ALTER TABLE {} ADD COLUMN {} BIGINT").format(target, sql.Identifier(ROW_HASH_COLUMN)))
+    if not inspector.get_pk_constraint(table_name, schema=schema_name).get('constrained_columns'):
+        cursor.execute(sql.SQL("ALTER TABLE {} ADD PRIMARY KEY ({})").format(target, sql.Identifier(KEY_COLUMN)))
+        logging.info(f"PRIMARY KEY ({KEY_COLUMN}) agregada a '{schema_name}.{table_name}'.")
+
+
+def _upsert_load(engine, df: pd.DataFrame, table_name: str, schema_name: str, batch_size: int,
+                 refresh_dashboard: bool = False, csv_file: dict = None) -> dict:
+    """
+    Carga incremental: compara el hash de cada fila con el guardado en la
+    tabla, pasa solo filas nuevas o modificadas por una tabla temporal
+    (INSERT ... ON CONFLICT (track_id) DO UPDATE) y elimina los track_id que
+    ya no están. Con refresh_dashboard=True también rehace los grupos de las
+    tablas del dashboard que tocan esas filas (valores antiguos y nuevos).
+    Todo ocurre en una sola transacción.
+
+    Sin `csv_file` las filas a enviar se serializan en lotes COPY. Con
+    `csv_file` (el CSV ya codificado de tasks.sinks) ese archivo se copia
+    tal cual a la tabla temporal, se le asigna el row_hash a las filas
+    nuevas o modificadas y se descartan las demás.
+    """
+    import pandas as pd
+    from psycopg2 import sql
+    from tasks.dashboard_tables import capture_affected_keys, refresh_dashboard_tables
+
+    if df[KEY_COLUMN].isna().any() or df[KEY_COLUMN].duplicated().any():
+        raise AirflowFailException(f"La columna '{KEY_COLUMN}' debe ser única y no nula para la carga incremental.")
+
+    df = _with_row_hash(df)
+    target = sql.SQL('{}.{}').format(sql.Identifier(schema_name), sql.Identifier(table_name))
+    staging_name = f"{table_name}__upsert"
+
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        _ensure_upsert_table(cursor, engine, df, table_name, schema_name)
+
+        cursor.execute(sql.SQL("SELECT {}, {} FROM {}").format(
+            sql.Identifier(KEY_COLUMN), sql.Identifier(ROW_HASH_COLUMN), target))
+        existing = pd.DataFrame(cursor.fetchall(), columns=[KEY_COLUMN, 'existing_hash'])
+
+        compared = df[[KEY_COLUMN, ROW_HASH_COLUMN]].merge(existing, on=KEY_COLUMN, how='left', indicator=True)
+        is_new = (compared['_merge'] == 'left_only').to_numpy()
+        is_changed = ~is_new & (compared[ROW_HASH_COLUMN] != compared['existing_hash']).to_numpy()
+        deleted_ids = existing.loc[~existing[KEY_COLUMN].isin(df[KEY_COLUMN]), KEY_COLUMN].tolist()
+        rows_to_send = df[is_new | is_changed]
+
+        if refresh_dashboard:
+            # Claves de grupo de las filas que se van a modificar o eliminar, antes de tocarlas.
+            touched_ids = df.loc[is_changed, KEY_COLUMN].tolist() + deleted_ids
+            if touched_ids:
+                capture_affected_keys(cursor, schema_name, table_name, target,
+                                      sql.SQL("{} = ANY(%s)").format(sql.Identifier(KEY_COLUMN)), (touched_ids,))
+
+        if len(rows_to_send):
+            columns = sql.SQL(', ').join(sql.Identifier(col) for col in df.columns)
+            updates = sql.SQL(', ').join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(col)) for col in df.columns if col != KEY_COLUMN
+            )
+            staging = sql.SQL("pg_temp.{}").format(sql.Identifier(staging_name))
+            cursor.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(sql.Identifier(staging_name), target))
+            if csv_file is not None:
+                _copy_file(cursor, csv_file, [col for col in df.columns if col != ROW_HASH_COLUMN], 'pg_temp', staging_name)
+                cursor.execute(sql.SQL(
+                    "UPDATE {staging} AS s SET {hash} = sent.{hash} FROM unnest(%s::text[], %s::bigint[]) AS sent ({key}, {hash}) "
+                    "WHERE s.{key} = sent.{key}"
+                ).format(staging=staging, key=sql.Identifier(KEY_COLUMN), hash=sql.Identifier(ROW_HASH_COLUMN)),
+                    (rows_to_send[KEY_COLUMN].tolist(), rows_to_send[ROW_HASH_COLUMN].tolist()))
+                cursor.execute(sql.SQL("DELETE FROM {} WHERE {} IS NULL").format(staging, sql.Identifier(ROW_HASH_COLUMN)))
+            else:
+                _copy_batches(cursor, rows_to_send, 'pg_temp', staging_name, batch_size)
+            cursor.execute(sql.SQL(
+                "INSERT INTO {target} ({columns}) SELECT {columns} FROM pg_temp.{staging} "
+                "ON CONFLICT ({key}) DO UPDATE SET {updates}"
+            ).format(target=target, columns=columns, staging=sql.Identifier(staging_name),
+                     key=sql.Identifier(KEY_COLUMN), updates=updates))
+            if refresh_dashboard:
+                capture_affected_keys(cursor, schema_name, table_name, staging)
+
+        if deleted_ids:
+            cursor.execute(sql.SQL("DELETE FROM {} WHERE {} = ANY(%s)").format(target, sql.Identifier(KEY_COLUMN)), (deleted_ids,))
+
+        if refresh_dashboard:
+            refresh_dashboard_tables(cursor, schema_name, table_name, incremental=True)
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    counts = {
+        'inserted': int(is_new.sum()),
+        'updated': int(is_changed.sum()),
+        'deleted': len(deleted_ids),
+        'unchanged': int(len(df) - is_new.sum() - is_changed.sum()),
+    }
+    logging.info(f"Carga incremental en '{schema_name}.{table_name}': {counts}")
+    return counts
+
+
+def load_to_postgres(data,
+                     table_name: str = TARGET_TABLE_NAME,
+                     schema_name: str = TARGET_SCHEMA_NAME,
+                     if_exists: str = 'replace',
+                     method: str = 'multi',
+                     batch_size: int = COPY_BATCH_SIZE,
+                     csv_file: dict = None,
+                     refresh_dashboard: bool = True):
+    """
+    Carga el artefacto (o DataFrame) `data` en PostgreSQL; ver load_to_db.
+    Con `csv_file` (el CSV ya codificado de tasks.sinks) y method='copy', las
+    cargas envían ese archivo con COPY sin volver a serializar los datos; en
+    'upsert' se copia a la tabla temporal y solo se aplican las filas nuevas
+    o modificadas (ver _upsert_load).
+    """
+    from tasks.artifacts import _is_handle, read_artifact, read_artifact_table, table_to_pandas
+    from tasks.dashboard_tables import supports_dashboard
+
+    logging.info(f"Iniciando carga a Base de Datos: Esquema='{schema_name}', Tabla='{table_name}', Si Existe='{if_exists}', Método='{method}'")
+
+    if method not in ('multi', 'copy'):
+        raise AirflowFailException(f"Método de carga no soportado: '{method}'. Use 'multi' o 'copy'.")
+    if if_exists not in ('fail', 'replace', 'append', 'upsert'):
+        raise AirflowFailException(f"Valor de if_exists no soportado: '{if_exists}'.")
+
+    # Importa el pool (SQLAlchemy, psycopg2) y carga env/.env con las credenciales.
+    pool = _database_pool()
 
     db_user = os.getenv('DB_USER')
     db_password = os.getenv('DB_PASSWORD')
@@ -31,35 +318,80 @@ def load_to_db(df_to_load: pd.DataFrame,
         logging.error(error_msg)
         raise AirflowFailException(error_msg)
 
-    if df_to_load.empty:
+    if csv_file is not None and method == 'copy' and if_exists != 'upsert' and _is_handle(data):
+        # Los datos ya están codificados en csv_file: basta con el esquema para el DDL.
+        num_rows = data['num_rows']
+        df_to_load = table_to_pandas(read_artifact_table(data).schema.empty_table())
+    else:
+        # 'upsert' necesita las filas para calcular los hashes, pero puede copiar csv_file.
+        if method != 'copy' or if_exists != 'upsert':
+            csv_file = None
+        df_to_load = read_artifact(data)
+        num_rows = len(df_to_load)
+    if num_rows == 0:
         logging.warning(f"El DataFrame de entrada está vacío. Omitiendo carga a la tabla '{schema_name}.{table_name}'.")
         return
-
-    db_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    engine = None 
+    if refresh_dashboard and not supports_dashboard(df_to_load.columns):
+        logging.warning(f"Los datos no tienen las columnas del dashboard; no se actualizan las tablas de resumen de '{schema_name}.{table_name}'.")
+        refresh_dashboard = False
 
     try:
-        logging.info(f"Conectando a la base de datos: postgresql://{db_user}:***@{db_host}:{db_port}/{db_name}")
+        logging.info(f"Usando el pool de conexiones compartido: postgresql://{db_user}:***@{db_host}:{db_port}/{db_name}")
 
-        engine = sqlalchemy.create_engine(db_url, echo=False)
+        engine = pool.get_engine()
 
-        logging.info(f"Cargando {len(df_to_load)} filas en la tabla '{schema_name}.{table_name}'...")
+        logging.info(f"Cargando {num_rows} filas en la tabla '{schema_name}.{table_name}'...")
+        start_time = time.perf_counter()
 
-        df_to_load.to_sql(
-            name=table_name,
-            con=engine,
-            schema=schema_name,
-            if_exists=if_exists,
-            index=False,       
-            method='multi'     
-        )
+        counts = None
+        with stage('load', method=method, if_exists=if_exists, rows_in=num_rows, encoded_csv=csv_file is not None) as recorder:
+            if if_exists == 'upsert':
+                counts = _upsert_load(engine, df_to_load, table_name, schema_name, batch_size, refresh_dashboard, csv_file)
+                recorder.record(**{f"rows_{key}": value for key, value in counts.items()})
+            elif method == 'copy':
+                _copy_load(engine, df_to_load, table_name, schema_name, if_exists, batch_size, csv_file, refresh_dashboard)
+            else:
+                df_to_load.to_sql(
+                    name=table_name,
+                    con=engine,
+                    schema=schema_name,
+                    if_exists=if_exists,
+                    index=False,       
+                    method='multi'     
+                )
+                if refresh_dashboard:
+                    _refresh_dashboard(engine, table_name, schema_name)
 
-        logging.info(f"Datos cargados exitosamente en '{schema_name}.{table_name}'.")
+        logging.info(f"Datos cargados exitosamente en '{schema_name}.{table_name}' en {time.perf_counter() - start_time:.2f}s.")
+        return counts
 
     except Exception as e:
         logging.error(f"Error durante la carga a la base de datos: {e}", exc_info=True)
         raise
     finally:
-        if engine:
-            engine.dispose()
-            logging.info("Motor de base de datos desechado (conexiones cerradas).")
\ No newline at end of file
+        pool.log_pool_metrics()
+
+
+@task(task_id="load_merged_data_to_db")
+@traced_task
+def load_to_db(df_to_load: dict,
+               table_name: str = TARGET_TABLE_NAME,
+               schema_name: str = TARGET_SCHEMA_NAME,
+               if_exists: str = 'replace',
+               method: str = 'multi',
+               batch_size: int = COPY_BATCH_SIZE,
+               refresh_dashboard: bool = True):
+    """
+    Carga el DataFrame en PostgreSQL. method='multi' usa DataFrame.to_sql con
+    INSERT multi-fila; method='copy' usa COPY en lotes de `batch_size` filas
+    y reemplaza la tabla de forma atómica (ver _copy_load).
+    Con if_exists='upsert' la carga es incremental por track_id (ver
+    _upsert_load) y retorna los conteos de filas insertadas, actualizadas,
+    eliminadas y sin cambios.
+
+    Con refresh_dashboard=True (por defecto) mantiene las tablas de resumen
+    e índices que usa el dashboard (ver tasks.dashboard_tables): completas
+    en las cargas 'replace'/'append'/'fail' e incrementales en 'upsert'.
+    """
+    return load_to_postgres(df_to_load, table_name, schema_name, if_exists, method, batch_size,
+                            refresh_dashboard=refresh_dashboard)
@@ -1,93 +1,116 @@
-import pandas as pd
-import re
-import numpy as np
+from __future__ import annotations
 import logging
 import os
+from typing import TYPE_CHECKING
 from airflow.decorators import task
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import cached_task
 
-@task(task_id="merge_and_finalize_data")
-def merge(
-    cleaned_spotify_df: pd.DataFrame,
-    cleaned_artists_df: pd.DataFrame,
-    cleaned_grammys_df: pd.DataFrame
-) -> pd.DataFrame:
-    logging.info("Iniciando merge de los DataFrames limpios...")
-    
-    if cleaned_spotify_df is None or cleaned_spotify_df.empty:
-        raise ValueError("DataFrame de Spotify vacío/None.")
-    if cleaned_artists_df is None or cleaned_artists_df.empty:
-        logging.warning("DataFrame de Artistas vacío/None. Se procederá sin información de artista.")
-        cleaned_artists_df = pd.DataFrame(columns=['track_id', 'artist_name', 'artist_followers', 'artist_popularity', 'artist_id'])
-    if cleaned_grammys_df is None or cleaned_grammys_df.empty:
-        logging.warning("DataFrame de Grammys vacío/None. Se procederá sin información de Grammys.")
-        cleaned_grammys_df = pd.DataFrame(columns=['id', 'year', 'category', 'nominee', 'artist'])
+# pandas, numpy y los módulos de normalización se importan al ejecutar la tarea.
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
-    logging.info(f"Spotify DF: {cleaned_spotify_df.shape}")
-    logging.info(f"Artistas DF: {cleaned_artists_df.shape}")
-    logging.info(f"Grammys DF: {cleaned_grammys_df.shape}")
+OUTPUT_REL_PATH = os.path.join('data', 'merge_dataset.parquet')
+# Motor del cruce final: 'pandas' o 'duckdb' (mismo resultado, ver _merge_duckdb).
+MERGE_BACKENDS = ('pandas', 'duckdb')
+MERGE_BACKEND = os.getenv('MERGE_BACKEND', 'pandas')
+FINAL_COLUMNS = [
+    'track_id', 'artists', 'album_name', 'track_name', 'popularity', 'explicit',
+    'danceability', 'energy', 'genre_category', 'duration_min',
+    'artist_name', 'artist_followers', 'artist_popularity',
+    'has_grammy_nomination', 'track_grammy_nominations', 'album_grammy_nominations'
+]
 
-    def normalize_name(name):
-        name = str(name).lower() if not pd.isna(name) else ""
-        name = re.sub(r'\(.*?\)|\[.*?\]|\{.*?\}', '', name)
-        name = re.sub(r'\b(featuring|feat|ft)\b', '', name, flags=re.IGNORECASE)
-        name = re.sub(r'&', ' ', name)
-        name = re.sub(r'[^a-z0-9\s]', '', name)
-        return ' '.join(name.split())
-
-    def normalize_spotify_artists(artists_str):
-        if pd.isna(artists_str): return ""
-        primary_artist = str(artists_str).split(';')[0]
-        return normalize_name(primary_artist)
-
-    cleaned_grammys_df['artist_normalized'] = cleaned_grammys_df['artist'].apply(normalize_name)
-    cleaned_grammys_df['nominee_normalized'] = cleaned_grammys_df['nominee'].apply(normalize_name)
-
-
-    cleaned_spotify_df['artists_normalized_primary'] = cleaned_spotify_df['artists'].apply(normalize_spotify_artists)
-    cleaned_spotify_df['track_name_normalized'] = cleaned_spotify_df['track_name'].apply(normalize_name)
-    cleaned_spotify_df['album_name_normalized'] = cleaned_spotify_df['album_name'].apply(normalize_name)
-
-    combined_spotify = pd.merge(
-        cleaned_spotify_df,
-        cleaned_artists_df[['track_id', 'artist_name', 'artist_followers', 'artist_popularity', 'artist_id']],
-        on='track_id',
-        how='inner'
-    ).drop_duplicates(subset=['track_id'])
-
-    grammy_nominations_by_work = cleaned_grammys_df.groupby(
-        ['artist_normalized', 'nominee_normalized']
-    ).size().reset_index(name='work_grammy_nominations')
-
-    merged_step1 = pd.merge(
-        combined_spotify,
-        grammy_nominations_by_work,
-        left_on=['track_name_normalized'],
-        right_on=['nominee_normalized'],
-        how='left'
-    )
 
-    merged_step2 = pd.merge(
-        merged_step1,
-        grammy_nominations_by_work,
-        left_on=['album_name_normalized'],
-        right_on=['nominee_normalized'],
-        how='left',
-        suffixes=('_track', '_album')
+def _artist_match(df: pd.DataFrame, nominations_col: str, grammy_artist_col: str, max_workers=None) -> pd.Series:
+    """
+    Marca las filas con nominaciones cuyo artista principal de Spotify está
+    contenido en el artista del Grammy. Solo evalúa las filas candidatas.
+    """
+    import numpy as np
+    import pandas as pd
+    from tasks.normalization import contains_pairwise
+
+    candidates = (df[nominations_col] > 0).to_numpy()
+    matches = np.zeros(len(df), dtype=bool)
+    matches[candidates] = contains_pairwise(
+        df.loc[candidates, 'artists_normalized_primary'],
+        df.loc[candidates, grammy_artist_col],
+        max_workers=max_workers
     )
+    return pd.Series(matches, index=df.index)
+
+
+def _best_row_per_track(df: pd.DataFrame, nom_sum: pd.Series) -> np.ndarray:
+    """
+    Equivalente vectorizado de `nom_sum.groupby(df['track_id']).idxmax()`:
+    devuelve las posiciones de la primera fila con más nominaciones por
+    track_id, ordenadas por track_id.
+    """
+    import numpy as np
+    import pandas as pd
+
+    track_codes, _ = pd.factorize(df['track_id'].to_numpy(), sort=True)
+    positions = np.arange(len(df))
+    order = np.lexsort((positions, -nom_sum.to_numpy(), track_codes))
+    order = order[track_codes[order] >= 0]  # groupby descarta track_id nulos
+    sorted_codes = track_codes[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    return order[is_first]
+
+
+def _merge_pandas(cleaned_spotify_df: pd.DataFrame, cleaned_artists_df: pd.DataFrame,
+                  cleaned_grammys_df: pd.DataFrame, max_workers=None) -> pd.DataFrame:
+    """
+    Backend 'pandas': cruza con artistas y dos veces con las nominaciones por
+    obra (canción y álbum), marca las coincidencias de artista y se queda con
+    la fila con más nominaciones de cada track_id.
+    """
+    import numpy as np
+    import pandas as pd
+    from tasks.schemas import memory_mb
+
+    with stage('merge_artists', rows_in=len(cleaned_spotify_df)) as recorder:
+        combined_spotify = pd.merge(
+            cleaned_spotify_df,
+            cleaned_artists_df[['track_id', 'artist_name', 'artist_followers', 'artist_popularity', 'artist_id']],
+            on='track_id',
+            how='inner'
+        ).drop_duplicates(subset=['track_id'])
+        recorder.record(rows_out=len(combined_spotify))
+
+    with stage('merge_grammys', rows_in=len(combined_spotify)) as recorder:
+        grammy_nominations_by_work = cleaned_grammys_df.groupby(
+            ['artist_normalized', 'nominee_normalized']
+        ).size().reset_index(name='work_grammy_nominations')
+
+        merged_step1 = pd.merge(
+            combined_spotify,
+            grammy_nominations_by_work,
+            left_on=['track_name_normalized'],
+            right_on=['nominee_normalized'],
+            how='left'
+        )
+
+        merged_step2 = pd.merge(
+            merged_step1,
+            grammy_nominations_by_work,
+            left_on=['album_name_normalized'],
+            right_on=['nominee_normalized'],
+            how='left',
+            suffixes=('_track', '_album')
+        )
+        recorder.record(rows_out=len(merged_step2))
 
     for col in ['work_grammy_nominations_track', 'work_grammy_nominations_album', 
                 'artist_normalized_track', 'artist_normalized_album', 'artists_normalized_primary']:
         merged_step2[col] = merged_step2[col].fillna(0 if 'nominations' in col else '')
 
-    cond_track_match = (
-        (merged_step2['work_grammy_nominations_track'] > 0) &
-        merged_step2.apply(lambda row: row['artists_normalized_primary'] in row['artist_normalized_track'], axis=1)
-    )
-
-    cond_album_match = (
-        (merged_step2['work_grammy_nominations_album'] > 0) &
-        merged_step2.apply(lambda row: row['artists_normalized_primary'] in row['artist_normalized_album'], axis=1)
-    )
+    with stage('match_artists', rows_in=len(merged_step2)):
+        cond_track_match = _artist_match(merged_step2, 'work_grammy_nominations_track', 'artist_normalized_track', max_workers)
+        cond_album_match = _artist_match(merged_step2, 'work_grammy_nominations_album', 'artist_normalized_album', max_workers)
 
     merged_step2['track_grammy_nominations'] = np.where(
         cond_track_match,
@@ -104,30 +127,152 @@ def merge(
     merged_step2['has_grammy_nomination'] = (merged_step2['track_grammy_nominations'] > 0) | \
                                           (merged_step2['album_grammy_nominations'] > 0)
 
-    final_columns = [
-        'track_id', 'artists', 'album_name', 'track_name', 'popularity', 'explicit',
-        'danceability', 'energy', 'genre_category', 'duration_min',
-        'artist_name', 'artist_followers', 'artist_popularity',
-        'has_grammy_nomination', 'track_grammy_nominations', 'album_grammy_nominations'
-    ]
-
     cols_to_drop = [
         'artists_normalized_primary', 'track_name_normalized', 'album_name_normalized',
         'nominee_normalized_track', 'artist_normalized_track', 'work_grammy_nominations_track',
         'nominee_normalized_album', 'artist_normalized_album', 'work_grammy_nominations_album'
     ]
+    logging.info(f"Memoria del DataFrame intermedio del merge (merged_step2): {memory_mb(merged_step2):.1f} MB")
     cols_to_drop_existing = [col for col in cols_to_drop if col in merged_step2.columns]
-    final_df = merged_step2.drop(columns=cols_to_drop_existing)[final_columns]
+    final_df = merged_step2.drop(columns=cols_to_drop_existing)[FINAL_COLUMNS]
 
     if not final_df.empty:
-        nom_sum = final_df['track_grammy_nominations'] + final_df['album_grammy_nominations']
-        final_df = final_df.loc[nom_sum.groupby(final_df['track_id']).idxmax()]
-    output_path = os.path.join('data', 'merge_dataset.csv')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    final_df.to_csv(output_path, index=False)
+        with stage('select_best_rows', rows_in=len(final_df)) as recorder:
+            nom_sum = final_df['track_grammy_nominations'] + final_df['album_grammy_nominations']
+            final_df = final_df.iloc[_best_row_per_track(final_df, nom_sum)]
+            recorder.record(rows_out=len(final_df))
+    return final_df
+
+
+def _merge_duckdb(cleaned_spotify_df: pd.DataFrame, cleaned_artists_df: pd.DataFrame,
+                  cleaned_grammys_df: pd.DataFrame, max_workers=None) -> pd.DataFrame:
+    """
+    Backend 'duckdb': el mismo resultado que _merge_pandas, calculado como un
+    solo plan SQL de DuckDB sobre las columnas de cruce (ver
+    tasks.merge_duckdb). Las demás columnas se toman por posición de los
+    DataFrames de entrada, sin materializar los cruces intermedios.
+    """
+    import pandas as pd
+    from tasks.merge_duckdb import best_matches
+    from tasks.parallel import resolve_max_workers
+
+    with stage('duckdb_merge', rows_in=len(cleaned_spotify_df)) as recorder:
+        best = best_matches(cleaned_spotify_df, cleaned_artists_df, cleaned_grammys_df,
+                            threads=resolve_max_workers(max_workers))
+        recorder.record(rows_out=len(best))
+
+    with stage('assemble_rows', rows_in=len(best)):
+        spotify_cols = [col for col in FINAL_COLUMNS if col in cleaned_spotify_df.columns]
+        artist_cols = [col for col in FINAL_COLUMNS if col in cleaned_artists_df.columns and col not in spotify_cols]
+        final_df = pd.concat([
+            cleaned_spotify_df[spotify_cols].take(best['spotify_pos'].to_numpy()).reset_index(drop=True),
+            cleaned_artists_df[artist_cols].take(best['artists_pos'].to_numpy()).reset_index(drop=True),
+        ], axis=1)
+        for col in ('track_grammy_nominations', 'album_grammy_nominations'):
+            final_df[col] = best[col].to_numpy().astype(int)
+        final_df['has_grammy_nomination'] = (final_df['track_grammy_nominations'] > 0) | \
+                                            (final_df['album_grammy_nominations'] > 0)
+    return final_df[FINAL_COLUMNS]
+
+
+def _cache_outputs(params: dict) -> list:
+    from tasks.storage import intermediate_paths
+    return intermediate_paths(OUTPUT_REL_PATH)
+
+
+@task(task_id="merge_and_finalize_data")
+@traced_task
+@cached_task(outputs=_cache_outputs)
+def merge(
+    cleaned_spotify_df: dict,
+    cleaned_artists_df: dict,
+    cleaned_grammys_df: dict,
+    match_mode: str = 'exact',
+    fuzzy_threshold: float = None,
+    max_workers: int = None,
+    backend: str = None
+) -> dict:
+    """
+    Combina Spotify, artistas y Grammys. Con match_mode='exact' una canción o
+    álbum coincide con un nominado solo si el nombre normalizado es igual;
+    con match_mode='fuzzy' también si es similar (Jaccard de n-gramas >=
+    `fuzzy_threshold`, por defecto FUZZY_THRESHOLD de tasks.fuzzy_match), p. ej.
+    variantes remaster/live.
+
+    La normalización y la coincidencia se reparten en `max_workers` procesos
+    (por defecto NORMALIZATION_MAX_WORKERS, ver tasks.parallel).
+
+    `backend` ('pandas' o 'duckdb', por defecto MERGE_BACKEND) elige el motor
+    de los cruces finales; ambos producen el mismo resultado.
+    """
+    import pandas as pd
+    from tasks.artifacts import read_artifact, write_artifact
+    from tasks.fuzzy_match import FUZZY_THRESHOLD, NomineeIndex
+    from tasks.normalization import SPOTIFY_NORMALIZED_COLUMNS, normalize_names
+    from tasks.normalization_cache import open_normalization_cache
+    from tasks.schemas import ARTISTS_SCHEMA, GRAMMYS_SCHEMA, MERGED_SCHEMA, SPOTIFY_SCHEMA, enforce_schema
+    from tasks.storage import write_intermediate
+
+    logging.info("Iniciando merge de los DataFrames limpios...")
+    if match_mode not in ('exact', 'fuzzy'):
+        raise ValueError(f"Modo de coincidencia no soportado: '{match_mode}'. Use 'exact' o 'fuzzy'.")
+    backend = (backend or MERGE_BACKEND).lower()
+    if backend not in MERGE_BACKENDS:
+        raise ValueError(f"Backend de merge no soportado: '{backend}'. Use uno de {MERGE_BACKENDS}.")
+    if fuzzy_threshold is None:
+        fuzzy_threshold = FUZZY_THRESHOLD
+
+    cleaned_spotify_df, cleaned_artists_df, cleaned_grammys_df = (
+        read_artifact(handle) if handle is not None else None
+        for handle in (cleaned_spotify_df, cleaned_artists_df, cleaned_grammys_df)
+    )
+    
+    if cleaned_spotify_df is None or cleaned_spotify_df.empty:
+        raise ValueError("DataFrame de Spotify vacío/None.")
+    if cleaned_artists_df is None or cleaned_artists_df.empty:
+        logging.warning("DataFrame de Artistas vacío/None. Se procederá sin información de artista.")
+        cleaned_artists_df = pd.DataFrame(columns=['track_id', 'artist_name', 'artist_followers', 'artist_popularity', 'artist_id'])
+    if cleaned_grammys_df is None or cleaned_grammys_df.empty:
+        logging.warning("DataFrame de Grammys vacío/None. Se procederá sin información de Grammys.")
+        cleaned_grammys_df = pd.DataFrame(columns=['id', 'year', 'category', 'nominee', 'artist'])
+
+    cleaned_spotify_df = enforce_schema(cleaned_spotify_df, SPOTIFY_SCHEMA, 'spotify_clean')
+    cleaned_artists_df = enforce_schema(cleaned_artists_df, ARTISTS_SCHEMA, 'artists_clean')
+    cleaned_grammys_df = enforce_schema(cleaned_grammys_df, GRAMMYS_SCHEMA, 'grammys_clean')
+
+    logging.info(f"Spotify DF: {cleaned_spotify_df.shape}")
+    logging.info(f"Artistas DF: {cleaned_artists_df.shape}")
+    logging.info(f"Grammys DF: {cleaned_grammys_df.shape}")
+
+    with stage('normalize_names', rows_in=len(cleaned_spotify_df) + len(cleaned_grammys_df)), open_normalization_cache() as cache:
+        cleaned_grammys_df['artist_normalized'] = normalize_names(cleaned_grammys_df['artist'], cache, max_workers)
+        cleaned_grammys_df['nominee_normalized'] = normalize_names(cleaned_grammys_df['nominee'], cache, max_workers)
+
+        # La transformación particionada ya entrega estas columnas calculadas.
+        for col, source_col, normalize in SPOTIFY_NORMALIZED_COLUMNS:
+            if col not in cleaned_spotify_df.columns:
+                cleaned_spotify_df[col] = normalize(cleaned_spotify_df[source_col], cache, max_workers)
+
+    if match_mode == 'fuzzy':
+        with stage('fuzzy_match_titles', rows_in=len(cleaned_spotify_df), threshold=fuzzy_threshold) as recorder:
+            nominee_index = NomineeIndex(cleaned_grammys_df['nominee_normalized'].unique(), fuzzy_threshold)
+            for col in ('track_name_normalized', 'album_name_normalized'):
+                matched = nominee_index.match(cleaned_spotify_df[col], max_workers)
+                fuzzy_rows = int((matched != cleaned_spotify_df[col]).sum())
+                cleaned_spotify_df[col] = matched
+                recorder.record(**{f"{col}_fuzzy_rows": fuzzy_rows})
+                logging.info(f"Coincidencia difusa en '{col}': {fuzzy_rows} filas asignadas a un nominado (umbral {fuzzy_threshold}).")
+
+    logging.info(f"Cruzando los DataFrames con el backend '{backend}'.")
+    if backend == 'duckdb':
+        final_df = _merge_duckdb(cleaned_spotify_df, cleaned_artists_df, cleaned_grammys_df, max_workers)
+    else:
+        final_df = _merge_pandas(cleaned_spotify_df, cleaned_artists_df, cleaned_grammys_df, max_workers)
+    final_df = enforce_schema(final_df, MERGED_SCHEMA, 'merged')
+    output_path = write_intermediate(final_df, OUTPUT_REL_PATH)
     
     logging.info(f"Archivo guardado exitosamente en: {output_path}")
     logging.info(f"Merge completado. Forma final: {final_df.shape}")
     logging.info(f"Tracks con nominaciones: {final_df['has_grammy_nomination'].sum()}")
     
-    return final_df
\ No newline at end of file
+    return write_artifact(final_df, 'merged')
\ No newline at end of file
@@ -0,0 +1,86 @@
+# dags/tasks/merge_duckdb.py
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Plan único del merge: agregación de nominaciones por obra, cruce con
+# artistas, los dos cruces con los nominados, la coincidencia de artista y la
+# elección de la mejor fila por track_id. El orden de desempate reproduce el
+# de pandas: primera fila de artistas por track y, entre filas con las mismas
+# nominaciones, la primera coincidencia de canción y luego de álbum en el
+# orden de `grammy_nominations_by_work` (ordenado por artista y nominado).
+MERGE_SQL = """
+WITH works AS (
+    SELECT artist_normalized, nominee_normalized, count(*) AS nominations,
+           row_number() OVER (ORDER BY artist_normalized, nominee_normalized) AS work_order
+    FROM grammys
+    WHERE artist_normalized IS NOT NULL AND nominee_normalized IS NOT NULL
+    GROUP BY artist_normalized, nominee_normalized
+),
+combined AS (
+    SELECT s.spotify_pos, a.artists_pos, s.track_id,
+           coalesce(s.artists_normalized_primary, '') AS primary_artist,
+           s.track_name_normalized, s.album_name_normalized
+    FROM spotify s
+    JOIN artists a ON a.track_id = s.track_id
+    QUALIFY row_number() OVER (PARTITION BY s.track_id ORDER BY s.spotify_pos, a.artists_pos) = 1
+),
+matched AS (
+    SELECT c.spotify_pos, c.artists_pos, c.track_id,
+           t.work_order AS track_order, al.work_order AS album_order,
+           CASE WHEN contains(t.artist_normalized, c.primary_artist) THEN t.nominations ELSE 0 END
+               AS track_grammy_nominations,
+           CASE WHEN contains(al.artist_normalized, c.primary_artist) THEN al.nominations ELSE 0 END
+               AS album_grammy_nominations
+    FROM combined c
+    LEFT JOIN works t ON t.nominee_normalized = c.track_name_normalized
+    LEFT JOIN works al ON al.nominee_normalized = c.album_name_normalized
+)
+SELECT spotify_pos, artists_pos, track_grammy_nominations, album_grammy_nominations
+FROM matched
+QUALIFY row_number() OVER (
+    PARTITION BY track_id
+    ORDER BY track_grammy_nominations + album_grammy_nominations DESC,
+             track_order NULLS FIRST, album_order NULLS FIRST
+) = 1
+ORDER BY track_id
+"""
+
+
+def _strings(values: pd.Series) -> pa.Array:
+    # string[pyarrow] se pasa sin copiar; object se convierte (NaN -> nulo).
+    return pa.array(values, type=pa.string(), from_pandas=True)
+
+
+def best_matches(spotify_df: pd.DataFrame, artists_df: pd.DataFrame, grammys_df: pd.DataFrame,
+                 threads: int = 1) -> pd.DataFrame:
+    """
+    Ejecuta MERGE_SQL en DuckDB (en proceso) sobre tablas Arrow con solo las
+    columnas de cruce. Retorna, por track_id y ordenado por track_id, la
+    posición de la fila elegida en `spotify_df` y en `artists_df` y sus
+    nominaciones de canción y de álbum; las demás columnas las toma el
+    llamador de los DataFrames originales, con sus tipos.
+    """
+    spotify = pa.table({
+        'spotify_pos': np.arange(len(spotify_df), dtype=np.int64),
+        'track_id': _strings(spotify_df['track_id']),
+        'artists_normalized_primary': _strings(spotify_df['artists_normalized_primary']),
+        'track_name_normalized': _strings(spotify_df['track_name_normalized']),
+        'album_name_normalized': _strings(spotify_df['album_name_normalized']),
+    })
+    artists = pa.table({
+        'artists_pos': np.arange(len(artists_df), dtype=np.int64),
+        'track_id': _strings(artists_df['track_id']),
+    })
+    grammys = pa.table({
+        'artist_normalized': _strings(grammys_df['artist_normalized']),
+        'nominee_normalized': _strings(grammys_df['nominee_normalized']),
+    })
+
+    with duckdb.connect(config={'threads': max(1, int(threads))}) as con:
+        for name, table in (('spotify', spotify), ('artists', artists), ('grammys', grammys)):
+            con.register(name, table)
+        result = con.execute(MERGE_SQL).arrow()
+    return result.to_pandas()
@@ -0,0 +1,153 @@
+# dags/tasks/normalization.py
+
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+from tasks.parallel import map_chunks
+
+# Reglas de normalización de nombres (artistas, canciones, álbumes y nominados).
+BRACKETS_PATTERN = re.compile(r'\(.*?\)|\[.*?\]|\{.*?\}')
+FEATURING_PATTERN = re.compile(r'\b(featuring|feat|ft)\b', flags=re.IGNORECASE)
+AMPERSAND_PATTERN = re.compile(r'&')
+NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9\s]')
+
+NAME_RULE = 'name'
+PRIMARY_ARTIST_RULE = 'primary_artist'
+TEXT_RULE = 'text'
+
+
+def _rules_version(*parts) -> str:
+    return hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest()[:12]
+
+
+# Marca de versión de cada regla, usada para invalidar la caché persistente
+# cuando cambian los patrones.
+_NAME_RULES_VERSION = _rules_version(*(
+    (pattern.pattern, pattern.flags)
+    for pattern in (BRACKETS_PATTERN, FEATURING_PATTERN, AMPERSAND_PATTERN, NON_ALNUM_PATTERN)
+))
+RULE_VERSIONS = {
+    NAME_RULE: _NAME_RULES_VERSION,
+    PRIMARY_ARTIST_RULE: _rules_version(_NAME_RULES_VERSION, 'split;0'),
+    TEXT_RULE: _rules_version('lower', 'strip'),
+}
+
+
+def normalize_name(name) -> str:
+    """
+    Versión escalar de la normalización: minúsculas, sin paréntesis/corchetes,
+    sin 'feat', sin símbolos y con espacios colapsados.
+    """
+    name = str(name).lower() if not pd.isna(name) else ""
+    name = BRACKETS_PATTERN.sub('', name)
+    name = FEATURING_PATTERN.sub('', name)
+    name = AMPERSAND_PATTERN.sub(' ', name)
+    name = NON_ALNUM_PATTERN.sub('', name)
+    return ' '.join(name.split())
+
+
+def _normalize_strings(strings: pd.Series) -> pd.Series:
+    """Aplica las reglas de normalize_name con operaciones vectorizadas .str."""
+    return (
+        strings.str.lower()
+        .str.replace(BRACKETS_PATTERN, '', regex=True)
+        .str.replace(FEATURING_PATTERN, '', regex=True)
+        .str.replace(AMPERSAND_PATTERN, ' ', regex=True)
+        .str.replace(NON_ALNUM_PATTERN, '', regex=True)
+        .str.split()
+        .str.join(' ')
+    )
+
+
+def _normalize_values(values) -> list:
+    return _normalize_strings(pd.Series(values, dtype=object)).tolist()
+
+
+def _primary_artist_values(values) -> list:
+    return _normalize_strings(pd.Series(values, dtype=object).str.split(';').str[0]).tolist()
+
+
+def _text_values(values) -> list:
+    return pd.Series(values, dtype=object).str.lower().str.strip().tolist()
+
+
+def _map_unique(values: pd.Series, transform, rule: str, cache=None, max_workers=None) -> pd.Series:
+    """
+    Factoriza la serie, aplica `transform` solo sobre los valores únicos
+    (convertidos a str) y reconstruye el resultado con los códigos enteros.
+    Los nulos se normalizan a cadena vacía. Si se pasa una
+    NormalizationCache, solo se calculan los valores que no estén en ella.
+    Los valores a calcular se reparten en `max_workers` procesos (ver
+    tasks.parallel).
+    """
+    # Series.factorize aprovecha los códigos de `category` y el
+    # diccionario de string[pyarrow] sin materializar objetos por fila.
+    codes, uniques = values.factorize()
+    unique_strings = [str(value) for value in np.asarray(uniques, dtype=object)]
+
+    def compute(strings):
+        if not strings:
+            return []
+        return map_chunks(transform, strings, max_workers=max_workers).tolist()
+
+    if cache is None:
+        normalized = compute(unique_strings)
+    else:
+        normalized = cache.resolve(rule, RULE_VERSIONS[rule], unique_strings, compute)
+
+    lookup = np.array(normalized + [''], dtype=object)  # el código -1 (nulo) apunta a ''
+    return pd.Series(lookup[codes], index=values.index, dtype=object)
+
+
+def normalize_names(values: pd.Series, cache=None, max_workers=None) -> pd.Series:
+    """Equivalente vectorizado de `values.apply(normalize_name)`."""
+    return _map_unique(values, _normalize_values, NAME_RULE, cache, max_workers)
+
+
+def normalize_primary_artists(values: pd.Series, cache=None, max_workers=None) -> pd.Series:
+    """Normaliza solo el artista principal (antes del primer ';') de cada valor."""
+    return _map_unique(values, _primary_artist_values, PRIMARY_ARTIST_RULE, cache, max_workers)
+
+
+def normalize_text(values: pd.Series, cache=None, max_workers=None) -> pd.Series:
+    """
+    Equivalente de `values.astype(str).str.lower().str.strip()` calculado
+    sobre los valores únicos.
+    """
+    return _map_unique(values.astype(str), _text_values, TEXT_RULE, cache, max_workers)
+
+
+def _contains_values(needles, haystacks) -> list:
+    return [needle in haystack for needle, haystack in zip(needles, haystacks)]
+
+
+def contains_pairwise(needles: pd.Series, haystacks: pd.Series, max_workers=None) -> np.ndarray:
+    """
+    Evalúa `needle in haystack` fila a fila, pero calculando cada par distinto
+    (artista Spotify, artista Grammy) una sola vez sobre códigos enteros.
+    """
+    if len(needles) == 0:
+        return np.zeros(0, dtype=bool)
+
+    needle_codes, needle_uniques = pd.factorize(needles.to_numpy())
+    haystack_codes, haystack_uniques = pd.factorize(haystacks.to_numpy())
+    n_haystacks = len(haystack_uniques)
+
+    pair_codes = needle_codes.astype(np.int64) * n_haystacks + haystack_codes
+    unique_pairs, inverse = np.unique(pair_codes, return_inverse=True)
+    hits = map_chunks(
+        _contains_values,
+        np.asarray(needle_uniques, dtype=object)[unique_pairs // n_haystacks],
+        np.asarray(haystack_uniques, dtype=object)[unique_pairs % n_haystacks],
+        max_workers=max_workers
+    ).astype(bool)
+    return hits[inverse]
+
+
+# Columnas normalizadas de Spotify que usa el merge: (columna, origen, función).
+SPOTIFY_NORMALIZED_COLUMNS = [
+    ('artists_normalized_primary', 'artists', normalize_primary_artists),
+    ('track_name_normalized', 'track_name', normalize_names),
+    ('album_name_normalized', 'album_name', normalize_names),
+]
@@ -0,0 +1,131 @@
+# dags/tasks/normalization_cache.py
+
+import logging
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CACHE_REL_DIR = 'data/normalization_cache'
+VERSION_METADATA_KEY = b'rules_version'
+
+
+class NormalizationCache:
+    """
+    Tabla de memoización persistente de valores normalizados, un archivo
+    Parquet por regla (raw -> normalized). Cada archivo lleva en sus metadatos
+    la versión de la regla; si las reglas cambian, el archivo se ignora y se
+    reescribe en el siguiente guardado.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._entries = {}   # regla -> (pd.Index de textos originales, np.ndarray de normalizados)
+        self._versions = {}
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, rule: str) -> str:
+        return os.path.join(self.cache_dir, f"{rule}.parquet")
+
+    def _read(self, rule: str, version: str):
+        raw, normalized = pd.Index([], dtype=object), np.empty(0, dtype=object)
+        path = self._path(rule)
+        if os.path.exists(path):
+            try:
+                table = pq.read_table(path)
+                stored_version = (table.schema.metadata or {}).get(VERSION_METADATA_KEY, b'').decode()
+                if stored_version == version:
+                    raw = pd.Index(table.column('raw').to_numpy(zero_copy_only=False), dtype=object)
+                    normalized = table.column('normalized').to_numpy(zero_copy_only=False)
+                else:
+                    logging.info(f"Reglas de normalización '{rule}' cambiaron ({stored_version} -> {version}). Invalidando caché.")
+            except Exception as e:
+                logging.warning(f"No se pudo leer la caché de normalización '{path}': {e}. Se reconstruirá.")
+        return raw, normalized
+
+    def _load(self, rule: str, version: str):
+        if rule in self._entries and self._versions[rule] == version:
+            return self._entries[rule]
+
+        self._entries[rule] = self._read(rule, version)
+        self._versions[rule] = version
+        return self._entries[rule]
+
+    def resolve(self, rule: str, version: str, keys: list, compute) -> list:
+        """
+        Devuelve el valor normalizado de cada clave (únicas). Las que no están
+        en caché se calculan con `compute(lista_de_faltantes)` y se guardan.
+        """
+        raw, normalized = self._load(rule, version)
+        keys = np.asarray(keys, dtype=object)
+        positions = raw.get_indexer(keys) if len(raw) else np.full(len(keys), -1)
+        found = positions >= 0
+
+        result = np.empty(len(keys), dtype=object)
+        result[found] = normalized[positions[found]]
+
+        missing = keys[~found]
+        if len(missing):
+            computed = np.asarray(compute(missing.tolist()), dtype=object)
+            result[~found] = computed
+            self._entries[rule] = (raw.append(pd.Index(missing, dtype=object)), np.concatenate([normalized, computed]))
+            self._dirty.add(rule)
+
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += len(missing)
+        logging.info(f"Caché de normalización '{rule}': {hits} aciertos, {len(missing)} fallos ({len(keys)} valores únicos).")
+        return result.tolist()
+
+    def flush(self) -> None:
+        """
+        Escribe de forma atómica las reglas con entradas nuevas. Antes se
+        agregan las que otro proceso haya guardado mientras tanto (p. ej.
+        las particiones de una tarea mapeada que terminan a la vez).
+        """
+        if not self._dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for rule in sorted(self._dirty):
+            raw, normalized = self._entries[rule]
+            stored_raw, stored_normalized = self._read(rule, self._versions[rule])
+            new_stored = ~stored_raw.isin(raw)
+            if new_stored.any():
+                raw = raw.append(stored_raw[new_stored])
+                normalized = np.concatenate([normalized, stored_normalized[new_stored]])
+                self._entries[rule] = (raw, normalized)
+            table = pa.table(
+                {'raw': pa.array(raw.to_numpy(), type=pa.string()), 'normalized': pa.array(normalized, type=pa.string())}
+            ).replace_schema_metadata({VERSION_METADATA_KEY: self._versions[rule].encode()})
+            path = self._path(rule)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+        self._dirty.clear()
+
+    def log_stats(self) -> None:
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        logging.info(f"Caché de normalización ({self.cache_dir}): {self.hits} aciertos, {self.misses} fallos ({ratio:.1f}% aciertos).")
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logging.warning(f"No se pudo guardar la caché de normalización: {e}")
+        self.log_stats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_normalization_cache(cache_rel_dir: str = CACHE_REL_DIR) -> NormalizationCache:
+    """Abre la caché de normalización bajo AIRFLOW_HOME."""
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    return NormalizationCache(os.path.join(airflow_home, cache_rel_dir))
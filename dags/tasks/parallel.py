@@ -0,0 +1,128 @@
+# dags/tasks/parallel.py
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# Procesos para las etapas de normalización y coincidencia: un número, 'auto'
+# (núcleos disponibles) o 1 para ejecutar en el proceso de la tarea.
+MAX_WORKERS_ENV = 'NORMALIZATION_MAX_WORKERS'
+DEFAULT_MAX_WORKERS = '1'
+# Por debajo de este número de valores no compensa repartir el trabajo.
+PARALLEL_MIN_VALUES = 50_000
+MIN_CHUNK_VALUES = 10_000
+# Bloques por proceso, para repartir mejor la carga entre ellos.
+CHUNKS_PER_WORKER = 4
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _airflow_pool_slots():
+    """Slots del pool de Airflow que ocupa la tarea en curso (None fuera de Airflow)."""
+    try:
+        from airflow.operators.python import get_current_context
+        return int(get_current_context()['ti'].pool_slots)
+    except Exception:
+        return None
+
+
+def resolve_max_workers(max_workers=None) -> int:
+    """
+    Número de procesos a usar: `max_workers` o NORMALIZATION_MAX_WORKERS
+    ('auto' = núcleos disponibles), limitado por los núcleos y, dentro de
+    Airflow, por los `pool_slots` de la tarea: una tarea que ocupa N slots
+    de su pool usa como máximo N procesos.
+    """
+    if max_workers is None:
+        max_workers = os.getenv(MAX_WORKERS_ENV, DEFAULT_MAX_WORKERS)
+    if str(max_workers).strip().lower() in ('auto', '0'):
+        max_workers = _available_cpus()
+    workers = min(int(max_workers), _available_cpus())
+    pool_slots = _airflow_pool_slots()
+    if pool_slots is not None:
+        workers = min(workers, pool_slots)
+    return max(1, workers)
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    # El pool se reutiliza entre etapas de la misma tarea; 'spawn' evita
+    # heredar hilos y conexiones del proceso de Airflow.
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown()
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+@atexit.register
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def _to_ipc(batch: pa.RecordBatch) -> bytes:
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(payload: bytes) -> pa.RecordBatch:
+    return ipc.open_stream(pa.py_buffer(payload)).read_next_batch()
+
+
+def _run_chunk(func, payload: bytes) -> bytes:
+    """Ejecuta `func` en el proceso hijo sobre las columnas del bloque recibido."""
+    batch = _from_ipc(payload)
+    columns = [column.to_numpy(zero_copy_only=False) for column in batch.columns]
+    return _to_ipc(pa.record_batch([pa.array(func(*columns))], names=['result']))
+
+
+def map_chunks(func, *columns, max_workers=None) -> np.ndarray:
+    """
+    Aplica `func(*columnas) -> secuencia` a bloques de las columnas (listas o
+    arreglos de igual largo, p. ej. valores únicos) en un pool de procesos y
+    concatena los resultados en orden. Los bloques viajan entre procesos como
+    buffers Arrow IPC, no como objetos de Python serializados con pickle.
+    `func` debe ser una función de módulo (o functools.partial de una).
+
+    Con un solo proceso o pocos valores se ejecuta en el proceso actual.
+    """
+    n_values = len(columns[0])
+    workers = resolve_max_workers(max_workers)
+    if workers <= 1 or n_values < PARALLEL_MIN_VALUES:
+        return np.asarray(func(*(np.asarray(column, dtype=object) for column in columns)), dtype=object)
+
+    batch = pa.record_batch([pa.array(column) for column in columns], names=[f"c{i}" for i in range(len(columns))])
+    chunk_size = max(MIN_CHUNK_VALUES, math.ceil(n_values / (workers * CHUNKS_PER_WORKER)))
+    executor = _get_executor(workers)
+    futures = [
+        executor.submit(_run_chunk, func, _to_ipc(batch.slice(start, chunk_size)))
+        for start in range(0, n_values, chunk_size)
+    ]
+    logging.info(f"Procesando {n_values} valores en {len(futures)} bloques con {workers} procesos...")
+    return np.concatenate([
+        _from_ipc(future.result()).column(0).to_numpy(zero_copy_only=False) for future in futures
+    ])
@@ -0,0 +1,185 @@
+# dags/tasks/partitioned_transform.py
+
+from __future__ import annotations
+import logging
+import os
+from typing import TYPE_CHECKING
+from airflow.decorators import task
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import cached_task
+from tasks.transform_csv_data import (
+    COLS_TO_CHECK_NA, COLS_TO_DROP,
+    _cache_outputs, _categorize_genres, _cleaned_output_path, _convert_duration, _normalize_text_columns
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Número de particiones (= instancias de la tarea mapeada) de la transformación de Spotify.
+SPOTIFY_PARTITIONS = int(os.getenv('SPOTIFY_PARTITIONS', '4'))
+PARTITION_KEYS = ('track_id', 'track_genre')
+# Columna auxiliar entre el mapeo y la reducción: posición original de la fila.
+ROW_ORDER_COL = '_row_order'
+
+
+def _hash_partitions(values: pd.Series, num_partitions: int) -> np.ndarray:
+    import numpy as np
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return (hashes % np.uint64(num_partitions)).astype(np.int64)
+
+
+def _genre_partitions(values: pd.Series, num_partitions: int) -> np.ndarray:
+    """
+    Asigna géneros completos a particiones equilibrando filas: de mayor a
+    menor, cada género va a la partición con menos filas hasta el momento.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, genres = pd.factorize(values, use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(genres))
+    loads = np.zeros(num_partitions, dtype=np.int64)
+    genre_partition = np.empty(len(genres), dtype=np.int64)
+    for code in sorted(range(len(genres)), key=lambda c: (-counts[c], str(genres[c]))):
+        target = int(np.argmin(loads))
+        genre_partition[code] = target
+        loads[target] += counts[code]
+    return genre_partition[codes]
+
+
+@task(task_id="partition_spotify_data")
+@traced_task
+def partition_spotify_data(raw_spotify_df: dict,
+                           num_partitions: int = SPOTIFY_PARTITIONS,
+                           partition_by: str = 'track_id') -> list:
+    """
+    Divide el dataset crudo de Spotify en `num_partitions` artefactos para
+    transformarlos en paralelo con `transform_spotify_partition.expand(...)`.
+
+    Los duplicados de track_id se eliminan aquí, sobre los valores crudos y
+    antes de normalizar, igual que en transform_spotify_data (se conserva la
+    primera aparición). Con partition_by='track_id' (hash) la partición
+    depende solo del track; con 'track_genre' cada género queda completo en
+    una partición. Cada fila lleva su posición original para que la
+    reducción conserve el orden (y el resultado) de transform_spotify_data.
+    Retorna la lista de handles de las particiones no vacías.
+    """
+    import numpy as np
+    import pyarrow as pa
+    from tasks.artifacts import read_artifact_table, table_to_pandas, write_artifact
+
+    if num_partitions < 1:
+        raise ValueError(f"El número de particiones debe ser al menos 1: {num_partitions}")
+    if partition_by not in PARTITION_KEYS:
+        raise ValueError(f"Clave de partición no soportada: '{partition_by}'. Use una de {PARTITION_KEYS}.")
+
+    # Se trabaja sobre la tabla Arrow: solo la columna de partición pasa a pandas.
+    table = read_artifact_table(raw_spotify_df)
+    if partition_by not in table.column_names:
+        raise ValueError(f"La columna de partición '{partition_by}' no existe en el dataset de Spotify.")
+    logging.info(f"Particionando {table.num_rows} filas de Spotify por '{partition_by}' en {num_partitions} particiones...")
+
+    table = table.append_column(ROW_ORDER_COL, pa.array(np.arange(table.num_rows, dtype=np.int64)))
+    with stage('drop_duplicates', rows_in=table.num_rows) as recorder:
+        duplicated = table_to_pandas(table.select(['track_id']))['track_id'].duplicated().to_numpy()
+        table = table.filter(pa.array(~duplicated))
+        recorder.record(rows_out=table.num_rows)
+    logging.info(f"Filas después de eliminar duplicados por track_id: {table.num_rows}")
+
+    with stage('assign_partitions', rows_in=table.num_rows, partitions=num_partitions, partition_by=partition_by):
+        keys = table_to_pandas(table.select([partition_by]))[partition_by]
+        if partition_by == 'track_id':
+            partitions = _hash_partitions(keys, num_partitions)
+        else:
+            partitions = _genre_partitions(keys, num_partitions)
+        # Orden estable: cada partición mantiene el orden original de sus filas.
+        order = np.argsort(partitions, kind='stable')
+        bounds = np.searchsorted(partitions[order], np.arange(num_partitions + 1))
+
+    handles = []
+    for i in range(num_partitions):
+        rows = order[bounds[i]:bounds[i + 1]]
+        if len(rows) == 0:
+            continue
+        handles.append(write_artifact(table.take(rows), f"spotify_raw_part{i}"))
+    logging.info(f"Filas por partición: {[handle['num_rows'] for handle in handles]}")
+    return handles
+
+
+@task(task_id="transform_spotify_partition")
+@traced_task
+@cached_task()
+def transform_spotify_partition(raw_spotify_df: dict, max_workers: int = None) -> dict:
+    """
+    Transforma una partición con los mismos pasos que transform_spotify_data
+    (los duplicados ya se eliminaron en partition_spotify_data) y agrega las
+    columnas normalizadas que usa el merge.
+    """
+    from tasks.artifacts import read_artifact, write_artifact
+    from tasks.normalization import SPOTIFY_NORMALIZED_COLUMNS
+    from tasks.normalization_cache import open_normalization_cache
+    from tasks.schemas import SPOTIFY_SCHEMA, enforce_schema, without_categories
+
+    df = read_artifact(raw_spotify_df).copy()
+    logging.info(f"Transformando partición de Spotify con {len(df)} filas...")
+
+    with stage('drop_nulls', rows_in=len(df)) as recorder:
+        df = df.dropna(subset=[col for col in COLS_TO_CHECK_NA if col in df.columns])
+        recorder.record(rows_out=len(df))
+
+    object_cols = df.select_dtypes(include=['object']).columns
+    with stage('normalize_text', rows_in=len(df), columns=len(object_cols)):
+        df = _normalize_text_columns(df, object_cols, max_workers)
+
+    if 'track_genre' in df.columns:
+        df = _categorize_genres(df)
+    if 'duration_ms' in df.columns:
+        df = _convert_duration(df)
+    df = df.drop(columns=[col for col in COLS_TO_DROP if col in df.columns])
+    # Cada partición tendría categorías distintas: se fijan en la reducción.
+    df = enforce_schema(df, without_categories(SPOTIFY_SCHEMA), 'spotify_clean (partición)')
+
+    with stage('normalize_names', rows_in=len(df)), open_normalization_cache() as cache:
+        for col, source_col, normalize in SPOTIFY_NORMALIZED_COLUMNS:
+            df[col] = normalize(df[source_col], cache, max_workers)
+
+    return write_artifact(df, 'spotify_clean_part')
+
+
+@task(task_id="combine_spotify_partitions")
+@traced_task
+@cached_task(outputs=_cache_outputs)
+def combine_spotify_partitions(partition_handles: list) -> dict:
+    """
+    Reduce las particiones transformadas: las concatena en el orden original
+    y guarda el dataset limpio igual que transform_spotify_data. El artefacto
+    retornado incluye además las columnas normalizadas para el merge.
+    """
+    import pandas as pd
+    from tasks.artifacts import read_artifact, write_artifact
+    from tasks.normalization import SPOTIFY_NORMALIZED_COLUMNS
+    from tasks.schemas import SPOTIFY_SCHEMA, enforce_schema
+    from tasks.storage import write_intermediate
+
+    # Airflow entrega la salida de una tarea mapeada como una secuencia perezosa.
+    partition_handles = list(partition_handles)
+    if not partition_handles:
+        raise ValueError("No se recibieron particiones del dataset de Spotify.")
+
+    with stage('combine_partitions', partitions=len(partition_handles)) as recorder:
+        df = pd.concat([read_artifact(handle) for handle in partition_handles], ignore_index=True)
+        recorder.record(rows_in=len(df))
+        df = df.sort_values(ROW_ORDER_COL, kind='stable').drop(columns=[ROW_ORDER_COL]).reset_index(drop=True)
+        recorder.record(rows_out=len(df))
+    logging.info(f"Filas sin duplicados ni nulos en {COLS_TO_CHECK_NA}: {len(df)}")
+
+    df = enforce_schema(df, SPOTIFY_SCHEMA, 'spotify_clean')
+    normalized_cols = [col for col, _, _ in SPOTIFY_NORMALIZED_COLUMNS]
+    output_path = write_intermediate(df.drop(columns=normalized_cols), _cleaned_output_path())
+    logging.info(f"Transformación completada. Dataset guardado en: {output_path}")
+    logging.info(f"Dataset final con {len(df)} filas.")
+
+    return write_artifact(df, 'spotify_clean')
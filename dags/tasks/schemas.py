@@ -0,0 +1,95 @@
+# dags/tasks/schemas.py
+
+import logging
+import pandas as pd
+from pandas.api.types import is_dtype_equal
+from tasks.telemetry import stage
+
+# Texto libre guardado en buffers Arrow en lugar de objetos str de Python.
+STRING = 'string[pyarrow]'
+# Los contadores y banderas que vienen de los archivos de entrada usan tipos
+# nullable (Int16, boolean): un valor faltante queda como <NA> en lugar de
+# fallar al convertir (o volverse True). Los valores decimales siguen en
+# float64 para no cambiar el CSV ni las columnas de la tabla publicada.
+
+SPOTIFY_SCHEMA = {
+    'track_id': STRING,
+    'artists': 'category',
+    'album_name': 'category',
+    'track_name': STRING,
+    'popularity': 'Int16',
+    'explicit': 'boolean',
+    'danceability': 'float64',
+    'energy': 'float64',
+    'duration_min': 'float64',
+    'genre_category': 'category',
+}
+
+ARTISTS_SCHEMA = {
+    'track_id': STRING,
+    'artist_id': 'category',
+    'artist_name': 'category',
+    'artist_followers': 'Int32',
+    'artist_popularity': 'Int16',
+    'artist_genres': 'category',
+}
+
+GRAMMYS_SCHEMA = {
+    'id': 'Int32',
+    'year': 'Int16',
+    'category': 'category',
+    'nominee': STRING,
+    'artist': STRING,
+}
+
+MERGED_SCHEMA = {
+    **SPOTIFY_SCHEMA,
+    **{col: dtype for col, dtype in ARTISTS_SCHEMA.items() if col != 'track_id'},
+    'has_grammy_nomination': 'bool',
+    'track_grammy_nominations': 'int16',
+    'album_grammy_nominations': 'int16',
+}
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(index=True, deep=True).sum() / (1024 * 1024)
+
+
+def without_categories(schema: dict) -> dict:
+    """
+    Igual que `schema` pero con texto Arrow en lugar de `category`. Para
+    escritura por bloques, donde cada bloque tendría categorías distintas.
+    """
+    return {col: (STRING if dtype == 'category' else dtype) for col, dtype in schema.items()}
+
+
+def _text_to_boolean(values: pd.Series) -> pd.Series:
+    """
+    Una columna booleana con nulos llega como object (y las transformaciones
+    la normalizan como texto): 'true'/'false' en cualquier forma pasan a
+    True/False y el resto a nulo, en lugar de que todo texto sea True.
+    """
+    return values.astype(str).str.strip().str.lower().map({'true': True, 'false': False})
+
+
+def enforce_schema(df: pd.DataFrame, schema: dict, name: str) -> pd.DataFrame:
+    """
+    Convierte las columnas presentes en `df` a los tipos declarados en
+    `schema` (las demás no se tocan) y registra la memoria antes y después.
+    Los valores faltantes quedan como nulos en los tipos nullable.
+    """
+    with stage('enforce_schema', frame=name, rows_in=len(df)) as recorder:
+        before = memory_mb(df)
+        dtypes = {col: dtype for col, dtype in schema.items() if col in df.columns and not is_dtype_equal(df[col].dtype, dtype)}
+        text_booleans = [col for col, dtype in dtypes.items() if dtype == 'boolean' and df[col].dtype == object]
+        if text_booleans:
+            df = df.assign(**{col: _text_to_boolean(df[col]) for col in text_booleans})
+        if dtypes:
+            df = df.astype(dtypes)
+        after = memory_mb(df)
+        recorder.record(columns_converted=len(dtypes), frame_mb_before=round(before, 1), frame_mb_after=round(after, 1))
+    logging.info(
+        f"Memoria de '{name}': {before:.1f} MB -> {after:.1f} MB "
+        f"({len(df)} filas, {len(dtypes)} columnas convertidas)."
+    )
+    return df
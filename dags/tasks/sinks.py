@@ -0,0 +1,237 @@
+# dags/tasks/sinks.py
+
+import contextvars
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from airflow.decorators import task
+from airflow.exceptions import AirflowFailException
+from tasks.load_to_db import COPY_BATCH_SIZE, TARGET_SCHEMA_NAME, TARGET_TABLE_NAME
+from tasks.store import EXPORT_REL_DIR
+from tasks.telemetry import stage, traced_task
+
+# CSV codificado una vez por ejecución y compartido por todos los destinos.
+ENCODED_REL_DIR = 'data/sinks'
+# Filas por lote al escribir el CSV desde la tabla Arrow.
+CSV_BATCH_ROWS = 64 * 1024
+# Intentos por destino (incluido el primero) y espera base entre ellos (se duplica).
+SINK_MAX_ATTEMPTS = int(os.getenv('SINK_MAX_ATTEMPTS', '3'))
+SINK_RETRY_BACKOFF_SECONDS = float(os.getenv('SINK_RETRY_BACKOFF_SECONDS', '2'))
+DEFAULT_SINKS = ('postgres', 'drive', 'local')
+# Errores de datos o configuración: reintentar no los resuelve.
+NON_RETRYABLE_ERRORS = (ValueError, TypeError, FileNotFoundError, AirflowFailException)
+
+
+class SinkError(Exception):
+    pass
+
+
+def encode_csv(data, path: str, compression: str = 'none') -> dict:
+    """
+    Codifica el artefacto (o DataFrame) una sola vez como CSV con encabezado,
+    escrito por lotes directamente desde la tabla Arrow (sin pasar por
+    pandas) y comprimido en streaming con gzip o zstd si se pide. Los textos
+    van entre comillas y los nulos quedan vacíos sin comillas, así COPY
+    distingue '' de NULL.
+
+    Retorna {'path', 'compression', 'sha256', 'num_bytes', 'num_rows'}.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    from tasks.artifacts import _is_handle, read_artifact_table
+    from tasks.drive_upload import COMPRESSIONS, file_sha256
+
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compresión no soportada: '{compression}'. Use una de {list(COMPRESSIONS)}.")
+    table = read_artifact_table(data) if _is_handle(data) else pa.Table.from_pandas(data, preserve_index=False)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with stage('encode_csv', rows_in=table.num_rows, compression=compression) as recorder:
+        with pa.output_stream(tmp_path, compression=None if compression == 'none' else compression) as sink:
+            pacsv.write_csv(table, sink, pacsv.WriteOptions(batch_size=CSV_BATCH_ROWS))
+        os.replace(tmp_path, path)
+        num_bytes = os.path.getsize(path)
+        recorder.record(bytes_written=num_bytes)
+    logging.info(f"{table.num_rows} filas codificadas una vez en {path} ({num_bytes} bytes, "
+                 f"{recorder.metrics['wall_seconds']:.2f}s).")
+    return {
+        'path': path,
+        'compression': compression,
+        'sha256': file_sha256(path),
+        'num_bytes': num_bytes,
+        'num_rows': table.num_rows,
+    }
+
+
+class LocalFileSink:
+    """Deja el CSV codificado en `path` (enlace duro si es posible, si no una copia)."""
+
+    name = 'local'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, encoded: dict, data) -> dict:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(encoded['path'], tmp_path)
+        except OSError:
+            shutil.copyfile(encoded['path'], tmp_path)
+        os.replace(tmp_path, self.path)
+        return {'path': self.path, 'bytes': encoded['num_bytes']}
+
+
+class PostgresSink:
+    """
+    Carga en PostgreSQL con tasks.load_to_db: todas las cargas envían el CSV
+    codificado tal cual con COPY; 'upsert' lo copia a una tabla temporal y
+    aplica solo las filas nuevas o modificadas.
+    """
+
+    name = 'postgres'
+
+    def __init__(self, table_name: str = TARGET_TABLE_NAME, schema_name: str = TARGET_SCHEMA_NAME,
+                 if_exists: str = 'upsert', batch_size: int = COPY_BATCH_SIZE):
+        self.table_name = table_name
+        self.schema_name = schema_name
+        self.if_exists = if_exists
+        self.batch_size = batch_size
+
+    def write(self, encoded: dict, data) -> dict:
+        from tasks.load_to_db import load_to_postgres
+
+        counts = load_to_postgres(data, self.table_name, self.schema_name, self.if_exists, 'copy',
+                                  self.batch_size, csv_file=encoded)
+        return {'table': f"{self.schema_name}.{self.table_name}", 'if_exists': self.if_exists, 'counts': counts}
+
+
+class DriveSink:
+    """Sube el CSV codificado a la carpeta FOLDER_ID de Google Drive (ver tasks.store)."""
+
+    name = 'drive'
+
+    def __init__(self, title: str, chunk_size_mb: float = None):
+        self.title = title
+        self.chunk_size_mb = chunk_size_mb
+
+    def write(self, encoded: dict, data) -> dict:
+        from tasks.drive_upload import COMPRESSIONS
+        from tasks.store import upload_file
+
+        mime_type = COMPRESSIONS[encoded['compression']][1]
+        return upload_file(encoded['path'], self.title, mime_type, encoded['sha256'], self.chunk_size_mb)
+
+
+def _run_sink(sink, encoded: dict, data, max_attempts: int, backoff_seconds: float) -> dict:
+    """Escribe en un destino con reintentos. Retorna su estado, intentos, tiempo y resultado."""
+    start_time = time.perf_counter()
+    with stage(f"sink_{sink.name}", bytes_read=encoded['num_bytes']) as recorder:
+        for attempt in range(1, max_attempts + 1):
+            try:
+                result = sink.write(encoded, data)
+                status, error = 'ok', None
+                break
+            except Exception as e:
+                status, result, error = 'failed', None, f"{type(e).__name__}: {e}"
+                if isinstance(e, NON_RETRYABLE_ERRORS) or attempt == max_attempts:
+                    logging.error(f"Destino '{sink.name}' falló en el intento {attempt}/{max_attempts}: {error}")
+                    break
+                wait = backoff_seconds * 2 ** (attempt - 1)
+                logging.warning(f"Destino '{sink.name}': el intento {attempt}/{max_attempts} falló ({error}); "
+                                f"se reintenta en {wait:.1f}s.")
+                time.sleep(wait)
+        recorder.record(attempts=attempt, status=status)
+    return {
+        'status': status,
+        'attempts': attempt,
+        'seconds': round(time.perf_counter() - start_time, 3),
+        'result': result,
+        'error': error,
+    }
+
+
+def fan_out(encoded: dict, sinks: list, data=None, max_attempts: int = SINK_MAX_ATTEMPTS,
+            backoff_seconds: float = SINK_RETRY_BACKOFF_SECONDS) -> dict:
+    """
+    Escribe el CSV codificado en todos los destinos a la vez (un hilo por
+    destino), así la latencia total es la del destino más lento y no la
+    suma. Cada destino reintenta por su cuenta; si alguno falla se esperan
+    los demás y luego se lanza SinkError. Retorna {nombre: estado} (ver
+    _run_sink).
+    """
+    with ThreadPoolExecutor(max_workers=len(sinks), thread_name_prefix='sink') as executor:
+        # Cada hilo corre en una copia del contexto para que su span cuelgue del de la tarea.
+        futures = {
+            sink.name: executor.submit(contextvars.copy_context().run, _run_sink,
+                                       sink, encoded, data, max_attempts, backoff_seconds)
+            for sink in sinks
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    for name, result in results.items():
+        logging.info(f"Destino '{name}': {result['status']} en {result['seconds']:.2f}s ({result['attempts']} intento(s)).")
+    failed = {name: result['error'] for name, result in results.items() if result['status'] != 'ok'}
+    if failed:
+        raise SinkError(f"Fallaron los destinos {failed}.")
+    return results
+
+
+@task(task_id="publish_merged_data")
+@traced_task
+def publish_merged_data(df: dict,
+                        title: str = 'merged_data.csv',
+                        sinks: list = DEFAULT_SINKS,
+                        table_name: str = TARGET_TABLE_NAME,
+                        schema_name: str = TARGET_SCHEMA_NAME,
+                        if_exists: str = 'upsert',
+                        compression: str = None,
+                        chunk_size_mb: float = None) -> dict:
+    """
+    Publica el dataset final en PostgreSQL ('postgres'), Google Drive
+    ('drive') y disco local ('local', en data/exports/) con una sola
+    codificación: el artefacto se escribe una vez como CSV en data/sinks/ y
+    ese archivo se envía a los destinos de `sinks` en paralelo, con
+    reintentos y tiempos por destino (ver fan_out).
+
+    `compression` ('none', 'gzip' o 'zstd'; por defecto
+    DRIVE_UPLOAD_COMPRESSION) se aplica al CSV compartido: se agrega la
+    extensión al título y PostgreSQL lo descomprime al vuelo. Retorna el
+    CSV codificado y el estado de cada destino.
+    """
+    from tasks.drive_upload import COMPRESSIONS
+
+    builders = {
+        'postgres': lambda: PostgresSink(table_name, schema_name, if_exists),
+        'drive': lambda: DriveSink(title, chunk_size_mb),
+        'local': lambda: LocalFileSink(os.path.join(os.getenv('AIRFLOW_HOME', '.'), EXPORT_REL_DIR, title)),
+    }
+    unknown = [name for name in sinks if name not in builders]
+    if unknown or not sinks:
+        raise ValueError(f"Destinos no soportados: {unknown or sinks}. Use algunos de {list(builders)}.")
+    if not title or not isinstance(title, str):
+        raise ValueError("Título no válido para el CSV publicado.")
+
+    compression = (compression or os.getenv('DRIVE_UPLOAD_COMPRESSION', 'none')).lower()
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compresión no soportada: '{compression}'. Use una de {list(COMPRESSIONS)}.")
+    extension = COMPRESSIONS[compression][0]
+    if not title.endswith(extension):
+        title += extension
+
+    start_time = time.perf_counter()
+    encoded = encode_csv(df, os.path.join(os.getenv('AIRFLOW_HOME', '.'), ENCODED_REL_DIR, title), compression)
+    results = fan_out(encoded, [builders[name]() for name in sinks], df)
+
+    slowest = max(results, key=lambda name: results[name]['seconds'])
+    logging.info(
+        f"Publicación de {title} completada en {time.perf_counter() - start_time:.2f}s: destino más lento "
+        f"'{slowest}' ({results[slowest]['seconds']:.2f}s); en serie habría tomado "
+        f"{sum(result['seconds'] for result in results.values()):.2f}s más la codificación."
+    )
+    return {'encoded': encoded, 'sinks': results}
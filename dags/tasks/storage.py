@@ -0,0 +1,255 @@
+# dags/tasks/storage.py
+
+import csv
+import logging
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from tasks.artifacts import table_to_pandas
+from tasks.telemetry import stage
+
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+# Exporta además el CSV de cada intermedio (para notebooks o revisión manual).
+EXPORT_CSV_INTERMEDIATES = os.getenv('EXPORT_CSV_INTERMEDIATES', 'false').lower() in ('1', 'true', 'yes')
+_CSV_BLOCK_BYTES = 16 << 20
+# Tokens que se leen como nulo: los mismos que pandas.read_csv por defecto.
+CSV_NULL_VALUES = list(pacsv.ConvertOptions().null_values) + ['<NA>']
+
+
+def parquet_path_for(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.parquet"
+
+
+def csv_path_for(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.csv"
+
+
+def _should_export_csv(export_csv) -> bool:
+    return EXPORT_CSV_INTERMEDIATES if export_csv is None else export_csv
+
+
+def intermediate_paths(path: str, export_csv: bool = None) -> list:
+    """Archivos que deja write_intermediate para `path` (el Parquet y, si se exporta, el CSV)."""
+    paths = [parquet_path_for(path)]
+    if _should_export_csv(export_csv):
+        paths.append(csv_path_for(path))
+    return paths
+
+
+def _log_write(kind: str, path: str, num_rows: int, seconds: float) -> None:
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    logging.info(f"{kind} escrito: {path} ({num_rows} filas, {size_mb:.2f} MB, {seconds:.2f}s).")
+
+
+def write_intermediate(df: pd.DataFrame, path: str, export_csv: bool = None) -> str:
+    """
+    Escribe `df` como Parquet comprimido (zstd, esquema de pandas embebido y
+    estadísticas por row group) en la ruta .parquet equivalente a `path`.
+    Con export_csv (o EXPORT_CSV_INTERMEDIATES=true) también deja el CSV.
+    Retorna la ruta del Parquet.
+    """
+    parquet_path = parquet_path_for(path)
+    os.makedirs(os.path.dirname(parquet_path) or '.', exist_ok=True)
+
+    with stage('write_intermediate', path=parquet_path, rows_out=len(df)) as recorder:
+        start_time = time.perf_counter()
+        tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+            compression=PARQUET_COMPRESSION, row_group_size=PARQUET_ROW_GROUP_ROWS, write_statistics=True
+        )
+        os.replace(tmp_path, parquet_path)
+        _log_write('Parquet', parquet_path, len(df), time.perf_counter() - start_time)
+        bytes_written = os.path.getsize(parquet_path)
+
+        if _should_export_csv(export_csv):
+            csv_path = csv_path_for(path)
+            start_time = time.perf_counter()
+            tmp_path = f"{csv_path}.{os.getpid()}.tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, csv_path)
+            _log_write('CSV exportado', csv_path, len(df), time.perf_counter() - start_time)
+            bytes_written += os.path.getsize(csv_path)
+        recorder.record(bytes_written=bytes_written)
+    return parquet_path
+
+
+class IntermediateWriter:
+    """
+    Escritura por bloques de un intermedio Parquet (y su CSV opcional).
+    Acepta DataFrames o tablas Arrow; el esquema se fija con el primer bloque
+    y el archivo solo aparece en su ruta final al cerrar.
+    """
+
+    def __init__(self, path: str, export_csv: bool = None):
+        self.path = parquet_path_for(path)
+        self.csv_path = csv_path_for(path) if _should_export_csv(export_csv) else None
+        self.num_rows = 0
+        self.schema = None
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._tmp_csv_path = f"{self.csv_path}.{os.getpid()}.tmp" if self.csv_path else None
+        self._writer = None
+        self._start_time = time.perf_counter()
+
+    def _to_table(self, data) -> pa.Table:
+        if isinstance(data, pd.DataFrame):
+            if self.schema is None:
+                return pa.Table.from_pandas(data, preserve_index=False)
+            return pa.Table.from_pandas(data, schema=self.schema, preserve_index=False)
+        table = pa.Table.from_batches([data]) if isinstance(data, pa.RecordBatch) else data
+        return table if self.schema is None else table.cast(self.schema)
+
+    def write(self, data) -> None:
+        table = self._to_table(data)
+        if self._writer is None:
+            # Una columna completamente nula en el primer bloque se tipa como string.
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+            ], metadata=table.schema.metadata)
+            table = table.cast(self.schema)
+            self._writer = pq.ParquetWriter(
+                self._tmp_path, self.schema, compression=PARQUET_COMPRESSION, write_statistics=True
+            )
+        self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_ROWS)
+
+        if self._tmp_csv_path:
+            df = data if isinstance(data, pd.DataFrame) else table_to_pandas(table)
+            df.to_csv(self._tmp_csv_path, index=False, mode='w' if self.num_rows == 0 else 'a', header=(self.num_rows == 0))
+        self.num_rows += table.num_rows
+
+    def close(self) -> str:
+        if self._writer is None:
+            raise ValueError(f"No se escribió ningún bloque en el intermedio '{self.path}'.")
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+        seconds = time.perf_counter() - self._start_time
+        _log_write('Parquet', self.path, self.num_rows, seconds)
+        if self._tmp_csv_path:
+            os.replace(self._tmp_csv_path, self.csv_path)
+            _log_write('CSV exportado', self.csv_path, self.num_rows, seconds)
+        return self.path
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        for path in (self._tmp_path, self._tmp_csv_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def _projected_convert_options(dtypes: dict = None) -> pacsv.ConvertOptions:
+    """Nulos como en pandas y, con `dtypes`, solo esas columnas con esos tipos."""
+    convert_options = pacsv.ConvertOptions(strings_can_be_null=True, null_values=CSV_NULL_VALUES)
+    if dtypes is not None:
+        convert_options.include_columns = list(dtypes)
+        convert_options.column_types = {col: pa.type_for_alias(dtype) for col, dtype in dtypes.items()}
+    return convert_options
+
+
+def open_csv_reader(csv_path: str, dtypes: dict = None, block_size: int = _CSV_BLOCK_BYTES) -> pacsv.CSVStreamingReader:
+    """
+    Lector por bloques (RecordBatches Arrow) de un CSV; los tipos se infieren
+    con el primer bloque y los campos vacíos se leen como null. Con `dtypes`
+    se proyecta y tipa igual que en read_csv_table, así todos los bloques
+    tienen el mismo esquema. El lector lee por adelantado varias decenas de
+    bloques de `block_size` bytes: para acotar la memoria, bloques chicos.
+    """
+    if dtypes is None:
+        convert_options = pacsv.ConvertOptions(strings_can_be_null=True)
+    else:
+        convert_options = _projected_convert_options(dtypes)
+    return pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=block_size),
+        convert_options=convert_options
+    )
+
+
+def csv_header(csv_path: str) -> list:
+    """Nombres de columna del encabezado del CSV, sin leer el resto del archivo."""
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def read_csv_table(csv_path: str, dtypes: dict = None, optional_columns=()) -> pa.Table:
+    """
+    Lee un CSV con el lector de pyarrow (bloques parseados en varios hilos).
+    Con `dtypes` ({columna: tipo Arrow, p. ej. 'string', 'int64'}) solo se
+    parsean esas columnas, en ese orden y con esos tipos, sin inferencia;
+    si falta alguna en el archivo se lanza un error, salvo las de
+    `optional_columns`, que se omiten si el encabezado no las tiene. Sin
+    `dtypes` se leen todas infiriendo los tipos. Los nulos se reconocen como
+    en pandas.
+    """
+    if dtypes is not None and optional_columns:
+        header = set(csv_header(csv_path))
+        missing = [col for col in optional_columns if col in dtypes and col not in header]
+        if missing:
+            logging.info(f"'{csv_path}' no tiene las columnas opcionales {missing}; se omiten.")
+            dtypes = {col: dtype for col, dtype in dtypes.items() if col not in missing}
+    return pacsv.read_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=_CSV_BLOCK_BYTES),
+        convert_options=_projected_convert_options(dtypes)
+    )
+
+
+def intermediate_columns(path: str) -> list:
+    """Columnas del intermedio, leídas del esquema Parquet (o del encabezado CSV) sin cargar datos."""
+    parquet_path = parquet_path_for(path)
+    if os.path.exists(parquet_path):
+        return pq.read_schema(parquet_path).names
+    return pd.read_csv(csv_path_for(path), nrows=0).columns.tolist()
+
+
+def column_max(path: str, column: str):
+    """Máximo de `column` según las estadísticas de los row groups del Parquet (None si no hay)."""
+    parquet_path = parquet_path_for(path)
+    if not os.path.exists(parquet_path):
+        return None
+    metadata = pq.ParquetFile(parquet_path).metadata
+    column_index = metadata.schema.names.index(column)
+    maxima = [
+        metadata.row_group(i).column(column_index).statistics.max
+        for i in range(metadata.num_row_groups)
+        if metadata.row_group(i).column(column_index).statistics is not None
+        and metadata.row_group(i).column(column_index).statistics.has_min_max
+    ]
+    return max(maxima) if maxima else None
+
+
+def read_intermediate(path: str, columns: list = None, dtypes: dict = None) -> pd.DataFrame:
+    """
+    Lee el intermedio desde Parquet (solo `columns`, si se indican). Si no
+    existe el Parquet pero sí el CSV equivalente, lo lee como antes, o con
+    read_csv_table si se pasan `dtypes` (que fijan también las columnas).
+    """
+    if dtypes is not None:
+        columns = list(dtypes)
+    parquet_path = parquet_path_for(path)
+    start_time = time.perf_counter()
+    with stage('read_intermediate') as recorder:
+        if os.path.exists(parquet_path):
+            df = table_to_pandas(pq.read_table(parquet_path, columns=columns))
+            source = parquet_path
+        else:
+            csv_path = csv_path_for(path)
+            if not os.path.exists(csv_path):
+                raise FileNotFoundError(f"No se encontró el intermedio: {parquet_path} ni {csv_path}")
+            logging.warning(f"No existe {parquet_path}; se lee el CSV {csv_path}.")
+            if dtypes is not None:
+                df = table_to_pandas(read_csv_table(csv_path, dtypes))
+            else:
+                df = pd.read_csv(csv_path, usecols=columns)
+            source = csv_path
+        recorder.record(path=source, rows_out=len(df), bytes_read=os.path.getsize(source))
+    logging.info(
+        f"Intermedio leído: {source} ({len(df)} filas, {len(df.columns)} columnas, "
+        f"{time.perf_counter() - start_time:.2f}s)."
+    )
+    return df
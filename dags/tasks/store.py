@@ -1,37 +1,59 @@
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
-from dotenv import load_dotenv
+from __future__ import annotations
 import os
-import pandas as pd
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
 import logging
-import json
-from typing import Union
 from airflow.decorators import task
+from tasks.telemetry import stage, traced_task
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(message)s",
-    datefmt="%d/%m/%Y %I:%M:%S %p"
-)
+# PyDrive2, dotenv and the upload code are imported when a task runs, not when the DAG is parsed.
+if TYPE_CHECKING:
+    from pydrive2.drive import GoogleDrive
 
-load_dotenv("env/.env")
+ENV_FILE = "env/.env"
+EXPORT_REL_DIR = 'data/exports'
+# The access token is refreshed when it has less than this left before expiring.
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _drive_settings() -> dict:
+    """Drive paths and folder from the environment (env/.env is loaded on first use, not at import)."""
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE)
+    return {
+        'client_secrets_file': os.getenv('CLIENT_SECRETS_PATH'),
+        'settings_file': os.getenv('SETTINGS_PATH'),
+        'credentials_file': os.getenv('SAVED_CREDENTIALS_PATH'),
+        'folder_id': os.getenv("FOLDER_ID"),
+    }
 
-client_secrets_file = os.getenv('CLIENT_SECRETS_PATH')
-settings_file = os.getenv('SETTINGS_PATH')
-credentials_file = os.getenv('SAVED_CREDENTIALS_PATH')
-folder_id = os.getenv("FOLDER_ID")
 
 def auth_drive():
     """
     Authenticates and returns a Google Drive instance using the PyDrive library.
+    Tasks should use get_drive_client(), which authenticates once per process.
     """
+    from pydrive2.auth import GoogleAuth
+    from pydrive2.drive import GoogleDrive
+
+    settings = _drive_settings()
+    client_secrets_file = settings['client_secrets_file']
+    settings_file = settings['settings_file']
+    credentials_file = settings['credentials_file']
     try:
         logging.info("Starting Google Drive authentication process.")
 
         logging.info(f"Client secrets path: {client_secrets_file}")
         logging.info(f"Settings file path: {settings_file}")
         logging.info(f"Credentials file path: {credentials_file}")
-        logging.info(f"Folder ID: {folder_id}")
+        logging.info(f"Folder ID: {settings['folder_id']}")
 
         if not os.path.exists(client_secrets_file):
             raise FileNotFoundError(f"Client secrets file not found at {client_secrets_file}")
@@ -67,37 +89,115 @@ def auth_drive():
         logging.error(f"Authentication error: {e}", exc_info=True)
         raise
 
+
+class DriveClient:
+    """
+    Authenticated GoogleDrive shared by the tasks and threads of a process.
+    access_token() refreshes the OAuth token before it expires (within
+    TOKEN_REFRESH_MARGIN_SECONDS) instead of waiting for a 401; refreshes
+    are serialized with a lock so concurrent uploads refresh only once.
+    """
+
+    def __init__(self, drive: GoogleDrive, credentials_file: str, folder_id: str):
+        self.drive = drive
+        self.credentials_file = credentials_file
+        self.folder_id = folder_id
+        self._lock = threading.Lock()
+
+    def _expires_soon(self) -> bool:
+        credentials = self.drive.auth.credentials
+        # oauth2client keeps token_expiry as a naive UTC datetime.
+        expiry = getattr(credentials, 'token_expiry', None)
+        if expiry is None:
+            return self.drive.auth.access_token_expired
+        return expiry - datetime.utcnow() < timedelta(seconds=TOKEN_REFRESH_MARGIN_SECONDS)
+
+    def access_token(self, force_refresh: bool = False) -> str:
+        with self._lock:
+            if force_refresh or self._expires_soon():
+                start_time = time.perf_counter()
+                self.drive.auth.Refresh()
+                self.drive.auth.SaveCredentialsFile(self.credentials_file)
+                logging.info(f"Google Drive access token refreshed in {time.perf_counter() - start_time:.2f}s.")
+            return self.drive.auth.credentials.access_token
+
+
+def get_drive_client() -> DriveClient:
+    """
+    Returns the process-wide DriveClient, authenticating on first use. A
+    forked process builds its own client instead of reusing the parent's.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            settings = _drive_settings()
+            _client = DriveClient(auth_drive(), settings['credentials_file'], settings['folder_id'])
+            _client_pid = os.getpid()
+        return _client
+
+
+def upload_file(path: str, title: str, mime_type: str = 'text/csv', content_hash: str = None,
+                chunk_size_mb: float = None) -> dict:
+    """
+    Uploads a file already written to disk to FOLDER_ID with the process-wide
+    DriveClient (see store_merged_data). Returns the DriveUploader result.
+    """
+    from tasks.drive_upload import DEFAULT_CHUNK_MB, DriveUploader
+
+    # Authenticated client (built once per process) and a fresh token
+    with stage('drive_auth') as recorder:
+        reused = _client is not None and _client_pid == os.getpid()
+        client = get_drive_client()
+        client.access_token()
+        recorder.record(client_reused=reused)
+    logging.info(
+        f"Google Drive client ready in {recorder.metrics['wall_seconds']:.2f}s "
+        f"({'reused' if reused else 'new'})."
+    )
+
+    chunk_size_mb = chunk_size_mb or float(os.getenv('DRIVE_UPLOAD_CHUNK_MB', DEFAULT_CHUNK_MB))
+    uploader = DriveUploader(client.access_token, chunk_size_mb=chunk_size_mb)
+    with stage('upload', bytes_read=os.path.getsize(path)) as recorder:
+        result = uploader.upload(path, title, client.folder_id, mime_type, content_hash)
+        recorder.record(bytes_written=result['bytes'], action=result['action'])
+    logging.info(f"Transfer of {title} took {recorder.metrics['wall_seconds']:.2f}s.")
+
+    logging.info(f"File {title} {result['action']} on Google Drive (id {result['id']}).")
+    return result
+
+
 @task
-def store_merged_data(title: str, df: Union[pd.DataFrame, str, dict]) -> None:
+@traced_task
+def store_merged_data(title: str, df: dict, compression: str = None, chunk_size_mb: float = None) -> dict:
     """
     Stores a given DataFrame as a CSV file on Google Drive.
 
+    The CSV is written to disk (data/exports/) and streamed to Drive with a
+    resumable upload, so the whole file never sits in memory. An existing
+    file with the same title in FOLDER_ID is updated in place, and nothing is
+    uploaded when its content hash matches the local file.
+
     Parameters:
         title (str): The title of the file to be stored on Google Drive.
-        df (Union[pd.DataFrame, str, dict]): The DataFrame to be stored as a CSV file.
-            Can be a DataFrame, JSON string, or dictionary (from XCom deserialization).
+        df (dict): Artifact handle (see tasks.artifacts) of the DataFrame to be
+            stored as a CSV file. A DataFrame is also accepted.
+        compression (str): 'none', 'gzip' or 'zstd' (default: DRIVE_UPLOAD_COMPRESSION
+            or 'none'). The matching extension is appended to the title.
+        chunk_size_mb (float): Size of each upload chunk (default: DRIVE_UPLOAD_CHUNK_MB or 8).
 
     Returns:
-        None
+        dict: Drive file id, action ('created', 'updated' or 'skipped') and bytes sent.
 
     Raises:
         ValueError: If the input DataFrame is empty or if title is empty.
         Exception: If there is an error during the upload process.
     """
+    from tasks.artifacts import read_artifact
+    from tasks.drive_upload import COMPRESSIONS, write_csv
+
     try:
-        # Handle different input types from XCom
-        if isinstance(df, str):
-            try:
-                # Try to parse as JSON string
-                df = pd.DataFrame(json.loads(df))
-            except json.JSONDecodeError as e:
-                logging.error(f"Invalid JSON string provided: {str(e)}")
-                raise
-        elif isinstance(df, dict):
-            # Handle dictionary (common XCom serialization format)
-            df = pd.DataFrame(df)
-        elif not isinstance(df, pd.DataFrame):
-            raise ValueError(f"Unsupported input type: {type(df)}. Expected DataFrame, JSON string, or dict.")
+        # Memory-map the artifact written by the merge task
+        df = read_artifact(df)
 
         # Validate DataFrame
         if df.empty:
@@ -105,27 +205,24 @@ def store_merged_data(title: str, df: Union[pd.DataFrame, str, dict]) -> None:
         if not title or not isinstance(title, str):
             raise ValueError("Invalid title provided")
 
-        # Authenticate Google Drive
-        drive = auth_drive()
+        compression = (compression or os.getenv('DRIVE_UPLOAD_COMPRESSION', 'none')).lower()
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported compression '{compression}'. Use one of {list(COMPRESSIONS)}.")
+        extension, mime_type = COMPRESSIONS[compression]
+        if not title.endswith(extension):
+            title += extension
 
         logging.info(f"Storing {title} on Google Drive.")
         logging.info(f"DataFrame has {len(df)} rows and {len(df.columns)} columns.")
 
-        # Convert DataFrame to CSV string
-        csv_file = df.to_csv(index=False)
-
-        # Create and upload file to Google Drive
-        file = drive.CreateFile({
-            "title": title,
-            "parents": [{"kind": "drive#fileLink", "id": folder_id}],
-            "mimeType": "text/csv"
-        })
+        # Write the CSV to disk in chunks (compressed on the fly if requested)
+        export_path = os.path.join(os.getenv('AIRFLOW_HOME', '.'), EXPORT_REL_DIR, title)
+        with stage('to_csv', rows_in=len(df), compression=compression) as recorder:
+            content_hash = write_csv(df, export_path, compression)
+            recorder.record(bytes_written=os.path.getsize(export_path))
 
-        file.SetContentString(csv_file)
-        file.Upload()
-
-        logging.info(f"File {title} uploaded successfully.")
+        return upload_file(export_path, title, mime_type, content_hash, chunk_size_mb)
 
     except Exception as e:
         logging.error(f"Error storing data on Google Drive: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,329 @@
+# dags/tasks/task_cache.py
+
+import ast
+import functools
+import hashlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from collections.abc import Sequence
+from tasks.telemetry import stage
+
+TASK_CACHE_REL_DIR = 'data/task_cache'
+TASK_CACHE_MAX_MB = float(os.getenv('TASK_CACHE_MAX_MB', '2048'))
+# 'true' recalcula todas las tareas; también acepta una lista de tareas separadas por coma.
+FORCE_REFRESH_ENV = 'TASK_CACHE_FORCE_REFRESH'
+DISABLED_ENV = 'TASK_CACHE_DISABLED'
+# Se incrementa si cambia el formato de la clave o de las entradas.
+CACHE_FORMAT_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    task_name TEXT NOT NULL,
+    handle TEXT NOT NULL,
+    object_path TEXT NOT NULL,
+    num_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used_at ON entries (last_used_at);
+CREATE TABLE IF NOT EXISTS entry_outputs (
+    cache_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (cache_key, path)
+);
+CREATE TABLE IF NOT EXISTS file_digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    tmp_path = f"{destination}.{os.getpid()}.tmp"
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+class TaskCache:
+    """
+    Caché direccionada por contenido de las salidas de las tareas. Cada
+    entrada asocia una clave (hash de entradas, versión del código y
+    parámetros) al handle del artefacto producido, cuya copia se guarda en
+    `objects/` (enlace duro si es posible), junto con el checksum de los
+    archivos que la tarea escribe además del artefacto. El tamaño total se
+    limita con desalojo LRU.
+    """
+
+    def __init__(self, cache_dir: str, max_mb: float = TASK_CACHE_MAX_MB):
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def file_digest(self, path: str):
+        """Checksum del archivo, recalculado solo si cambió su tamaño o fecha de modificación."""
+        from tasks.artifacts import _file_checksum
+
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        row = self._conn.execute("SELECT size, mtime_ns, digest FROM file_digests WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = _file_checksum(path)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_digests (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest)
+            )
+        return digest
+
+    def get(self, cache_key: str, outputs: list = ()):
+        """
+        Retorna el handle guardado (restaurando el artefacto si fue eliminado)
+        o None. También es None si alguno de `outputs` falta o no tiene el
+        contenido que dejó la ejecución guardada (otra ejecución lo sobrescribió).
+        """
+        row = self._conn.execute("SELECT handle, object_path FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        if row is None:
+            return None
+        handle, object_path = json.loads(row[0]), row[1]
+        if not os.path.exists(object_path):
+            self._delete_entry(cache_key)
+            return None
+        recorded = dict(self._conn.execute("SELECT path, digest FROM entry_outputs WHERE cache_key = ?", (cache_key,)).fetchall())
+        for path in outputs:
+            if recorded.get(path) is None or self.file_digest(path) != recorded[path]:
+                logging.info(f"Caché de tareas: '{path}' falta o cambió desde la ejecución guardada.")
+                return None
+        if not os.path.exists(handle['path']):
+            _link_or_copy(object_path, handle['path'])
+            logging.info(f"Artefacto restaurado desde la caché de tareas: {handle['path']}")
+        with self._conn:
+            self._conn.execute("UPDATE entries SET last_used_at = ? WHERE cache_key = ?", (time.time(), cache_key))
+        return handle
+
+    def put(self, cache_key: str, task_name: str, handle: dict, outputs: list = ()) -> None:
+        object_path = os.path.join(self.cache_dir, 'objects', f"{handle['checksum'].split(':', 1)[1]}.arrow")
+        if not os.path.exists(object_path):
+            _link_or_copy(handle['path'], object_path)
+        output_digests = [(cache_key, path, self.file_digest(path)) for path in outputs if os.path.exists(path)]
+        now = time.time()
+        with self._conn:
+            self._conn.execute("DELETE FROM entry_outputs WHERE cache_key = ?", (cache_key,))
+            self._conn.executemany("INSERT INTO entry_outputs (cache_key, path, digest) VALUES (?, ?, ?)", output_digests)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (cache_key, task_name, handle, object_path, num_bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, task_name, json.dumps(handle), object_path, handle['num_bytes'], now, now)
+            )
+        self.evict()
+
+    def _delete_entry(self, cache_key: str) -> None:
+        with self._conn:
+            row = self._conn.execute("SELECT object_path FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+            self._conn.execute("DELETE FROM entries WHERE cache_key = ?", (cache_key,))
+            self._conn.execute("DELETE FROM entry_outputs WHERE cache_key = ?", (cache_key,))
+            if row and not self._conn.execute("SELECT 1 FROM entries WHERE object_path = ?", (row[0],)).fetchone():
+                if os.path.exists(row[0]):
+                    os.remove(row[0])
+
+    def total_bytes(self) -> int:
+        # Varias entradas pueden compartir el mismo objeto: se cuenta una vez.
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(num_bytes), 0) FROM (SELECT object_path, MAX(num_bytes) AS num_bytes FROM entries GROUP BY object_path)"
+        ).fetchone()[0]
+
+    def evict(self) -> int:
+        """Elimina las entradas usadas hace más tiempo hasta quedar bajo el límite. Retorna cuántas se borraron."""
+        evicted = 0
+        while self.total_bytes() > self.max_bytes:
+            row = self._conn.execute("SELECT cache_key, task_name FROM entries ORDER BY last_used_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._delete_entry(row[0])
+            evicted += 1
+            logging.info(f"Entrada de la caché de tareas desalojada (LRU): {row[1]} {row[0][:12]}")
+        return evicted
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_task_cache(cache_rel_dir: str = TASK_CACHE_REL_DIR) -> TaskCache:
+    """Abre la caché de tareas bajo AIRFLOW_HOME."""
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    return TaskCache(os.path.join(airflow_home, cache_rel_dir))
+
+
+def _module_spec(module_name: str):
+    # find_spec importa los paquetes padre (no el módulo en sí).
+    try:
+        return importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+
+
+def _module_file(module_name: str):
+    """Ruta del código fuente del módulo, sin importarlo (None si no tiene archivo)."""
+    spec = _module_spec(module_name)
+    # Los paquetes de espacio de nombres (sin __init__.py) no tienen archivo.
+    return spec.origin if spec is not None and spec.has_location else None
+
+
+def _package_imports(path: str, package: str) -> set:
+    """
+    Módulos del paquete que importa el archivo, también los importados dentro
+    de funciones (las tareas importan sus dependencias al ejecutarse).
+    """
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            if node.module.split('.')[0] != package:
+                continue
+            names.add(node.module)
+            # `from paquete import modulo` también importa un módulo.
+            spec = _module_spec(node.module)
+            if spec is not None and spec.submodule_search_locations is not None:
+                names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return {name for name in names if name.split('.')[0] == package}
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(module_name: str) -> str:
+    """
+    Hash del código fuente del módulo y de los módulos de su paquete de los
+    que depende (directa o indirectamente).
+    """
+    package = module_name.split('.')[0]
+    files, pending = {}, [module_name]
+    while pending:
+        name = pending.pop()
+        if name in files:
+            continue
+        files[name] = _module_file(name)
+        if files[name] is not None:
+            pending.extend(_package_imports(files[name], package))
+
+    digest = hashlib.sha256()
+    for name in sorted(name for name, path in files.items() if path is not None):
+        digest.update(name.encode('utf-8'))
+        with open(files[name], 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _param_fingerprint(value):
+    import pandas as pd
+    from tasks.artifacts import _is_handle
+
+    if _is_handle(value):
+        return value['checksum']
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        # Listas de handles, p. ej. la salida de una tarea mapeada con .expand().
+        return [_param_fingerprint(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return hashlib.sha256(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes()).hexdigest()
+    return value
+
+
+def _force_refresh(task_name: str) -> bool:
+    value = os.getenv(FORCE_REFRESH_ENV, '').strip().lower()
+    if value in ('1', 'true', 'yes', 'all'):
+        return True
+    return task_name.lower() in {name.strip() for name in value.split(',') if name.strip()}
+
+
+def airflow_paths(*param_names):
+    """Para `inputs`/`outputs`: rutas de los parámetros indicados, relativas a AIRFLOW_HOME."""
+    def resolve(params: dict) -> list:
+        airflow_home = os.getenv('AIRFLOW_HOME', '.')
+        return [os.path.join(airflow_home, params[name]) for name in param_names]
+    return resolve
+
+
+def cached_task(inputs=None, outputs=None, enabled=None):
+    """
+    Reutiliza el artefacto de una ejecución anterior cuando coinciden la
+    versión del código, los parámetros (los handles se comparan por
+    checksum) y el contenido de los archivos de entrada.
+
+    inputs(params) -> rutas de archivos leídos por la tarea (parte de la clave).
+    outputs(params) -> archivos que la tarea escribe además del artefacto;
+        si falta alguno o su contenido no es el que dejó la ejecución
+        guardada (otra ejecución escribió en la misma ruta), la tarea se
+        vuelve a ejecutar.
+    enabled(params) -> False para no usar la caché (p. ej. datos de una API).
+
+    Se aplica debajo de @task (y de @traced_task). Con TASK_CACHE_DISABLED=true
+    no se usa; TASK_CACHE_FORCE_REFRESH fuerza el recálculo.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        task_name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # artifacts importa pandas y pyarrow: se carga al ejecutar la tarea, no al parsear el DAG.
+            from tasks.artifacts import _is_handle
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            disabled = os.getenv(DISABLED_ENV, 'false').lower() in ('1', 'true', 'yes')
+            if disabled or (enabled is not None and not enabled(params)):
+                return func(*args, **kwargs)
+
+            with stage('task_cache_lookup') as recorder, open_task_cache() as cache:
+                cache_key = hashlib.sha256(json.dumps({
+                    'format': CACHE_FORMAT_VERSION,
+                    'task': f"{func.__module__}.{func.__qualname__}",
+                    'code': code_version(func.__module__),
+                    'params': {name: _param_fingerprint(value) for name, value in params.items()},
+                    'inputs': {path: cache.file_digest(path) for path in (inputs(params) if inputs else [])},
+                }, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+                output_paths = outputs(params) if outputs else []
+                handle = None
+                if _force_refresh(task_name):
+                    logging.info(f"Caché de tareas: recálculo forzado de '{task_name}'.")
+                else:
+                    handle = cache.get(cache_key, output_paths)
+                recorder.record(cache_hit=handle is not None)
+            if handle is not None:
+                logging.info(f"Caché de tareas: '{task_name}' sin cambios (clave {cache_key[:12]}), se reutiliza {handle['path']}.")
+                return handle
+
+            result = func(*args, **kwargs)
+            if _is_handle(result):
+                with open_task_cache() as cache:
+                    cache.put(cache_key, task_name, result, output_paths)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,201 @@
+# dags/tasks/telemetry.py
+
+import functools
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Destino de los spans: 'none' (por defecto), 'file' (JSON por línea),
+# 'console' (stdout, queda en el log de la tarea) u 'otlp' (colector según
+# OTEL_EXPORTER_OTLP_*).
+TELEMETRY_EXPORTER_ENV = 'TASK_TELEMETRY_EXPORTER'
+TELEMETRY_FILE_ENV = 'TASK_TELEMETRY_FILE'
+DEFAULT_EXPORTER = 'none'
+DEFAULT_TELEMETRY_REL_PATH = 'logs/task_spans.jsonl'
+SERVICE_NAME = 'spotify_grammys_etl'
+ATTRIBUTE_PREFIX = 'etl.'
+# Variables que Airflow define en el proceso de cada tarea.
+_AIRFLOW_CONTEXT_ENV = {
+    'airflow.dag_id': 'AIRFLOW_CTX_DAG_ID',
+    'airflow.task_id': 'AIRFLOW_CTX_TASK_ID',
+    'airflow.run_id': 'AIRFLOW_CTX_DAG_RUN_ID',
+    'airflow.try_number': 'AIRFLOW_CTX_TRY_NUMBER',
+}
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _telemetry_file_path():
+    """TASK_TELEMETRY_FILE, o logs/ de AIRFLOW_HOME; None si no hay ninguno de los dos."""
+    path = os.getenv(TELEMETRY_FILE_ENV)
+    if path:
+        return path
+    if os.getenv('AIRFLOW_HOME'):
+        return os.path.join(os.getenv('AIRFLOW_HOME'), DEFAULT_TELEMETRY_REL_PATH)
+    return None
+
+
+def _file_span_exporter(path: str):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    class FileSpanExporter(ConsoleSpanExporter):
+        """Un JSON por span en `path`; el archivo se cierra al apagar el proveedor."""
+
+        def shutdown(self) -> None:
+            if not self.out.closed:
+                self.out.close()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return FileSpanExporter(
+        out=open(path, 'a', encoding='utf-8'),
+        formatter=lambda span: span.to_json(indent=None) + os.linesep
+    )
+
+
+def _build_tracer():
+    # OpenTelemetry se importa al crear el primer span, no al parsear el DAG.
+    from opentelemetry import trace
+
+    exporter_name = os.getenv(TELEMETRY_EXPORTER_ENV, DEFAULT_EXPORTER).lower()
+    if exporter_name == 'none':
+        return trace.NoOpTracer()
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+
+    if exporter_name == 'file' and _telemetry_file_path() is None:
+        logging.warning(
+            f"{TELEMETRY_EXPORTER_ENV}=file requiere {TELEMETRY_FILE_ENV} o AIRFLOW_HOME; no se exportarán spans."
+        )
+        return trace.NoOpTracer()
+
+    # Proveedor propio (no global) para no interferir con la configuración
+    # de OpenTelemetry del propio Airflow. Al salir del proceso se apaga
+    # (shutdown_on_exit), lo que vacía los procesadores y cierra el archivo.
+    provider = TracerProvider(resource=Resource.create({'service.name': SERVICE_NAME}), shutdown_on_exit=True)
+    if exporter_name == 'file':
+        provider.add_span_processor(SimpleSpanProcessor(_file_span_exporter(_telemetry_file_path())))
+    elif exporter_name == 'console':
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+    elif exporter_name == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    else:
+        logging.warning(f"Exportador de telemetría desconocido '{exporter_name}'; no se exportarán spans.")
+        return trace.NoOpTracer()
+    return provider.get_tracer(__name__)
+
+
+def get_tracer():
+    """Tracer de las tareas, creado la primera vez que se usa (según TASK_TELEMETRY_EXPORTER)."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = _build_tracer()
+    return _tracer
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _memory_mb() -> tuple:
+    """(RSS actual, pico de RSS del proceso) en MB."""
+    rss, peak = _proc_status_mb('VmRSS'), _proc_status_mb('VmHWM')
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    return (rss if rss is not None else peak), peak
+
+
+class StageRecorder:
+    """Registra las métricas de una etapa (filas, bytes, ...) como atributos de su span."""
+
+    def __init__(self, span):
+        self.span = span
+        self.metrics = {}
+
+    def record(self, **metrics) -> None:
+        for key, value in metrics.items():
+            if value is None:
+                continue
+            self.metrics[key] = value
+            self.span.set_attribute(f"{ATTRIBUTE_PREFIX}{key}", value)
+
+
+@contextmanager
+def stage(name: str, **metrics):
+    """
+    Span de una etapa de una tarea. Al cerrar agrega el tiempo de reloj y de
+    CPU, la memoria (RSS, pico del proceso y cuánto lo subió la etapa) y lo
+    registrado con `record` (rows_in, rows_out, bytes_read, bytes_written, ...).
+    """
+    with get_tracer().start_as_current_span(name) as span:
+        recorder = StageRecorder(span)
+        recorder.record(**metrics)
+        rss_before, peak_before = _memory_mb()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield recorder
+        finally:
+            rss_after, peak_after = _memory_mb()
+            recorder.record(
+                wall_seconds=round(time.perf_counter() - wall_start, 6),
+                cpu_seconds=round(time.process_time() - cpu_start, 6),
+                rss_mb=round(rss_after, 1),
+                rss_delta_mb=round(rss_after - rss_before, 1),
+                peak_rss_mb=round(peak_after, 1),
+                peak_growth_mb=round(peak_after - peak_before, 1),
+            )
+
+
+def _handle_metrics(values) -> tuple:
+    """Suma filas y bytes de los handles de artefactos entre `values`."""
+    handles = [v for v in values if isinstance(v, dict) and 'num_rows' in v]
+    if not handles:
+        return None, None
+    return sum(h['num_rows'] for h in handles), sum(h.get('num_bytes', 0) for h in handles)
+
+
+def traced_task(func):
+    """
+    Envuelve una tarea en un span raíz con sus etapas como hijos. Las filas
+    y bytes de entrada/salida se toman de los handles de artefactos que
+    recibe y retorna. Se aplica debajo de @task para que `.function` también
+    quede instrumentada.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__) as recorder:
+            for attribute, env_var in _AIRFLOW_CONTEXT_ENV.items():
+                if os.getenv(env_var):
+                    recorder.span.set_attribute(attribute, os.getenv(env_var))
+            rows_in, bytes_read = _handle_metrics(list(args) + list(kwargs.values()))
+            recorder.record(rows_in=rows_in, bytes_read=bytes_read)
+
+            result = func(*args, **kwargs)
+
+            rows_out, bytes_written = _handle_metrics([result])
+            recorder.record(rows_out=rows_out, bytes_written=bytes_written)
+        metrics = recorder.metrics
+        logging.info(
+            f"Telemetría de '{func.__name__}': {metrics['wall_seconds']:.2f}s "
+            f"(CPU {metrics['cpu_seconds']:.2f}s), filas {metrics.get('rows_in', '-')} -> {metrics.get('rows_out', '-')}, "
+            f"pico de RSS {metrics['peak_rss_mb']:.0f} MB."
+        )
+        return result
+    return wrapper
@@ -1,9 +1,19 @@
 # dags/tasks/transform_csv_data.py
 
-import pandas as pd
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from airflow.decorators import task
 import logging
 import os
+from tasks.extract_csv import SPOTIFY_CSV_REL_PATH, SPOTIFY_RAW_DTYPES
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import airflow_paths, cached_task
+
+# pandas, numpy y los módulos que los usan se importan al ejecutar la tarea:
+# el scheduler importa este módulo en cada parseo del DAG.
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 GENRE_CATEGORIES = {
     'Rock': ['alt-rock', 'alternative', 'emo', 'goth', 'grunge', 'hard-rock', 'indie', 'punk-rock', 'punk', 'psych-rock', 'rock', 'rock-n-roll', 'rockabilly'],
@@ -23,89 +33,287 @@ GENRE_CATEGORIES = {
     'Other': ['ambient', 'british', 'chill', 'funk', 'gospel', 'groove', 'guitar', 'happy', 'hardcore', 'party', 'romance', 'sad', 'ska']
 }
 
+GENRE_TO_CATEGORY = {genre.lower().strip(): category for category, genres in GENRE_CATEGORIES.items() for genre in genres}
+
+COLS_TO_CHECK_NA = ['artists', 'album_name', 'track_name']
+COLS_TO_DROP = [
+    'Unnamed: 0', 'key', 'mode', 'speechiness',
+    'liveness', 'time_signature', 'loudness',
+    'acousticness', 'instrumentalness', 'valence',
+    'tempo'
+]
+CLEANED_REL_PATH = 'data/processed/spotify_dataset_cleaned.parquet'
+
+# Modo streaming: techo de memoria por bloque y filas usadas para estimarlo.
+STREAMING_MEMORY_LIMIT_MB = 256
+STREAMING_SAMPLE_ROWS = 5000
+# Bloques del lector CSV en streaming: acotan lo que pyarrow lee por adelantado.
+_STREAMING_BLOCK_BYTES = 1 << 20
+# Factor de copias simultáneas de un bloque durante la transformación.
+_CHUNK_MEMORY_FACTOR = 4
+
+
+def _normalize_text_columns(df: pd.DataFrame, object_cols, max_workers=None) -> pd.DataFrame:
+    from tasks.normalization import normalize_text
+
+    for col in object_cols:
+        if col in df.columns:
+             try:
+                  df[col] = normalize_text(df[col], max_workers=max_workers)
+             except Exception as e:
+                  logging.warning(f"No se pudo normalizar la columna '{col}': {e}")
+        else:
+             logging.warning(f"La columna '{col}' ya no existe en el DataFrame antes de la normalización.")
+    return df
+
+
+def _categorize_genres(df: pd.DataFrame) -> pd.DataFrame:
+    df['genre_category'] = df['track_genre'].map(GENRE_TO_CATEGORY).fillna('Other')
+    return df.drop(columns=['track_genre'])
+
+
+def _convert_duration(df: pd.DataFrame) -> pd.DataFrame:
+    df['duration_min'] = (df['duration_ms'] / 60000).round(2)
+    return df.drop(columns=['duration_ms'])
+
+
+def _cleaned_output_path() -> str:
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    output_path = os.path.join(airflow_home, CLEANED_REL_PATH)
+    output_dir = os.path.dirname(output_path)
+    os.makedirs(output_dir, exist_ok=True)
+    logging.info(f"Asegurando que el directorio de salida exista: {output_dir}")
+    return output_path
+
+
+def _cache_inputs(params: dict) -> list:
+    # En streaming la tarea lee el CSV directamente en lugar del artefacto.
+    return airflow_paths('csv_rel_path')(params) if params['streaming'] else []
+
+
+def _cache_outputs(params: dict) -> list:
+    from tasks.storage import intermediate_paths
+    return intermediate_paths(os.path.join(os.getenv('AIRFLOW_HOME', '.'), CLEANED_REL_PATH))
+
+
 @task(task_id="transform_spotify_data")
-def transform_spotify_data(raw_spotify_df: pd.DataFrame) -> pd.DataFrame:
+@traced_task
+@cached_task(inputs=_cache_inputs, outputs=_cache_outputs)
+def transform_spotify_data(raw_spotify_df: dict = None,
+                           streaming: bool = False,
+                           csv_rel_path: str = SPOTIFY_CSV_REL_PATH,
+                           chunk_size: int = None,
+                           memory_limit_mb: int = STREAMING_MEMORY_LIMIT_MB,
+                           max_workers: int = None,
+                           dtypes: dict = SPOTIFY_RAW_DTYPES) -> dict:
     """
     Transforma el DataFrame de Spotify: limpia datos, normaliza strings,
     categoriza géneros, convierte duración y elimina columnas innecesarias.
+    Recibe y retorna handles de artefactos (ver tasks.artifacts).
+
+    Con streaming=True lee `csv_rel_path` por bloques (de `chunk_size` filas o
+    del tamaño que quepa en `memory_limit_mb`) y escribe la salida de forma
+    incremental; el resultado es el mismo que el de la ruta en memoria. Como
+    extract_spotify, solo lee las columnas de `dtypes` con esos tipos.
+
+    La normalización de texto se reparte en `max_workers` procesos (por
+    defecto NORMALIZATION_MAX_WORKERS, ver tasks.parallel).
     """
+    from tasks.artifacts import read_artifact, write_artifact
+    from tasks.schemas import SPOTIFY_SCHEMA, enforce_schema
+    from tasks.storage import write_intermediate
+
+    if streaming:
+        return _transform_spotify_streaming(csv_rel_path, chunk_size, memory_limit_mb, max_workers, dtypes)
+
     logging.info("Iniciando transformación del dataset de Spotify...")
     try:
-        df = raw_spotify_df.copy()
+        df = read_artifact(raw_spotify_df).copy()
         logging.info(f"DataFrame inicial con {len(df)} filas y columnas: {df.columns.tolist()}")
 
-        df = df.drop_duplicates(subset=['track_id'])
-        logging.info(f"Filas después de eliminar duplicados por track_id: {len(df)}")
-        
-        cols_to_check_na = ['artists', 'album_name', 'track_name']
-        initial_rows = len(df)
-        df = df.dropna(subset=[col for col in cols_to_check_na if col in df.columns])
-        rows_dropped = initial_rows - len(df)
+        with stage('drop_duplicates_and_nulls', rows_in=len(df)) as recorder:
+            df = df.drop_duplicates(subset=['track_id'])
+            logging.info(f"Filas después de eliminar duplicados por track_id: {len(df)}")
+
+            initial_rows = len(df)
+            df = df.dropna(subset=[col for col in COLS_TO_CHECK_NA if col in df.columns])
+            rows_dropped = initial_rows - len(df)
+            recorder.record(rows_out=len(df))
         if rows_dropped > 0:
-             logging.info(f"Se eliminaron {rows_dropped} filas con valores nulos en {cols_to_check_na}. Filas restantes: {len(df)}")
+             logging.info(f"Se eliminaron {rows_dropped} filas con valores nulos en {COLS_TO_CHECK_NA}. Filas restantes: {len(df)}")
         else:
-             logging.info(f"No se encontraron filas con valores nulos en {cols_to_check_na}.")
+             logging.info(f"No se encontraron filas con valores nulos en {COLS_TO_CHECK_NA}.")
 
         logging.info("Normalizando columnas de texto (minúsculas y sin espacios extra)...")
         object_cols = df.select_dtypes(include=['object']).columns
         logging.info(f"Columnas tipo 'object' a normalizar: {object_cols.tolist()}")
-        for col in object_cols:
-            if col in df.columns:
-                 try:
-                      df[col] = df[col].astype(str).str.lower().str.strip()
-                 except Exception as e:
-                      logging.warning(f"No se pudo normalizar la columna '{col}': {e}")
-            else:
-                 logging.warning(f"La columna '{col}' ya no existe en el DataFrame antes de la normalización.")
+        with stage('normalize_text', rows_in=len(df), columns=len(object_cols)):
+            df = _normalize_text_columns(df, object_cols, max_workers)
         logging.info("Normalización de texto completada.")
 
         if 'track_genre' in df.columns:
             logging.info("Categorizando géneros...")
-            genre_to_category = {genre.lower().strip(): category for category, genres in GENRE_CATEGORIES.items() for genre in genres}
-            df['genre_category'] = df['track_genre'].map(genre_to_category).fillna('Other')
+            df = _categorize_genres(df)
             logging.info(f"Categorías de género asignadas: {df['genre_category'].unique().tolist()}")
-            df = df.drop(columns=['track_genre'])
             logging.info("Columna 'track_genre' eliminada.")
         else:
             logging.warning("La columna 'track_genre' no se encontró para categorización.")
 
         if 'duration_ms' in df.columns:
             logging.info("Convirtiendo duración de ms a minutos...")
-            df['duration_min'] = (df['duration_ms'] / 60000).round(2)
-
-            df = df.drop(columns=['duration_ms'])
+            df = _convert_duration(df)
             logging.info("Columna 'duration_ms' eliminada y 'duration_min' creada.")
         elif 'duration_min' not in df.columns:
             logging.warning("No se encontró la columna 'duration_ms' para convertir a minutos.")
         else:
             logging.info("La columna 'duration_min' ya existe.")
 
-        cols_to_drop = [
-            'Unnamed: 0', 'key', 'mode', 'speechiness',
-            'liveness', 'time_signature', 'loudness',
-            'acousticness', 'instrumentalness', 'valence',
-            'tempo'
-        ]
-        cols_actually_dropped = [col for col in cols_to_drop if col in df.columns]
+        cols_actually_dropped = [col for col in COLS_TO_DROP if col in df.columns]
         if cols_actually_dropped:
              df = df.drop(columns=cols_actually_dropped, errors='ignore')
              logging.info(f"Columnas eliminadas: {cols_actually_dropped}")
         else:
              logging.info("No se encontraron columnas adicionales para eliminar de la lista predefinida.")
 
-        airflow_home = os.getenv('AIRFLOW_HOME', '.')
-        output_dir = os.path.join(airflow_home, 'data', 'processed')
-        output_path = os.path.join(output_dir, 'spotify_dataset_cleaned.csv')
-        os.makedirs(output_dir, exist_ok=True)
-        logging.info(f"Asegurando que el directorio de salida exista: {output_dir}")
+        df = enforce_schema(df, SPOTIFY_SCHEMA, 'spotify_clean')
 
-        df.to_csv(output_path, index=False)
+        output_path = write_intermediate(df, _cleaned_output_path())
         logging.info(f"Transformación completada. Dataset guardado en: {output_path}")
         logging.info(f"Dataset final con {len(df)} filas.")
         logging.info(f"Columnas finales: {df.columns.tolist()}")
 
-        return df
+        return write_artifact(df, 'spotify_clean')
 
     except Exception as e:
         logging.error(f"Error durante la transformación de datos de Spotify: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+
+def _rows_for_memory_limit(sample: pd.DataFrame, memory_limit_mb: int) -> int:
+    """Estima cuántas filas caben en el techo de memoria a partir de una muestra."""
+    bytes_per_row = max(1.0, sample.memory_usage(index=True, deep=True).sum() / max(len(sample), 1))
+    return max(1000, int(memory_limit_mb * 1024 * 1024 / (bytes_per_row * _CHUNK_MEMORY_FACTOR)))
+
+
+def _transform_chunk(chunk: pd.DataFrame, seen_hashes: np.ndarray, object_cols, max_workers=None):
+    """
+    Aplica a un bloque los mismos pasos que la ruta en memoria. La
+    deduplicación entre bloques usa hashes de 64 bits de track_id guardados
+    en un arreglo ordenado (8 bytes por track).
+    """
+    import numpy as np
+    import pandas as pd
+    from tasks.schemas import SPOTIFY_SCHEMA, enforce_schema, without_categories
+
+    hashes = pd.util.hash_pandas_object(chunk['track_id'], index=False).to_numpy()
+    # Búsqueda binaria en el arreglo ordenado y mezcla de los hashes nuevos
+    # (ordenados) sin reordenar todo lo ya visto.
+    already_seen = np.zeros(len(hashes), dtype=bool)
+    if len(seen_hashes):
+        positions = np.minimum(np.searchsorted(seen_hashes, hashes), len(seen_hashes) - 1)
+        already_seen = seen_hashes[positions] == hashes
+    keep = ~pd.Series(hashes).duplicated().to_numpy() & ~already_seen
+    new_hashes = np.sort(hashes[keep])
+    seen_hashes = np.insert(seen_hashes, np.searchsorted(seen_hashes, new_hashes), new_hashes)
+    rows_deduplicated = len(chunk) - int(keep.sum())
+
+    df = chunk[keep]
+    rows_before_na = len(df)
+    df = df.dropna(subset=[col for col in COLS_TO_CHECK_NA if col in df.columns])
+    rows_dropped = rows_before_na - len(df)
+
+    df = _normalize_text_columns(df.copy(), object_cols, max_workers)
+    if 'track_genre' in df.columns:
+        df = _categorize_genres(df)
+    if 'duration_ms' in df.columns:
+        df = _convert_duration(df)
+    df = df.drop(columns=[col for col in COLS_TO_DROP if col in df.columns])
+    # Cada bloque tendría categorías distintas: se guardan como texto Arrow.
+    df = enforce_schema(df, without_categories(SPOTIFY_SCHEMA), 'spotify_clean (bloque)')
+    return df, seen_hashes, rows_deduplicated, rows_dropped
+
+
+def _iter_row_chunks(batches, chunk_size: int):
+    """Reagrupa los RecordBatches del lector CSV en tablas de `chunk_size` filas."""
+    import pyarrow as pa
+
+    pending, pending_rows = [], 0
+    for batch in batches:
+        while batch.num_rows:
+            take = min(batch.num_rows, chunk_size - pending_rows)
+            pending.append(batch.slice(0, take))
+            pending_rows += take
+            batch = batch.slice(take)
+            if pending_rows == chunk_size:
+                yield pa.Table.from_batches(pending)
+                pending, pending_rows = [], 0
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+
+def _transform_spotify_streaming(csv_rel_path: str, chunk_size: int, memory_limit_mb: int, max_workers: int = None,
+                                 dtypes: dict = SPOTIFY_RAW_DTYPES) -> dict:
+    import itertools
+    import numpy as np
+    import pyarrow as pa
+    from tasks.artifacts import ArtifactWriter, table_to_pandas
+    from tasks.storage import IntermediateWriter, open_csv_reader
+
+    airflow_home = os.getenv('AIRFLOW_HOME', '.')
+    input_path = os.path.join(airflow_home, csv_rel_path)
+    logging.info(f"Iniciando transformación en streaming del dataset de Spotify desde: {input_path}")
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Archivo CSV no encontrado en: {input_path}")
+
+    # Con `dtypes` todos los bloques tienen el mismo esquema (sin ellos los
+    # tipos se infieren con el primer bloque). Una muestra del primer bloque
+    # fija las columnas de texto y el tamaño de bloque.
+    reader = open_csv_reader(input_path, dtypes, _STREAMING_BLOCK_BYTES)
+    first_batch = next(iter(reader), None)
+    if first_batch is None:
+        raise ValueError(f"El archivo CSV '{input_path}' está vacío.")
+    sample = table_to_pandas(pa.Table.from_batches([first_batch.slice(0, STREAMING_SAMPLE_ROWS)]))
+    object_cols = sample.select_dtypes(include=['object']).columns
+    if chunk_size is None:
+        chunk_size = _rows_for_memory_limit(sample, memory_limit_mb)
+    logging.info(f"Bloques de {chunk_size} filas (techo de memoria {memory_limit_mb} MB). Columnas de texto: {object_cols.tolist()}")
+
+    output = IntermediateWriter(_cleaned_output_path())
+    writer = ArtifactWriter('spotify_clean')
+    seen_hashes = np.empty(0, dtype=np.uint64)
+    rows_read = rows_deduplicated = rows_dropped = 0
+    columns = None
+
+    try:
+        with stage('transform_chunks', bytes_read=os.path.getsize(input_path), chunk_size=chunk_size) as recorder:
+            for i, table in enumerate(_iter_row_chunks(itertools.chain([first_batch], reader), chunk_size)):
+                chunk = table_to_pandas(table)
+                rows_read += len(chunk)
+                df, seen_hashes, dedup_count, na_count = _transform_chunk(chunk, seen_hashes, object_cols, max_workers)
+                rows_deduplicated += dedup_count
+                rows_dropped += na_count
+                output.write(df)
+                writer.write(df)
+                columns = df.columns.tolist()
+                logging.info(f"Bloque {i + 1}: {len(chunk)} filas leídas, {len(df)} escritas.")
+
+            if columns is None:
+                raise ValueError(f"El archivo CSV '{input_path}' está vacío.")
+
+            output_path = output.close()
+            handle = writer.close()
+            recorder.record(
+                rows_in=rows_read, rows_out=handle['num_rows'], chunks=i + 1,
+                bytes_written=os.path.getsize(output_path) + handle['num_bytes']
+            )
+    except Exception as e:
+        writer.abort()
+        output.abort()
+        logging.error(f"Error durante la transformación en streaming de datos de Spotify: {e}", exc_info=True)
+        raise
+
+    logging.info(f"Filas leídas: {rows_read}. Duplicados por track_id: {rows_deduplicated}. Filas con nulos en {COLS_TO_CHECK_NA}: {rows_dropped}.")
+    logging.info(f"Transformación completada. Dataset guardado en: {output_path}")
+    logging.info(f"Dataset final con {writer.num_rows} filas.")
+    logging.info(f"Columnas finales: {columns}")
+    return handle
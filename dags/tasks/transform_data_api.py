@@ -1,12 +1,29 @@
-import pandas as pd
 from airflow.decorators import task
 import os
 import logging
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import cached_task
+
+OUTPUT_REL_PATH = os.path.join('data', 'api_artist.parquet')
+
+
+def _cache_outputs(params: dict) -> list:
+    from tasks.storage import intermediate_paths
+    return intermediate_paths(OUTPUT_REL_PATH)
+
 
 @task(task_id="transform_artist_details")
-def transform_artist_details(raw_artist_df: pd.DataFrame) -> pd.DataFrame:
+@traced_task
+@cached_task(outputs=_cache_outputs)
+def transform_artist_details(raw_artist_df: dict) -> dict:
+    import pandas as pd
+    from tasks.normalization import normalize_text
+    from tasks.artifacts import read_artifact, write_artifact
+    from tasks.schemas import ARTISTS_SCHEMA, enforce_schema
+    from tasks.storage import write_intermediate
+
     try:
-        df = raw_artist_df.copy()
+        df = read_artifact(raw_artist_df).copy()
         
         # 1. Conversión de tipos numéricos
         if 'artist_followers' in df.columns:
@@ -20,19 +37,20 @@ def transform_artist_details(raw_artist_df: pd.DataFrame) -> pd.DataFrame:
         
         # 3. Normalización de texto
         object_cols = df.select_dtypes(include=['object']).columns
-        for col in object_cols:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.lower().str.strip()
+        with stage('normalize_text', rows_in=len(df), columns=len(object_cols)):
+            for col in object_cols:
+                if col in df.columns:
+                    df[col] = normalize_text(df[col])
+
+        df = enforce_schema(df, ARTISTS_SCHEMA, 'artists_clean')
         
         # 4. Guardado del dataset
-        output_path = os.path.join('data', 'api_artist.csv')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        df.to_csv(output_path, index=False)
+        output_path = write_intermediate(df, OUTPUT_REL_PATH)
         
         logging.info(f"Transformación de artistas completada. Dataset guardado en: {output_path}")
         logging.info(f"Forma del DataFrame: {df.shape}")
         
-        return df
+        return write_artifact(df, 'artists_clean')
         
     except Exception as e:
         logging.error(f"Error durante la transformación de artistas: {e}")
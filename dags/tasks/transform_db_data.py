@@ -1,64 +1,90 @@
 # dags/tasks/transform_db_data.py
 
-import pandas as pd
 from airflow.decorators import task
 import logging
 import os
+from tasks.telemetry import stage, traced_task
+from tasks.task_cache import cached_task
+
+INPUT_REL_PATH = 'data/grammys.parquet' # Ruta relativa del intermedio (Parquet, o CSV si no existe)
+COLS_TO_DROP = ['winner', 'workers', 'img', 'published_at', 'title']
+# Columnas (y tipos Arrow) que se leen del intermedio; las demás no se cargan.
+GRAMMYS_RAW_DTYPES = {
+    'id': 'int64',
+    'year': 'int64',
+    'category': 'string',
+    'nominee': 'string',
+    'artist': 'string',
+}
+
+def _cache_inputs(params: dict) -> list:
+    from tasks.storage import csv_path_for, parquet_path_for
+    input_path = os.path.join(os.getenv('AIRFLOW_HOME', '.'), params['grammys_rel_path'])
+    return [parquet_path_for(input_path), csv_path_for(input_path)]
 
-INPUT_CSV_REL_PATH = 'data/grammys.csv' # Ruta relativa donde se espera encontrar el CSV
 
 @task(task_id="transform_grammys_data")
-def transform_grammys_data(grammys_csv_rel_path: str = INPUT_CSV_REL_PATH) -> pd.DataFrame:
+@traced_task
+@cached_task(inputs=_cache_inputs)
+def transform_grammys_data(grammys_rel_path: str = INPUT_REL_PATH, dtypes: dict = GRAMMYS_RAW_DTYPES) -> dict:
     """
-    Lee el archivo CSV de Grammys, realiza transformaciones
-    (elimina columnas, normaliza texto) y retorna el DataFrame transformado.
+    Lee el intermedio de Grammys (Parquet, o el CSV si no existe, con el
+    lector multihilo de pyarrow), solo las columnas de `dtypes` y con esos
+    tipos en el CSV (dtypes=None lee todas menos COLS_TO_DROP), realiza
+    transformaciones (normaliza texto) y retorna el handle del artefacto con
+    el DataFrame transformado.
     """
-    logging.info(f"Iniciando transformación de datos de Grammys desde CSV...")
+    import pandas as pd
+    from tasks.normalization import normalize_text
+    from tasks.artifacts import write_artifact
+    from tasks.schemas import GRAMMYS_SCHEMA, enforce_schema
+    from tasks.storage import csv_path_for, intermediate_columns, parquet_path_for, read_intermediate
+
+    logging.info(f"Iniciando transformación de datos de Grammys...")
 
     airflow_home = os.getenv('AIRFLOW_HOME', '.')
-    absolute_input_path = os.path.join(airflow_home, grammys_csv_rel_path)
-    logging.info(f"Intentando leer el archivo CSV desde: {absolute_input_path}")
+    absolute_input_path = os.path.join(airflow_home, grammys_rel_path)
+    logging.info(f"Intentando leer el intermedio de Grammys desde: {absolute_input_path}")
 
     try:
-        # --- NUEVO: Leer desde CSV ---
-        if not os.path.exists(absolute_input_path):
-            logging.error(f"Archivo CSV de Grammys no encontrado en: {absolute_input_path}")
+        if not (os.path.exists(parquet_path_for(absolute_input_path)) or os.path.exists(csv_path_for(absolute_input_path))):
+            logging.error(f"Intermedio de Grammys no encontrado en: {absolute_input_path}")
             raise FileNotFoundError(f"No se encontró el archivo esperado: {absolute_input_path}")
 
-        df = pd.read_csv(absolute_input_path)
-        logging.info(f"Archivo CSV de Grammys leído exitosamente. {len(df)} filas encontradas.")
-        # --- FIN NUEVO ---
+        # Solo se cargan las columnas que sobreviven a la transformación.
+        if dtypes is not None:
+            df = read_intermediate(absolute_input_path, dtypes=dtypes)
+        else:
+            columns = [col for col in intermediate_columns(absolute_input_path) if col not in COLS_TO_DROP]
+            df = read_intermediate(absolute_input_path, columns=columns)
+        logging.info(f"Datos de Grammys leídos exitosamente. {len(df)} filas encontradas.")
 
         if df.empty:
-            logging.warning("El archivo CSV de Grammys está vacío. Se procederá con las transformaciones si es posible.")
+            logging.warning("El intermedio de Grammys está vacío. Se procederá con las transformaciones si es posible.")
             # No hay necesidad de salir, las transformaciones podrían manejar un DF vacío.
 
         # --- Transformaciones (lógica original mantenida) ---
         logging.info("Aplicando transformaciones...")
-        cols_to_drop = ['winner', 'workers', 'img', 'published_at', 'title']
-        existing_cols_to_drop = [col for col in cols_to_drop if col in df.columns]
-
-        if existing_cols_to_drop:
-            df = df.drop(columns=existing_cols_to_drop)
-            logging.info(f"Columnas eliminadas: {existing_cols_to_drop}")
-        else:
-            logging.info("No se encontraron columnas de la lista 'cols_to_drop' para eliminar.")
+        logging.info(f"Columnas leídas: {df.columns.tolist()}")
 
         text_columns = ['category', 'nominee', 'artist']
         logging.info(f"Normalizando texto (minúsculas, strip) en columnas: {text_columns}")
-        for col in text_columns:
-            if col in df.columns:
-                # Convertir a string primero para manejar posibles no-strings, luego normalizar
-                df[col] = df[col].astype(str).str.lower().str.strip()
-                # Manejar valores que originalmente eran NaN y ahora son 'nan' como string
-                df[col] = df[col].replace('nan', pd.NA)
-            else:
-                logging.warning(f"Columna '{col}' no encontrada en el DataFrame para normalización.")
+        with stage('normalize_text', rows_in=len(df), columns=len(text_columns)):
+            for col in text_columns:
+                if col in df.columns:
+                    # Convertir a string y normalizar solo los valores únicos
+                    df[col] = normalize_text(df[col])
+                    # Manejar valores que originalmente eran NaN y ahora son 'nan' como string
+                    df[col] = df[col].replace('nan', pd.NA)
+                else:
+                    logging.warning(f"Columna '{col}' no encontrada en el DataFrame para normalización.")
+
+        df = enforce_schema(df, GRAMMYS_SCHEMA, 'grammys_clean')
 
         logging.info("Transformación de datos de Grammys completada.")
         logging.info(f"DataFrame final con {len(df)} filas y columnas: {df.columns.tolist()}")
 
-        return df # Retorna el DataFrame transformado para la tarea de merge
+        return write_artifact(df, 'grammys_clean') # Handle del DataFrame transformado para la tarea de merge
 
     except FileNotFoundError as e:
         logging.error(f"Error: {e}")
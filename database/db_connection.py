@@ -5,13 +5,22 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ENV_PATH = os.path.join(BASE_DIR, '..', 'env', '.env')
 
-if not os.path.exists(ENV_PATH):
-    raise FileNotFoundError(f".env file not found at {ENV_PATH}")
+_env_loaded = False
 
 
-load_dotenv(ENV_PATH)
+def load_env():
+    """Loads env/.env on first use (not at import, so the DAG parses without it)."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    if not os.path.exists(ENV_PATH):
+        raise FileNotFoundError(f".env file not found at {ENV_PATH}")
+    load_dotenv(ENV_PATH)
+    _env_loaded = True
+
 
 def get_connection():
+    load_env()
     db_host = os.getenv("DB_HOST")
     db_port = os.getenv("DB_PORT")
     db_name = os.getenv("DB_NAME")
@@ -31,4 +40,4 @@ def get_connection():
         )
         return conn
     except Exception as e:
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from database.db_connection import get_connection, load_env
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 5
+DEFAULT_POOL_RECYCLE_SECONDS = 1800
+
+_engine = None
+_engine_pid = None
+_lock = threading.Lock()
+_metrics = {
+    'checkouts': 0,
+    'checkout_seconds_total': 0.0,
+    'checkout_seconds_max': 0.0,
+    'connections_created': 0,
+}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide la latencia de cada checkout."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        conn = super()._do_get()
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _metrics['checkouts'] += 1
+            _metrics['checkout_seconds_total'] += elapsed
+            _metrics['checkout_seconds_max'] = max(_metrics['checkout_seconds_max'], elapsed)
+        return conn
+
+
+def _on_connect(dbapi_connection, connection_record):
+    with _lock:
+        _metrics['connections_created'] += 1
+
+
+def _create_engine():
+    load_env()
+    pool_size = int(os.getenv('DB_POOL_SIZE', DEFAULT_POOL_SIZE))
+    max_overflow = int(os.getenv('DB_POOL_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW))
+    engine = sa.create_engine(
+        "postgresql://",
+        creator=get_connection,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE_SECONDS', DEFAULT_POOL_RECYCLE_SECONDS)),
+        echo=False
+    )
+    event.listen(engine, 'connect', _on_connect)
+    logging.info(f"Pool de conexiones creado (pool_size={pool_size}, max_overflow={max_overflow}, pre_ping=True).")
+    return engine
+
+
+def get_engine():
+    """
+    Retorna el engine de SQLAlchemy compartido por el proceso, con un
+    QueuePool de conexiones a PostgreSQL. Si el proceso fue bifurcado (fork)
+    se crea un pool nuevo sin tocar las conexiones heredadas del padre.
+    """
+    global _engine, _engine_pid
+    with _lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            _engine = None
+        if _engine is None:
+            _engine = _create_engine()
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def pool_metrics() -> dict:
+    """Latencia de checkout y utilización actual del pool del proceso."""
+    with _lock:
+        metrics = dict(_metrics)
+        engine = _engine
+    checkouts = metrics['checkouts']
+    result = {
+        'checkouts': checkouts,
+        'checkout_ms_avg': round(metrics['checkout_seconds_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+        'checkout_ms_max': round(metrics['checkout_seconds_max'] * 1000, 3),
+        'connections_created': metrics['connections_created'],
+    }
+    if engine is not None:
+        pool = engine.pool
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        result.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'utilization': round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+        })
+    return result
+
+
+def log_pool_metrics() -> None:
+    logging.info(f"Métricas del pool de conexiones: {pool_metrics()}")
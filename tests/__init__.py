@@ -0,0 +1,15 @@
+# tests/__init__.py
+#
+# Pruebas de los clientes HTTP contra servidores falsos locales
+# (python -m unittest discover tests, o pytest tests). Los módulos de
+# dags/tasks se importan como en Airflow: con dags/ en el path.
+
+import os
+import sys
+
+DAGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags')
+if DAGS_DIR not in sys.path:
+    sys.path.insert(0, DAGS_DIR)
+
+# Las pruebas no dejan spans en disco.
+os.environ.setdefault('TASK_TELEMETRY_EXPORTER', 'none')
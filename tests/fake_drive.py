@@ -0,0 +1,162 @@
+# tests/fake_drive.py
+
+import json
+import re
+import threading
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeDriveServer:
+    """
+    Servidor HTTP local que imita la parte de la API v3 de Drive que usa
+    tasks.drive_upload: búsqueda de archivos (GET /drive/v3/files), inicio de
+    subidas reanudables (POST para crear, PATCH para actualizar) y envío de
+    bloques por PUT a la URI de la sesión, con 308 + Range mientras falten
+    bytes.
+
+    - `files`: {id: {'name', 'parents', 'mimeType', 'appProperties', 'content'}}.
+    - `fail_chunks`: cuántos próximos bloques fallan con 503 después de
+      recibir solo la mitad de sus bytes.
+    - `drop_status_queries`: cuántas de las próximas consultas de estado
+      (Content-Range bytes */total) posteriores a un bloque fallido cierran
+      la conexión sin responder.
+    - `stats`: contadores de búsquedas, sesiones creadas/actualizadas y PUTs.
+    """
+
+    def __init__(self, token: str = 'token'):
+        self.token = token
+        self.files = {}
+        self.sessions = {}
+        self.fail_chunks = 0
+        self.drop_status_queries = 0
+        self.stats = {'lists': 0, 'creates': 0, 'updates': 0, 'puts': 0, 'unauthorized': 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> 'FakeDriveServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def received_bytes(self) -> dict:
+        """{session_id: bytes recibidos} de las sesiones sin terminar."""
+        return {session_id: len(session['data']) for session_id, session in self.sessions.items()}
+
+    def _list(self, query: str) -> dict:
+        name = re.search(r"name = '((?:[^'\\]|\\.)*)'", query).group(1).replace("\\'", "'").replace('\\\\', '\\')
+        parent = re.search(r"'([^']+)' in parents", query)
+        self.stats['lists'] += 1
+        return {'files': [
+            {'id': file_id, 'name': f['name'], 'appProperties': dict(f['appProperties'])}
+            for file_id, f in self.files.items()
+            if f['name'] == name and (parent is None or parent.group(1) in f['parents'])
+        ]}
+
+    def _start_session(self, file_id, metadata: dict, total: int) -> str:
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = {'file_id': file_id, 'metadata': metadata, 'total': total, 'data': b''}
+        self.stats['updates' if file_id else 'creates'] += 1
+        return session_id
+
+    def _put(self, session_id: str, content_range: str, body: bytes):
+        """Retorna (status, cabeceras, cuerpo) o None para cerrar la conexión sin responder."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return 404, {}, {'error': 'session not found'}
+        self.stats['puts'] += 1
+        chunk = re.match(r'bytes (\d+)-(\d+)/(\d+)', content_range)
+        if chunk is None and session.get('failed') and self.drop_status_queries > 0:
+            self.drop_status_queries -= 1
+            return None
+        if chunk is not None and int(chunk.group(1)) == len(session['data']):
+            if self.fail_chunks > 0:
+                self.fail_chunks -= 1
+                session['failed'] = True
+                session['data'] += body[:len(body) // 2]
+                return 503, {}, {'error': 'backend error'}
+            session['data'] += body
+
+        if len(session['data']) < session['total']:
+            headers = {'Range': f"bytes=0-{len(session['data']) - 1}"} if session['data'] else {}
+            return 308, headers, None
+
+        metadata = session['metadata']
+        file_id = session['file_id'] or uuid.uuid4().hex[:12]
+        f = self.files.setdefault(file_id, {'name': None, 'parents': metadata.get('parents', []), 'appProperties': {}})
+        f['name'] = metadata.get('name', f['name'])
+        f['mimeType'] = metadata.get('mimeType')
+        f['appProperties'].update(metadata.get('appProperties', {}))
+        f['content'] = session['data']
+        del self.sessions[session_id]
+        return 200, {}, {'id': file_id, 'name': f['name']}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def _send(self, status: int, headers: dict = None, body=None) -> None:
+                data = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _authorized(self) -> bool:
+                if self.headers.get('Authorization') == f"Bearer {fake.token}":
+                    return True
+                fake.stats['unauthorized'] += 1
+                self._body()
+                self._send(401, {}, {'error': 'invalid credentials'})
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)['q'][0]
+                with fake._lock:
+                    self._send(200, {}, fake._list(query))
+
+            def _start(self, file_id):
+                if not self._authorized():
+                    return
+                metadata = json.loads(self._body())
+                with fake._lock:
+                    session_id = fake._start_session(file_id, metadata, int(self.headers['X-Upload-Content-Length']))
+                self._send(200, {'Location': f"{fake.endpoint}/upload/session/{session_id}"})
+
+            def do_POST(self):
+                self._start(None)
+
+            def do_PATCH(self):
+                self._start(urllib.parse.urlparse(self.path).path.rsplit('/', 1)[1])
+
+            def do_PUT(self):
+                if not self._authorized():
+                    return
+                body = self._body()
+                with fake._lock:
+                    result = fake._put(self.path.rsplit('/', 1)[1], self.headers.get('Content-Range', ''), body)
+                if result is None:
+                    self.close_connection = True
+                    return
+                self._send(*result)
+
+        return Handler
@@ -0,0 +1,125 @@
+# tests/fake_spotify.py
+
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Cada track tiene como artista principal a uno de NUM_ARTISTS artistas.
+NUM_ARTISTS = 60
+
+
+def artist_for(track_id: str) -> str:
+    return f"a{int(track_id[1:]) % NUM_ARTISTS}"
+
+
+class FakeSpotifyServer:
+    """
+    Servidor HTTP local que imita los endpoints de la Web API de Spotify que
+    usa tasks.extract_spotify_api: POST /api/token (client credentials),
+    GET /v1/tracks y GET /v1/artists.
+
+    - `script`: respuestas (status, cabeceras) que se devuelven, en orden,
+      antes de atender los siguientes GET.
+    - `revoke_token()`: invalida el token vigente (el próximo GET da 401).
+    - `fail_ids`: ids que hacen responder 400 al lote que los contenga.
+    - `requests`: (ruta, ids) de cada GET atendido con 200.
+    """
+
+    def __init__(self):
+        self.script = []
+        self.fail_ids = set()
+        self.requests = []
+        self.tokens_issued = 0
+        self._valid_token = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/v1"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.base_url}/api/token"
+
+    def start(self) -> 'FakeSpotifyServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def revoke_token(self) -> None:
+        with self._lock:
+            self._valid_token = None
+
+    def requested_ids(self, path: str) -> list:
+        return [item_id for request_path, ids in self.requests if request_path == path for item_id in ids]
+
+    def _issue_token(self) -> dict:
+        with self._lock:
+            self.tokens_issued += 1
+            self._valid_token = f"token-{self.tokens_issued}"
+            return {'access_token': self._valid_token, 'token_type': 'Bearer', 'expires_in': 3600}
+
+    def _respond(self, path: str, authorization: str, ids: list):
+        with self._lock:
+            if self._valid_token is None or authorization != f"Bearer {self._valid_token}":
+                return 401, {}, {'error': {'status': 401, 'message': 'The access token expired'}}
+            if self.script:
+                status, headers = self.script.pop(0)
+                return status, headers, {'error': {'status': status}}
+            if self.fail_ids.intersection(ids):
+                return 400, {}, {'error': {'status': 400, 'message': 'invalid id'}}
+            self.requests.append((path, ids))
+
+        if path == 'tracks':
+            return 200, {}, {'tracks': [
+                {'id': track_id, 'artists': [{'id': artist_for(track_id), 'name': f"Artist {artist_for(track_id)}"}]}
+                for track_id in ids
+            ]}
+        if path == 'artists':
+            return 200, {}, {'artists': [
+                {'id': artist_id, 'followers': {'total': int(artist_id[1:]) * 1000},
+                 'popularity': int(artist_id[1:]), 'genres': ['pop', 'rock']}
+                for artist_id in ids
+            ]}
+        return 404, {}, {'error': {'status': 404}}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, headers: dict, body: dict) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path != '/api/token':
+                    return self._send(404, {}, {'error': 'not found'})
+                self._send(200, {}, fake._issue_token())
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                ids = urllib.parse.parse_qs(url.query).get('ids', [''])[0].split(',')
+                path = url.path.rsplit('/', 1)[-1]
+                self._send(*fake._respond(path, self.headers.get('Authorization'), ids))
+
+        return Handler
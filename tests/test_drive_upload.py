@@ -0,0 +1,112 @@
+# tests/test_drive_upload.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.fake_drive import FakeDriveServer
+from tasks import drive_upload
+from tasks.drive_upload import CONTENT_HASH_PROPERTY, DriveUploader, DriveUploadError, file_sha256
+
+
+class DriveUploaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeDriveServer().start()
+        self.work_dir = tempfile.mkdtemp(prefix='drive_upload_')
+        self.state_dir = os.path.join(self.work_dir, 'state')
+        self.uploader = DriveUploader(lambda force_refresh=False: self.server.token, endpoint=self.server.endpoint,
+                                      chunk_size_mb=0.25, state_dir=self.state_dir)
+        patcher = mock.patch.object(drive_upload, 'RETRY_BACKOFF_SECONDS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _write(self, name: str, size: int, seed: int = 0) -> str:
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'wb') as f:
+            f.write(bytes((i * 31 + seed) % 251 for i in range(size)))
+        return path
+
+    def test_creates_file(self):
+        path = self._write('merged.csv', 700_000)
+        result = self.uploader.upload(path, 'merged.csv', folder_id='folder')
+
+        self.assertEqual(result['action'], 'created')
+        self.assertEqual(result['bytes'], 700_000)
+        stored = self.server.files[result['id']]
+        with open(path, 'rb') as f:
+            self.assertEqual(stored['content'], f.read())
+        self.assertEqual(stored['parents'], ['folder'])
+        self.assertEqual(stored['appProperties'][CONTENT_HASH_PROPERTY], file_sha256(path))
+        self.assertEqual(os.listdir(self.state_dir), [])
+
+    def test_skips_same_hash(self):
+        path = self._write('merged.csv', 300_000)
+        first = self.uploader.upload(path, 'merged.csv', folder_id='folder')
+        puts = self.server.stats['puts']
+
+        second = self.uploader.upload(path, 'merged.csv', folder_id='folder')
+        self.assertEqual(second, {'id': first['id'], 'action': 'skipped', 'bytes': 0})
+        self.assertEqual(self.server.stats['puts'], puts)
+        self.assertEqual(self.server.stats['creates'], 1)
+
+    def test_updates_in_place(self):
+        path = self._write('merged.csv', 300_000)
+        first = self.uploader.upload(path, 'merged.csv', folder_id='folder')
+
+        path = self._write('merged.csv', 400_000, seed=7)
+        second = self.uploader.upload(path, 'merged.csv', folder_id='folder')
+        self.assertEqual(second['action'], 'updated')
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(len(self.server.files), 1)
+        self.assertEqual(self.server.stats['updates'], 1)
+        stored = self.server.files[first['id']]
+        self.assertEqual(len(stored['content']), 400_000)
+        self.assertEqual(stored['appProperties'][CONTENT_HASH_PROPERTY], file_sha256(path))
+
+    def test_resumes_after_failed_chunk(self):
+        path = self._write('merged.csv', 900_000)
+        self.server.fail_chunks = 2
+        result = self.uploader.upload(path, 'merged.csv')
+
+        with open(path, 'rb') as f:
+            self.assertEqual(self.server.files[result['id']]['content'], f.read())
+        self.assertEqual(self.server.stats['creates'], 1)
+
+    def test_resumes_session_across_attempts(self):
+        path = self._write('merged.csv', 900_000)
+        self.server.fail_chunks = 1
+        with mock.patch.object(drive_upload, 'MAX_CHUNK_RETRIES', 0):
+            with self.assertRaises(DriveUploadError):
+                self.uploader.upload(path, 'merged.csv')
+        self.assertEqual(len(os.listdir(self.state_dir)), 1)
+        (received,) = self.server.received_bytes().values()
+        self.assertGreater(received, 0)
+
+        # El reintento de la tarea retoma la misma sesión desde el último byte recibido.
+        result = self.uploader.upload(path, 'merged.csv')
+        self.assertEqual(result['action'], 'created')
+        self.assertEqual(self.server.stats['creates'], 1)
+        with open(path, 'rb') as f:
+            self.assertEqual(self.server.files[result['id']]['content'], f.read())
+        self.assertEqual(os.listdir(self.state_dir), [])
+
+    def test_status_query_error_is_retried(self):
+        path = self._write('merged.csv', 600_000)
+        self.server.fail_chunks = 1
+        self.server.drop_status_queries = 1
+        result = self.uploader.upload(path, 'merged.csv')
+
+        with open(path, 'rb') as f:
+            self.assertEqual(self.server.files[result['id']]['content'], f.read())
+        self.assertEqual(self.server.drop_status_queries, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# tests/test_extract_artist.py
+
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tasks.storage import read_csv_table
+
+# Encabezado exacto del CSV que genera notebooks/api_spotify_003.ipynb.
+NOTEBOOK_HEADER = 'track_id,artist_id,artist_name,artist_followers,artist_popularity'
+NOTEBOOK_ROWS = [
+    '5SuOikwiRyPMVoIQDJUgSV,0ZxZlO7oWCSYMXhehpyMvE,Gen Hoshino,1500000.0,68.0',
+    '4qPNDBW1i3p13qLCt0Ki3A,1ROHpQ9sLxPgGDSZPbJLrm,Ben Woodward,,',
+]
+
+
+class ArtistCsvProjectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.airflow_home = tempfile.mkdtemp(prefix='extract_artist_')
+        os.makedirs(os.path.join(self.airflow_home, 'data'))
+        self.csv_path = os.path.join(self.airflow_home, 'data', 'api_artist.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join([NOTEBOOK_HEADER] + NOTEBOOK_ROWS) + '\n')
+        self.dtypes = {
+            'track_id': 'string', 'artist_id': 'string', 'artist_name': 'string',
+            'artist_followers': 'float64', 'artist_popularity': 'float64', 'artist_genres': 'string',
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.airflow_home, ignore_errors=True)
+
+    def test_optional_column_missing_from_header(self):
+        table = read_csv_table(self.csv_path, self.dtypes, optional_columns=('artist_genres',))
+        self.assertEqual(table.column_names, NOTEBOOK_HEADER.split(','))
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column('artist_followers').to_pylist(), [1500000.0, None])
+
+    def test_required_column_missing_from_header(self):
+        with self.assertRaises(KeyError):
+            read_csv_table(self.csv_path, self.dtypes)
+
+    @unittest.skipUnless(importlib.util.find_spec('airflow'), 'requiere Airflow')
+    def test_extract_artist_reads_notebook_csv(self):
+        from tasks.artifacts import read_artifact
+        from tasks.extract_api import extract_artist
+
+        with mock.patch.dict(os.environ, {'AIRFLOW_HOME': self.airflow_home, 'TASK_CACHE_DISABLED': 'true'}):
+            df = read_artifact(extract_artist.function())
+        self.assertEqual(df.columns.tolist(), NOTEBOOK_HEADER.split(','))
+        self.assertEqual(df['artist_name'].tolist(), ['Gen Hoshino', 'Ben Woodward'])
+
+
+if __name__ == '__main__':
+    unittest.main()
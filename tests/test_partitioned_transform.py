@@ -0,0 +1,68 @@
+# tests/test_partitioned_transform.py
+
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+# track_id que solo difieren en mayúsculas o espacios son tracks distintos
+# (la normalización de texto los volvería iguales), y un duplicado cuya
+# primera aparición tiene nulos descarta el track completo.
+SPOTIFY_ROWS = [
+    ('AbC1', 'Artist A', 'Album A', 'Song A', 50, 180000, False, 0.5, 0.6, 'pop'),
+    ('abc1', 'Artist B', 'Album B', 'Song B', 40, 200000, True, 0.4, 0.7, 'rock'),
+    ('x2', None, 'Album C', 'Song C', 30, 210000, False, 0.3, 0.2, 'jazz'),
+    ('AbC1', 'Artist A', 'Album A', 'Song A', 50, 180000, False, 0.5, 0.6, 'dance'),
+    ('x2', 'Artist C', 'Album C', 'Song C', 30, 210000, False, 0.3, 0.2, 'pop'),
+    (' y3', 'Artist D', 'Album D', 'Song D', 20, 150000, True, 0.9, 0.1, 'rock'),
+    ('y3', 'Artist E', 'Album E', 'Song E', 10, 160000, False, 0.8, 0.3, 'jazz'),
+    ('abc1', 'Artist B', 'Album B', 'Song B (Live)', 41, 201000, True, 0.4, 0.7, 'pop'),
+]
+SPOTIFY_COLUMNS = ['track_id', 'artists', 'album_name', 'track_name', 'popularity', 'duration_ms',
+                   'explicit', 'danceability', 'energy', 'track_genre']
+
+
+@unittest.skipUnless(importlib.util.find_spec('airflow'), 'requiere Airflow')
+class PartitionedTransformTest(unittest.TestCase):
+
+    def setUp(self):
+        self.airflow_home = tempfile.mkdtemp(prefix='partitioned_transform_')
+        os.makedirs(os.path.join(self.airflow_home, 'data'))
+        pd.DataFrame(SPOTIFY_ROWS, columns=SPOTIFY_COLUMNS).to_csv(
+            os.path.join(self.airflow_home, 'data', 'spotify_dataset.csv'), index=False)
+        patcher = mock.patch.dict(os.environ, {'AIRFLOW_HOME': self.airflow_home, 'TASK_CACHE_DISABLED': 'true'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.airflow_home, ignore_errors=True)
+
+    def test_matches_transform_spotify_data(self):
+        from tasks.artifacts import read_artifact
+        from tasks.extract_csv import extract_spotify
+        from tasks.normalization import SPOTIFY_NORMALIZED_COLUMNS
+        from tasks.partitioned_transform import (
+            combine_spotify_partitions, partition_spotify_data, transform_spotify_partition
+        )
+        from tasks.transform_csv_data import transform_spotify_data
+
+        raw = extract_spotify.function(csv_rel_path=os.path.join('data', 'spotify_dataset.csv'))
+        expected = read_artifact(transform_spotify_data.function(raw))
+        self.assertEqual(expected['track_id'].tolist(), ['abc1', 'abc1', 'y3', 'y3'])
+
+        normalized_cols = [col for col, _, _ in SPOTIFY_NORMALIZED_COLUMNS]
+        for partition_by in ('track_id', 'track_genre'):
+            for num_partitions in (1, 3):
+                with self.subTest(partition_by=partition_by, num_partitions=num_partitions):
+                    partitions = partition_spotify_data.function(raw, num_partitions, partition_by)
+                    transformed = [transform_spotify_partition.function(handle) for handle in partitions]
+                    combined = read_artifact(combine_spotify_partitions.function(transformed))
+                    pd.testing.assert_frame_equal(combined.drop(columns=normalized_cols), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
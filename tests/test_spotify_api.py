@@ -0,0 +1,114 @@
+# tests/test_spotify_api.py
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from email.utils import formatdate
+
+import requests
+
+from tests.fake_spotify import NUM_ARTISTS, FakeSpotifyServer, artist_for
+from tasks.artist_cache import LOOKUP_BATCH_SIZE, ArtistCache
+from tasks.extract_spotify_api import (
+    DEFAULT_RETRY_AFTER_SECONDS, SpotifyClient, _retry_after_seconds, fetch_artist_details
+)
+
+
+class RetryAfterTest(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(_retry_after_seconds('2'), 2.0)
+        self.assertEqual(_retry_after_seconds('0.5'), 0.5)
+
+    def test_http_date(self):
+        self.assertAlmostEqual(_retry_after_seconds(formatdate(time.time() + 30, usegmt=True)), 30, delta=1.5)
+        self.assertEqual(_retry_after_seconds(formatdate(time.time() - 30, usegmt=True)), 0.0)
+
+    def test_missing_or_invalid(self):
+        self.assertEqual(_retry_after_seconds(None), DEFAULT_RETRY_AFTER_SECONDS)
+        self.assertEqual(_retry_after_seconds('mañana'), DEFAULT_RETRY_AFTER_SECONDS)
+
+
+class SpotifyClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeSpotifyServer().start()
+        self.client = SpotifyClient('id', 'secret', api_url=self.server.api_url, token_url=self.server.token_url)
+        self.checkpoint_dir = tempfile.mkdtemp(prefix='spotify_checkpoints_')
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def test_429_waits_for_retry_after(self):
+        self.server.script = [(429, {'Retry-After': '1'})]
+        start_time = time.monotonic()
+        payload = self.client.get('tracks', params={'ids': 't1'})
+        self.assertGreaterEqual(time.monotonic() - start_time, 1.0)
+        self.assertEqual(payload['tracks'][0]['id'], 't1')
+        self.assertEqual(self.client.rate_limited, 1)
+
+    def test_429_with_http_date(self):
+        self.server.script = [(429, {'Retry-After': formatdate(time.time() + 1, usegmt=True)})]
+        payload = self.client.get('artists', params={'ids': 'a1'})
+        self.assertEqual(payload['artists'][0]['id'], 'a1')
+        self.assertEqual(self.client.rate_limited, 1)
+
+    def test_401_refreshes_token(self):
+        self.client.get('tracks', params={'ids': 't1'})
+        self.server.revoke_token()
+        payload = self.client.get('tracks', params={'ids': 't2'})
+        self.assertEqual(payload['tracks'][0]['id'], 't2')
+        self.assertEqual(self.server.tokens_issued, 2)
+
+    def test_5xx_is_retried(self):
+        self.server.script = [(503, {})]
+        self.assertEqual(self.client.get('tracks', params={'ids': 't1'})['tracks'][0]['id'], 't1')
+
+    def test_resumes_from_checkpoint(self):
+        track_ids = [f"t{i}" for i in range(120)]
+        # El segundo lote de artistas falla: el primero queda en el checkpoint.
+        self.server.fail_ids = {f"a{NUM_ARTISTS - 1}"}
+        with self.assertRaises(requests.HTTPError):
+            fetch_artist_details(track_ids, self.client, self.checkpoint_dir, max_workers=2)
+        self.assertEqual(sorted(self.server.requested_ids('tracks')), sorted(track_ids))
+        self.assertEqual(len(self.server.requested_ids('artists')), 50)
+
+        self.server.fail_ids = set()
+        self.server.requests = []
+        df = fetch_artist_details(track_ids, self.client, self.checkpoint_dir, max_workers=2)
+        self.assertEqual(self.server.requested_ids('tracks'), [])
+        self.assertEqual(self.server.requested_ids('artists'), [f"a{i}" for i in range(50, NUM_ARTISTS)])
+
+        self.assertEqual(df['track_id'].tolist(), track_ids)
+        self.assertEqual(df['artist_id'].tolist(), [artist_for(track_id) for track_id in track_ids])
+        self.assertEqual(df.loc[df['track_id'] == 't59', 'artist_followers'].item(), 59000)
+        self.assertEqual(df['artist_genres'].unique().tolist(), ['pop;rock'])
+
+    def test_serves_from_cache(self):
+        track_ids = [f"t{i}" for i in range(2 * LOOKUP_BATCH_SIZE + 10)]
+        cache_path = os.path.join(self.checkpoint_dir, 'cache.sqlite')
+        with ArtistCache(cache_path) as cache:
+            first = fetch_artist_details(track_ids, self.client, self.checkpoint_dir, max_workers=2, cache=cache)
+        self.assertEqual(len(self.server.requested_ids('tracks')), len(track_ids))
+
+        self.server.requests = []
+        with ArtistCache(cache_path) as cache:
+            self.assertEqual(cache.get_tracks(['t1', 'missing', 't1']), {
+                't1': {'track_id': 't1', 'artist_id': 'a1', 'artist_name': 'Artist a1'}
+            })
+            cached = fetch_artist_details(track_ids, self.client, self.checkpoint_dir, max_workers=2, cache=cache)
+        self.assertEqual(self.server.requests, [])
+        self.assertTrue(cached.equals(first))
+
+        # Con los artistas vencidos solo se vuelve a consultar /artists.
+        with ArtistCache(cache_path, artist_ttl_hours=0) as cache:
+            fetch_artist_details(track_ids, self.client, self.checkpoint_dir, max_workers=2, cache=cache)
+        self.assertEqual(self.server.requested_ids('tracks'), [])
+        self.assertEqual(sorted(self.server.requested_ids('artists')), sorted(f"a{i}" for i in range(NUM_ARTISTS)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/test_task_cache.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from tasks.artifacts import read_artifact, write_artifact
+from tasks.task_cache import cached_task
+
+OUTPUT_REL_PATH = os.path.join('data', 'merge_dataset.parquet')
+calls = []
+
+
+def _outputs(params: dict) -> list:
+    return [os.path.join(os.environ['AIRFLOW_HOME'], OUTPUT_REL_PATH)]
+
+
+@cached_task(outputs=_outputs)
+def merge_like(match_mode: str = 'exact') -> dict:
+    """Como merge: cada modo escribe su resultado en la misma ruta fija además del artefacto."""
+    calls.append(match_mode)
+    df = pd.DataFrame({'track_id': ['t1', 't2'], 'match_mode': [match_mode, match_mode]})
+    output_path = _outputs({})[0]
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    df.to_parquet(output_path, index=False)
+    return write_artifact(df, 'merged')
+
+
+class CachedTaskSideOutputsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.airflow_home = tempfile.mkdtemp(prefix='task_cache_')
+        patcher = mock.patch.dict(os.environ, {'AIRFLOW_HOME': self.airflow_home})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        calls.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.airflow_home, ignore_errors=True)
+
+    def _side_output_mode(self) -> list:
+        return pd.read_parquet(_outputs({})[0])['match_mode'].unique().tolist()
+
+    def test_exact_fuzzy_exact(self):
+        merge_like('exact')
+        fuzzy = merge_like('fuzzy')
+        self.assertEqual(read_artifact(fuzzy)['match_mode'].unique().tolist(), ['fuzzy'])
+
+        # La entrada de 'exact' sigue en la caché, pero el archivo ahora es el de 'fuzzy'.
+        exact = merge_like('exact')
+        self.assertEqual(calls, ['exact', 'fuzzy', 'exact'])
+        self.assertEqual(read_artifact(exact)['match_mode'].unique().tolist(), ['exact'])
+        self.assertEqual(self._side_output_mode(), ['exact'])
+
+    def test_hit_when_side_output_unchanged(self):
+        first = merge_like('exact')
+        second = merge_like('exact')
+        self.assertEqual(calls, ['exact'])
+        self.assertEqual(second, first)
+
+    def test_missing_side_output_reruns(self):
+        merge_like('exact')
+        os.remove(_outputs({})[0])
+        merge_like('exact')
+        self.assertEqual(calls, ['exact', 'exact'])
+        self.assertEqual(self._side_output_mode(), ['exact'])
+
+
+if __name__ == '__main__':
+    unittest.main()